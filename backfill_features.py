@@ -0,0 +1,121 @@
+import asyncio
+import sys
+
+# ФИКС ДЛЯ WINDOWS
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+from sqlalchemy import select, update
+
+from db.cities import seed_city_gazetteer
+from db.database import engine, PrimarySessionLocal
+from db.features import candidate_features, vacancy_features
+from db.models import Candidate, Vacancy
+from db.repository import Repository
+from db.migrations import migrate
+
+# Сколько строк пересчитывать за одну транзакцию
+BATCH_SIZE = 1000
+
+
+async def backfill_candidates(recompute_all: bool) -> int:
+    """
+    Заполняет производные признаки кандидатов пачками по id.
+    Без recompute_all трогает только строки, где признаков еще нет.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        async with PrimarySessionLocal() as session:
+            stmt = select(
+                Candidate.id, Candidate.city, Candidate.experience, Candidate.ready_date
+            ).where(Candidate.id > last_id).order_by(Candidate.id).limit(BATCH_SIZE)
+            if not recompute_all:
+                stmt = stmt.where(Candidate.city_key.is_(None))
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                return updated
+
+            await session.execute(update(Candidate), [
+                {'id': row.id, **candidate_features(
+                    city=row.city, experience=row.experience, ready_date=row.ready_date
+                )}
+                for row in rows
+            ])
+            await session.commit()
+
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+async def backfill_vacancies(recompute_all: bool) -> int:
+    """
+    Заполняет производные признаки вакансий пачками по id.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        async with PrimarySessionLocal() as session:
+            stmt = select(
+                Vacancy.id, Vacancy.city, Vacancy.requirements
+            ).where(Vacancy.id > last_id).order_by(Vacancy.id).limit(BATCH_SIZE)
+            if not recompute_all:
+                stmt = stmt.where(Vacancy.city_key.is_(None))
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                return updated
+
+            await session.execute(update(Vacancy), [
+                {'id': row.id, **vacancy_features(city=row.city, requirements=row.requirements)}
+                for row in rows
+            ])
+            await session.commit()
+
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+async def backfill_city_ids() -> int:
+    """
+    Проставляет city_id кандидатам и вакансиям, у которых его еще нет.
+    Каждое уникальное написание города разрешается через справочник один раз.
+    """
+    updated = 0
+    for model in (Candidate, Vacancy):
+        async with PrimarySessionLocal() as session:
+            stmt = select(model.city).where(model.city_id.is_(None)).distinct()
+            cities = (await session.execute(stmt)).scalars().all()
+
+        for city in cities:
+            city_id, _ = await Repository.resolve_city(city)
+            if city_id is None:
+                # Города нет в справочнике: скоринг сравнивает city_key
+                continue
+            async with PrimarySessionLocal() as session:
+                result = await session.execute(
+                    update(model).where(model.city == city, model.city_id.is_(None)).values(city_id=city_id)
+                )
+                await session.commit()
+            updated += result.rowcount
+    return updated
+
+
+async def backfill(recompute_all: bool):
+    print(">>> Проверяем колонки признаков...")
+    async with engine.begin() as conn:
+        await migrate(conn)
+        await seed_city_gazetteer(conn)
+
+    candidates = await backfill_candidates(recompute_all)
+    print(f">>> Кандидатов обновлено: {candidates}")
+
+    vacancies = await backfill_vacancies(recompute_all)
+    print(f">>> Вакансий обновлено: {vacancies}")
+
+    cities = await backfill_city_ids()
+    print(f">>> Строк с проставленным city_id: {cities}")
+
+
+# Запуск: python backfill_features.py [--all]
+# --all — пересчитать признаки у всех строк, а не только у пустых
+asyncio.run(backfill("--all" in sys.argv[1:]))
@@ -0,0 +1,270 @@
+"""
+Бенчмарк скоринга кандидатов на синтетических данных.
+
+Меряет, как ведет себя подбор на пулах 1k / 100k / 1M кандидатов:
+- row: calculate_score по каждому кандидату (как до пакетного скоринга);
+- batch: CandidatePool + calculate_scores_batch;
+- index: ExperienceIndex.lookup + calculate_scores_batch (как precompute.score_vacancy);
+- micro: пропускная способность _check_experience_match и _is_ready_soon.
+
+Для каждого пути считается пропускная способность (пар кандидат-вакансия
+в секунду) и задержка ранжирования одной вакансии (p50 / p99). Результаты
+сравниваются с сохраненным baseline, регрессия дает код возврата 1.
+
+Запуск (без Telegram и Postgres):
+    python -m benchmarks.scoring_bench --sizes 1k 100k 1M
+    python -m benchmarks.scoring_bench --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bot.utils.scoring import (
+    CandidatePool, calculate_score, calculate_scores_batch, rank_scores,
+    _check_experience_match, _is_ready_soon,
+)
+from db.token_index import ExperienceIndex
+from benchmarks.synthetic import READY_DATES, SyntheticDataset
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+# Допустимое ухудшение относительно baseline (0.25 = на 25%)
+DEFAULT_TOLERANCE = 0.25
+
+# Сколько вызовов делать в микробенчмарках
+MICRO_CALLS = 200000
+
+_SIZE_SUFFIXES = {"k": 1000, "m": 1000000}
+
+
+def parse_size(text: str) -> int:
+    """
+    Переводит "1k" / "100k" / "1M" / "5000" в число кандидатов.
+    """
+    suffix = text[-1].lower()
+    if suffix in _SIZE_SUFFIXES:
+        return int(float(text[:-1]) * _SIZE_SUFFIXES[suffix])
+    return int(text)
+
+
+# -------- Пути ранжирования --------
+async def _rank_rows(candidates, vacancy) -> list[tuple[int, int]]:
+    scored = []
+    for candidate in candidates:
+        score = await calculate_score(candidate, vacancy)
+        if score > 0:
+            scored.append((candidate.id, score))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored
+
+
+def _rank_batch(pool: CandidatePool, vacancy, experience_ids=None) -> list[tuple[int, int]]:
+    scores = calculate_scores_batch(vacancy, pool, experience_ids=experience_ids)
+    return [(int(pool.ids[i]), int(scores[i])) for i in rank_scores(scores)]
+
+
+def _latency_stats(latencies: list[float], pairs_per_vacancy: int, setup: float) -> dict:
+    latencies = np.asarray(latencies)
+    return {
+        "vacancies": len(latencies),
+        "setup_s": round(setup, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "pairs_per_s": round(pairs_per_vacancy * len(latencies) / float(latencies.sum())),
+    }
+
+
+def bench_row(candidates, vacancies) -> tuple[dict, list]:
+    """
+    calculate_score по каждому кандидату, затем сортировка.
+    """
+    async def run():
+        latencies = []
+        rankings = []
+        for vacancy in vacancies:
+            started = time.perf_counter()
+            rankings.append(await _rank_rows(candidates, vacancy))
+            latencies.append(time.perf_counter() - started)
+        return latencies, rankings
+
+    latencies, rankings = asyncio.run(run())
+    return _latency_stats(latencies, len(candidates), 0.0), rankings
+
+
+def bench_batch(candidates, vacancies) -> tuple[dict, list]:
+    """
+    Пул строится один раз, каждая вакансия — один векторный проход.
+    """
+    started = time.perf_counter()
+    pool = CandidatePool.from_candidates(candidates)
+    setup = time.perf_counter() - started
+
+    latencies = []
+    rankings = []
+    for vacancy in vacancies:
+        started = time.perf_counter()
+        rankings.append(_rank_batch(pool, vacancy))
+        latencies.append(time.perf_counter() - started)
+    return _latency_stats(latencies, len(candidates), setup), rankings
+
+
+def bench_index(candidates, vacancies) -> tuple[dict, list]:
+    """
+    Совпадение опыта берется из инвертированного индекса.
+    """
+    started = time.perf_counter()
+    pool = CandidatePool.from_candidates(candidates, with_experience=False)
+    index = ExperienceIndex()
+    index.rebuild(candidates)
+    setup = time.perf_counter() - started
+
+    latencies = []
+    rankings = []
+    for vacancy in vacancies:
+        started = time.perf_counter()
+        rankings.append(_rank_batch(pool, vacancy, experience_ids=index.lookup(vacancy.requirements)))
+        latencies.append(time.perf_counter() - started)
+    return _latency_stats(latencies, len(candidates), setup), rankings
+
+
+def bench_micro(candidates, vacancies, calls: int) -> dict:
+    """
+    Пропускная способность отдельных критериев (вызовов в секунду).
+    """
+    pairs = [
+        (candidates[i % len(candidates)].experience, vacancies[i % len(vacancies)].requirements)
+        for i in range(calls)
+    ]
+    started = time.perf_counter()
+    for experience, requirements in pairs:
+        _check_experience_match(experience, requirements)
+    experience_rate = calls / (time.perf_counter() - started)
+
+    ready_dates = [READY_DATES[i % len(READY_DATES)] for i in range(calls)]
+    started = time.perf_counter()
+    for ready_date in ready_dates:
+        _is_ready_soon(ready_date)
+    ready_rate = calls / (time.perf_counter() - started)
+
+    return {
+        "check_experience_match_per_s": round(experience_rate),
+        "is_ready_soon_per_s": round(ready_rate),
+    }
+
+
+# -------- Сравнение с baseline --------
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Возвращает описания регрессий: задержка выросла или пропускная
+    способность упала больше чем на tolerance.
+    """
+    regressions = []
+    for size, paths in results.items():
+        for path, metrics in paths.items():
+            reference = baseline.get(size, {}).get(path)
+            if not reference:
+                continue
+            for metric, value in metrics.items():
+                old = reference.get(metric)
+                if not old or metric in ("vacancies", "setup_s"):
+                    continue
+                if metric.endswith("_ms") and value > old * (1 + tolerance):
+                    regressions.append(f"{size}/{path}/{metric}: {old} -> {value}")
+                elif metric.endswith("_per_s") and value < old / (1 + tolerance):
+                    regressions.append(f"{size}/{path}/{metric}: {old} -> {value}")
+    return regressions
+
+
+def _print_table(size: str, paths: dict) -> None:
+    for path, metrics in paths.items():
+        formatted = ", ".join(f"{name}={value}" for name, value in metrics.items())
+        print(f"  {size:>6} {path:<6} {formatted}")
+
+
+def _check_rankings(size: str, reference: list, other: list, path: str) -> None:
+    """
+    Все пути обязаны ранжировать одинаково (порядок при равных скорах может отличаться).
+    """
+    for vacancy_number, (expected, actual) in enumerate(zip(reference, other)):
+        if sorted(expected) != sorted(actual) or [s for _, s in expected] != [s for _, s in actual]:
+            raise SystemExit(f"{size}: путь {path} расходится с batch на вакансии #{vacancy_number + 1}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк скоринга кандидатов на синтетических данных")
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k", "1M"], help="размеры пула кандидатов")
+    parser.add_argument("--vacancies", type=int, default=50, help="вакансий на размер (batch/index)")
+    parser.add_argument("--row-vacancies", type=int, default=5, help="вакансий для пути row")
+    parser.add_argument("--row-limit", default="100k", help="не запускать row на пулах больше этого")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как новый baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", type=Path, help="куда дополнительно записать результаты (JSON)")
+    args = parser.parse_args(argv)
+
+    dataset = SyntheticDataset(seed=args.seed)
+    vacancies = dataset.vacancies(args.vacancies)
+    row_limit = parse_size(args.row_limit)
+
+    results = {}
+    for size in args.sizes:
+        count = parse_size(size)
+        started = time.perf_counter()
+        candidates = dataset.candidates(count)
+        print(f"{size}: сгенерировано {count} кандидатов за {time.perf_counter() - started:.1f} с")
+
+        paths = {}
+        paths["batch"], batch_rankings = bench_batch(candidates, vacancies)
+        paths["index"], index_rankings = bench_index(candidates, vacancies)
+        _check_rankings(size, batch_rankings, index_rankings, "index")
+        if count <= row_limit:
+            paths["row"], row_rankings = bench_row(candidates, vacancies[:args.row_vacancies])
+            _check_rankings(size, batch_rankings, row_rankings, "row")
+        paths["micro"] = bench_micro(candidates, vacancies, MICRO_CALLS)
+
+        results[size] = paths
+        _print_table(size, paths)
+        del candidates
+
+    report = {
+        "meta": {
+            "seed": args.seed,
+            "vacancies": args.vacancies,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"baseline сохранен: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"baseline не найден ({args.baseline}), сравнение пропущено")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print("Регрессии относительно baseline:")
+        for regression in regressions:
+            print("  " + regression)
+        return 1
+    print("Регрессий относительно baseline нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Генератор синтетических кандидатов и вакансий для бенчмарков скоринга.
+
+Данные похожи на то, что вводят пользователи бота: русские названия
+городов (включая разговорные написания), профессии и навыки в опыте,
+свободный текст готовности выхода. Генерация детерминирована seed,
+поэтому прогоны на разных машинах сравнивают одинаковые данные.
+Ни Telegram, ни Postgres не нужны.
+"""
+import random
+import sys
+
+from db.cities import CITY_GAZETTEER
+from db.features import candidate_features, vacancy_features
+
+# Профессия -> характерные слова опыта/требований
+PROFESSIONS = {
+    "продавец": ["продажи", "касса", "консультирование", "мерчандайзинг", "выкладка", "1с"],
+    "кассир": ["касса", "наличные", "терминал", "инкассация", "возвраты"],
+    "кладовщик": ["склад", "приемка", "отгрузка", "инвентаризация", "wms", "погрузчик"],
+    "грузчик": ["погрузка", "разгрузка", "склад", "такелаж", "переезды"],
+    "водитель": ["категория", "доставка", "экспедирование", "газель", "маршрут", "права"],
+    "курьер": ["доставка", "маршрут", "самокат", "велосипед", "заказы"],
+    "официант": ["зал", "обслуживание", "банкеты", "бар", "кофе", "сервировка"],
+    "повар": ["кухня", "заготовки", "горячий", "холодный", "выпечка", "санкнижка"],
+    "бариста": ["кофе", "эспрессо", "латте-арт", "кофемашина", "зал"],
+    "администратор": ["ресепшн", "запись", "crm", "звонки", "касса", "документы"],
+    "оператор": ["звонки", "колл-центр", "crm", "скрипты", "обращения"],
+    "менеджер": ["продажи", "переговоры", "crm", "клиенты", "b2b", "отчеты", "excel"],
+    "бухгалтер": ["1с", "отчетность", "налоги", "зарплата", "первичка", "excel"],
+    "программист": ["python", "django", "sql", "postgresql", "git", "docker", "api"],
+    "тестировщик": ["тестирование", "qa", "postman", "sql", "баги", "автотесты"],
+    "дизайнер": ["figma", "photoshop", "макеты", "иллюстрации", "ui", "ux"],
+    "электрик": ["электромонтаж", "проводка", "щитки", "допуск", "монтаж"],
+    "сварщик": ["сварка", "полуавтомат", "аргон", "металлоконструкции", "чертежи"],
+    "уборщик": ["уборка", "клининг", "химия", "помещения", "офис"],
+    "охранник": ["охрана", "пропускной", "видеонаблюдение", "лицензия", "обход"],
+}
+
+# Связующие слова, которые пользователи пишут в опыте
+EXPERIENCE_FILLER = ["опыт", "работы", "лет", "года", "работал", "в", "на", "с", "и", "магазине", "компании", "смены"]
+
+# Варианты ответа на вопрос "когда готовы выйти"
+READY_DATES = [
+    "", "сразу", "завтра", "сегодня", "через неделю", "через 2 недели", "через месяц",
+    "скоро", "3 дня", "с 01.12", "после 15.01", "в понедельник", "после отпуска", "не знаю",
+]
+
+# Разброс зарплат (руб.) и шаг округления
+SALARY_RANGE = (25000, 250000)
+SALARY_STEP = 5000
+
+
+class SyntheticCandidate:
+    """
+    Кандидат с теми же полями, что Candidate из БД (включая производные признаки),
+    но без SQLAlchemy — миллион таких объектов создается за секунды.
+    """
+    __slots__ = (
+        'id', 'user_id', 'name', 'city', 'city_id', 'city_key', 'expected_salary',
+        'experience', 'experience_tokens', 'ready_date', 'ready_soon', 'ready_from',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+
+class SyntheticVacancy:
+    """
+    Вакансия с теми же полями, что Vacancy из БД (включая производные признаки).
+    """
+    __slots__ = (
+        'id', 'employer_id', 'title', 'description', 'city', 'city_id', 'city_key',
+        'salary', 'requirements', 'requirement_tokens', 'is_active',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+
+class SyntheticDataset:
+    """
+    Детерминированный генератор кандидатов и вакансий.
+
+    Args:
+        seed: зерно генератора случайных чисел
+        with_city_ids: проставлять ли city_id (как после разрешения через справочник);
+            без него сравнение городов идет по нормализованному названию
+    """
+
+    def __init__(self, seed: int = 42, with_city_ids: bool = True):
+        self.seed = seed
+        self.with_city_ids = with_city_ids
+
+        # Крупные города встречаются чаще: вес убывает с позицией в справочнике
+        self._cities = list(CITY_GAZETTEER)
+        self._city_weights = [1 / (position + 1) for position in range(len(self._cities))]
+        self._city_spellings = {
+            name: [name, name.lower(), *aliases] for name, aliases in CITY_GAZETTEER.items()
+        }
+        self._professions = list(PROFESSIONS)
+
+    def candidates(self, count: int) -> list[SyntheticCandidate]:
+        """
+        Генерирует count кандидатов с id 1..count.
+        """
+        rng = random.Random(f"{self.seed}:candidates")
+        result = []
+        for candidate_id in range(1, count + 1):
+            city_id, city = self._city(rng)
+            experience = self._experience(rng)
+            ready_date = rng.choice(READY_DATES)
+            features = candidate_features(city=city, experience=experience, ready_date=ready_date)
+            features['experience_tokens'] = [sys.intern(token) for token in features['experience_tokens']]
+
+            result.append(SyntheticCandidate(
+                id=candidate_id,
+                user_id=candidate_id,
+                name=f"Кандидат {candidate_id}",
+                city=city,
+                city_id=city_id,
+                expected_salary=self._salary(rng),
+                experience=experience,
+                ready_date=ready_date,
+                **features,
+            ))
+        return result
+
+    def vacancies(self, count: int) -> list[SyntheticVacancy]:
+        """
+        Генерирует count активных вакансий с id 1..count.
+        """
+        rng = random.Random(f"{self.seed}:vacancies")
+        result = []
+        for vacancy_id in range(1, count + 1):
+            city_id, city = self._city(rng)
+            profession = rng.choice(self._professions)
+            skills = rng.sample(PROFESSIONS[profession], k=min(3, len(PROFESSIONS[profession])))
+            requirements = " ".join([f"{profession}", *skills, rng.choice(["опыт", "желателен", "от", "года"])])
+
+            result.append(SyntheticVacancy(
+                id=vacancy_id,
+                employer_id=vacancy_id,
+                title=profession.capitalize(),
+                description=f"Требуется {profession}",
+                city=city,
+                city_id=city_id,
+                salary=self._salary(rng),
+                requirements=requirements,
+                is_active=True,
+                **vacancy_features(city=city, requirements=requirements),
+            ))
+        return result
+
+    # -------- Отдельные поля --------
+    def _city(self, rng: random.Random) -> tuple[int | None, str]:
+        position = rng.choices(range(len(self._cities)), weights=self._city_weights)[0]
+        name = self._cities[position]
+        spelling = rng.choice(self._city_spellings[name])
+        return (position + 1 if self.with_city_ids else None), spelling
+
+    def _experience(self, rng: random.Random) -> str:
+        profession = rng.choice(self._professions)
+        words = [profession, *rng.sample(PROFESSIONS[profession], k=rng.randint(1, 4))]
+        # Иногда у кандидата есть вторая профессия
+        if rng.random() < 0.3:
+            second = rng.choice(self._professions)
+            words += [second, rng.choice(PROFESSIONS[second])]
+        words += rng.sample(EXPERIENCE_FILLER, k=rng.randint(2, 5))
+        rng.shuffle(words)
+        return " ".join(words)
+
+    def _salary(self, rng: random.Random) -> float:
+        low, high = SALARY_RANGE
+        salary = rng.triangular(low, high, 60000)
+        return float(round(salary / SALARY_STEP) * SALARY_STEP)
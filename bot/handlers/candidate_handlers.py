@@ -3,9 +3,11 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.states.candidate_states import CandidateStates
 from db.repository import Repository
+from db.session import rollback
 
 router = Router()
 
@@ -28,17 +30,19 @@ def get_confirm_keyboard():
 
 # -------- Команда /start --------
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, session: AsyncSession):
     await state.clear()
 
-    # Проверяем, есть ли пользователь в БД
-    user = await Repository.get_user_by_telegram_id(message.from_user.id)
-    if not user:
-        user = await Repository.create_user(
-            telegram_id=message.from_user.id,
-            role="candidate",
-            username=message.from_user.username
-        )
+    # Находим или создаем пользователя (один INSERT ... ON CONFLICT)
+    user = await Repository.get_or_create_user(
+        telegram_id=message.from_user.id,
+        role="candidate",
+        username=message.from_user.username,
+        session=session
+    )
+
+    # Вернувшийся кандидат активен: его анкета не должна уйти в архив
+    await Repository.touch_candidate_by_user_id(user.id, session=session)
 
     await message.answer(
         "👋 Привет! Давай создадим твою анкету кандидата.\n\nНачать?",
@@ -87,14 +91,17 @@ async def process_age(message: Message, state: FSMContext):
 
 # -------- Город --------
 @router.message(CandidateStates.city)
-async def process_city(message: Message, state: FSMContext):
+async def process_city(message: Message, state: FSMContext, session: AsyncSession):
     city = message.text.strip()
 
     if len(city) < 2:
         await message.answer("❌ Введите корректный город.")
         return
 
-    await state.update_data(city=city)
+    # Приводим город к справочнику ("СПб", "Питер" -> Санкт-Петербург)
+    city_id, city = await Repository.resolve_city(city, session=session)
+
+    await state.update_data(city=city, city_id=city_id)
     await state.set_state(CandidateStates.experience)
     await message.answer("❓ Опишите ваш опыт работы.")
 
@@ -188,33 +195,33 @@ async def process_available_date(message: Message, state: FSMContext):
 
 
 # -------- Сохранение "Да" --------
-@router.callback_query(F.data == "candidate_confirm_yes")
-async def confirm_candidate_yes(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CandidateStates.confirm, F.data == "candidate_confirm_yes")
+async def confirm_candidate_yes(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
 
     try:
-        # 1. Получаем юзера из таблицы users
-        user = await Repository.get_user_by_telegram_id(callback.from_user.id)
-
-        if not user:
-            # если не нашли — создаём
-            user = await Repository.create_user(
-                telegram_id=callback.from_user.id,
-                role="candidate",
-                username=callback.from_user.username
-            )
+        # 1. Находим или создаем юзера в таблице users
+        user = await Repository.get_or_create_user(
+            telegram_id=callback.from_user.id,
+            role="candidate",
+            username=callback.from_user.username,
+            session=session
+        )
 
         # 2. Создаем профиль кандидата с user_id = PK users.id
+        #    (скоры по активным вакансиям Repository поставит считаться в фон)
         await Repository.create_candidate(
             user_id=user.id,
             name=data["name"],
             age=data["age"],
             city=data["city"],
+            city_id=data.get("city_id"),
             experience=data["experience"],
             phone=data["phone"],
             desired_position=data["position"],
             expected_salary=data["expected_salary"],
-            ready_date=data["available_from"]
+            ready_date=data["available_from"],
+            session=session
         )
 
         await callback.message.edit_text(
@@ -222,6 +229,8 @@ async def confirm_candidate_yes(callback: CallbackQuery, state: FSMContext):
         )
 
     except Exception as e:
+        # Ничего из начатого не сохраняем: анкета пишется целиком или никак
+        await rollback(session)
         await callback.message.edit_text(f"❌ Ошибка при сохранении: {e}")
 
     finally:
@@ -230,8 +239,14 @@ async def confirm_candidate_yes(callback: CallbackQuery, state: FSMContext):
 
 
 # -------- Сохранение "Нет" --------
-@router.callback_query(F.data == "candidate_confirm_no")
+@router.callback_query(CandidateStates.confirm, F.data == "candidate_confirm_no")
 async def confirm_candidate_no(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await callback.message.edit_text("❌ Анкета отменена.\nВведите /start для начала.")
     await callback.answer()
+
+
+# -------- Повторное нажатие после сохранения или отмены --------
+@router.callback_query(F.data.in_({"candidate_confirm_yes", "candidate_confirm_no"}))
+async def confirm_candidate_stale(callback: CallbackQuery):
+    await callback.answer("Эта анкета уже обработана.")
@@ -3,9 +3,12 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.states.employer_states import EmployerStates
 from db.repository import Repository
+from db.session import rollback
+from bot.utils.precompute import schedule_vacancy_scoring
 
 router = Router()
 
@@ -27,17 +30,16 @@ def get_confirm_keyboard():
 
 # ---------- /employer_start ----------
 @router.message(Command("employer_start"))
-async def cmd_employer_start(message: Message, state: FSMContext):
+async def cmd_employer_start(message: Message, state: FSMContext, session: AsyncSession):
     await state.clear()
 
-    # Проверяем, есть ли юзер в таблице users
-    user = await Repository.get_user_by_telegram_id(message.from_user.id)
-    if not user:
-        user = await Repository.create_user(
-            telegram_id=message.from_user.id,
-            role="employer",
-            username=message.from_user.username
-        )
+    # Находим или создаем юзера (один INSERT ... ON CONFLICT)
+    await Repository.get_or_create_user(
+        telegram_id=message.from_user.id,
+        role="employer",
+        username=message.from_user.username,
+        session=session
+    )
 
     await message.answer(
         "👋 Здравствуйте! Давайте создадим вашу анкету работодателя.\n\nГотовы начать?",
@@ -81,13 +83,16 @@ async def process_contact_phone(message: Message, state: FSMContext):
 
 # ---------- Шаг 3: город ----------
 @router.message(EmployerStates.city)
-async def process_company_city(message: Message, state: FSMContext):
+async def process_company_city(message: Message, state: FSMContext, session: AsyncSession):
     city = message.text.strip()
     if len(city) < 2:
         await message.answer("❌ Введите корректный город.")
         return
 
-    await state.update_data(city=city)
+    # Приводим город к справочнику ("СПб", "Питер" -> Санкт-Петербург)
+    city_id, city = await Repository.resolve_city(city, session=session)
+
+    await state.update_data(city=city, city_id=city_id)
     await state.set_state(EmployerStates.vacancy_title)
     await message.answer("❓ Какую должность вы предлагаете?")
 
@@ -166,47 +171,38 @@ async def process_needed(message: Message, state: FSMContext):
 
 
 # ---------- Подтверждение: Да ----------
-@router.callback_query(F.data == "employer_confirm_yes")
-async def employer_confirm_yes(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(EmployerStates.confirm, F.data == "employer_confirm_yes")
+async def employer_confirm_yes(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
 
     try:
-        # 1. Находим юзера (user.id — нужен для employer.user_id)
-        user = await Repository.get_user_by_telegram_id(callback.from_user.id)
-        if not user:
-            user = await Repository.create_user(
-                telegram_id=callback.from_user.id,
-                role="employer",
-                username=callback.from_user.username
-            )
-
-        # 2. Находим профиль работодателя
-        employer = await Repository.get_employer_by_user_id(user.id)
-
-        if not employer:
-            employer = await Repository.create_employer(
-                user_id=user.id,
-                company_name=data["company_name"],
-                city=data["city"],
-                company_info=f"Контакт: {data['contact_phone']}",
-                requirements=data["vacancy_requirements"]
-            )
-
-        # 3. Создаем вакансию
-        await Repository.create_vacancy(
-            employer_id=employer.id,
-            position=data["vacancy_title"],
+        # 1. Юзер, профиль работодателя (если его еще нет) и вакансия —
+        #    одним INSERT с CTE в одной транзакции
+        vacancy = await Repository.create_vacancy_with_employer(
+            telegram_id=callback.from_user.id,
+            username=callback.from_user.username,
+            company_name=data["company_name"],
             city=data["city"],
+            company_info=f"Контакт: {data['contact_phone']}",
+            employer_requirements=data["vacancy_requirements"],
+            position=data["vacancy_title"],
+            city_id=data.get("city_id"),
             salary=data["vacancy_salary"],
             requirements=data["vacancy_requirements"],
-            count_needed=data["vacancy_needed"]
+            count_needed=data["vacancy_needed"],
+            session=session
         )
 
+        # 2. Скоры по всем кандидатам считаем в фоне
+        schedule_vacancy_scoring(vacancy.id, session=session)
+
         await callback.message.edit_text(
             "🎉 Вакансия успешно сохранена!\nОжидайте подбор кандидатов."
         )
 
     except Exception as e:
+        # Ничего из начатого не сохраняем: анкета пишется целиком или никак
+        await rollback(session)
         await callback.message.edit_text(f"❌ Ошибка при сохранении: {e}")
 
     finally:
@@ -215,10 +211,16 @@ async def employer_confirm_yes(callback: CallbackQuery, state: FSMContext):
 
 
 # ---------- Подтверждение: Нет ----------
-@router.callback_query(F.data == "employer_confirm_no")
+@router.callback_query(EmployerStates.confirm, F.data == "employer_confirm_no")
 async def employer_confirm_no(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await callback.message.edit_text(
         "❌ Создание вакансии отменено.\nВведите /employer_start, чтобы попробовать снова."
     )
     await callback.answer()
+
+
+# ---------- Повторное нажатие после сохранения или отмены ----------
+@router.callback_query(F.data.in_({"employer_confirm_yes", "employer_confirm_no"}))
+async def employer_confirm_stale(callback: CallbackQuery):
+    await callback.answer("Эта анкета уже обработана.")
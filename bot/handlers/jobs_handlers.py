@@ -0,0 +1,105 @@
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import JOBS_PAGE_SIZE
+from db.repository import Repository
+from db.vacancy_index import vacancy_index
+
+# Создаем маршрутизатор для ленты вакансий кандидата
+router = Router()
+
+
+# -------- Вспомогательная функция: клавиатура листания ленты --------
+def get_jobs_navigation_keyboard(page: int, has_next: bool):
+    """
+    Создает inline клавиатуру для листания страниц ленты вакансий.
+    """
+    kb = InlineKeyboardBuilder()
+
+    if page > 0:
+        kb.button(text="⬅️ Назад", callback_data=f"jobs_page_{page - 1}")
+    if has_next:
+        kb.button(text="➡️ Далее", callback_data=f"jobs_page_{page + 1}")
+
+    kb.adjust(2)
+    return kb.as_markup()
+
+
+# -------- Вспомогательная функция: страница ленты --------
+async def _render_page(telegram_id: int, page: int, session: AsyncSession):
+    """
+    Возвращает (текст, клавиатура) для страницы ленты кандидата.
+    Ранжирование идет по индексу вакансий в памяти, из БД читаются
+    только кандидат и вакансии текущей страницы.
+    """
+    user = await Repository.get_user_by_telegram_id(telegram_id, session=session)
+    candidate = await Repository.get_candidate_by_user_id(user.id, session=session) if user else None
+
+    if user and not candidate:
+        # Анкета могла уйти в архив за неактивностью — возвращаем ее
+        # (сначала чтение: у работодателей и новичков анкеты в архиве нет)
+        if user.role == 'candidate' and await Repository.has_archived_candidate(user.id, session=session):
+            candidate = await Repository.restore_candidate(user.id, session=session)
+    elif candidate:
+        Repository.touch_candidate(candidate)
+
+    if not candidate:
+        return (
+            "❌ У вас пока нет анкеты кандидата.\n\n"
+            "Заполните ее командой /start."
+        ), None
+
+    # -------- Ранжируем вакансии по индексу --------
+    ranked, total = vacancy_index.rank(candidate, limit=JOBS_PAGE_SIZE, offset=page * JOBS_PAGE_SIZE)
+
+    if not ranked:
+        if page == 0:
+            return (
+                "❌ Пока нет вакансий в вашем городе или по вашему опыту.\n\nЗагляните позже.", None
+            )
+        return "✅ Вакансии закончились.\n\nВы просмотрели все подходящие вакансии.", None
+
+    # -------- Загружаем вакансии страницы одним запросом --------
+    scores = dict(ranked)
+    vacancies = await Repository.get_vacancies_by_ids([vacancy_id for vacancy_id, _ in ranked], session=session)
+
+    lines = [f"💼 <b>Подходящие вакансии</b> ({total}):\n<i>в вашем городе или по вашему опыту</i>\n"]
+    for number, vacancy in enumerate(vacancies, start=page * JOBS_PAGE_SIZE + 1):
+        lines.append(
+            f"{number}. <b>{vacancy.position}</b>\n"
+            f"📍 {vacancy.city} | 💰 {vacancy.salary} руб.\n"
+            f"🎯 Совпадение: {scores[vacancy.id]}%\n"
+        )
+
+    has_next = (page + 1) * JOBS_PAGE_SIZE < total
+    return "\n".join(lines), get_jobs_navigation_keyboard(page, has_next)
+
+
+# -------- Команда /jobs: лента подходящих вакансий --------
+@router.message(Command("jobs"))
+async def cmd_jobs(message: Message, session: AsyncSession):
+    """
+    Показывает кандидату первую страницу подходящих ему вакансий.
+    """
+    text, keyboard = await _render_page(message.from_user.id, 0, session)
+    await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+
+
+# -------- Callback: листание ленты --------
+@router.callback_query(F.data.startswith("jobs_page_"))
+async def jobs_page(callback: CallbackQuery, session: AsyncSession):
+    """
+    Показывает запрошенную страницу ленты вакансий.
+    """
+    try:
+        page = max(int(callback.data.split("_")[2]), 0)
+    except (IndexError, ValueError):
+        await callback.answer("❌ Ошибка при обработке.", show_alert=True)
+        return
+
+    text, keyboard = await _render_page(callback.from_user.id, page, session)
+    await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    await callback.answer()
@@ -1,53 +1,66 @@
 from aiogram import Router, F
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.repository import Repository
-from bot.utils.scoring import calculate_score
+from bot.utils.precompute import schedule_vacancy_scoring
 
 # Создаем маршрутизатор для хендлеров подбора кандидатов
 router = Router()
 
-# Локальная переменная для хранения сессий подбора кандидатов
-# Ключ: user_id, значение: словарь с vacancy_id, index, candidates list
-match_sessions = {}
+
+# -------- Курсор подбора в callback_data --------
+class MatchCursor(CallbackData, prefix="mc"):
+    """
+    Положение в списке подбора, зашито прямо в кнопку (до 64 байт).
+    Сервер не хранит сессий: следующий кандидат ищется по ключу
+    (score, candidate_id) текущего, а номер и total нужны только для подписи.
+    """
+    action: str
+    vacancy_id: int
+    score: int
+    candidate_id: int
+    position: int
+    total: int
 
 
 # -------- Вспомогательная функция: создание клавиатуры для отображения кандидата --------
-def get_candidate_navigation_keyboard(has_next: bool = True):
+def get_candidate_navigation_keyboard(cursor: MatchCursor):
     """
     Создает inline клавиатуру для навигации по кандидатам.
     """
     kb = InlineKeyboardBuilder()
-    
-    if has_next:
-        kb.button(text="➡️ Далее", callback_data="match_next")
-    
-    kb.button(text="📱 Получить контакт", callback_data="match_contact")
+
+    if cursor.position < cursor.total:
+        kb.button(text="➡️ Далее", callback_data=cursor.model_copy(update={'action': 'next'}))
+
+    kb.button(text="📱 Получить контакт", callback_data=cursor.model_copy(update={'action': 'contact'}))
     kb.adjust(1)
-    
+
     return kb.as_markup()
 
 
 # -------- Вспомогательная функция: создание клавиатуры для подтверждения оферты --------
-def get_offer_confirmation_keyboard():
+def get_offer_confirmation_keyboard(cursor: MatchCursor):
     """
     Создает inline клавиатуру для подтверждения согласия с офертой.
     """
     kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Показать контакт", callback_data="match_contact_show")
-    kb.button(text="❌ Отмена", callback_data="match_cancel")
+    kb.button(text="✅ Показать контакт", callback_data=cursor.model_copy(update={'action': 'show'}))
+    kb.button(text="❌ Отмена", callback_data=cursor.model_copy(update={'action': 'cancel'}))
     kb.adjust(1)
-    
+
     return kb.as_markup()
 
 
 # -------- Callback: нажата кнопка "Подобрать кандидатов" --------
-@router.callback_query(F.data.startswith("match_"))
-async def start_matching(callback: CallbackQuery):
+@router.callback_query(F.data.regexp(r"^match_\d+$"))
+async def start_matching(callback: CallbackQuery, session: AsyncSession):
     """
     Начинает процесс подбора кандидатов для вакансии.
-    Получает vacancy_id, считает скоры, показывает первого кандидата.
+    Получает vacancy_id, показывает лучшего кандидата из предрасчитанных скоров.
     """
     # -------- Распарсиваем vacancy_id из callback_data --------
     try:
@@ -55,80 +68,59 @@ async def start_matching(callback: CallbackQuery):
     except (IndexError, ValueError):
         await callback.answer("❌ Ошибка при обработке.", show_alert=True)
         return
-    
-    user_id = callback.from_user.id
-    
+
     # -------- Получаем вакансию --------
-    vacancy = await Repository.get_vacancy_by_id(vacancy_id)
+    vacancy = await Repository.get_vacancy_by_id(vacancy_id, session=session)
     if not vacancy:
         await callback.answer("❌ Вакансия не найдена.", show_alert=True)
         return
-    
-    # -------- Получаем всех кандидатов --------
-    candidates = await Repository.get_all_candidates()
-    
-    if not candidates:
-        await callback.message.edit_text("❌ Нет зарегистрированных кандидатов.")
+
+    # -------- Скоры еще не считались (старая вакансия) — считаем в фоне --------
+    if vacancy.scores_refreshed_at is None:
+        schedule_vacancy_scoring(vacancy_id, session=session)
+        await callback.answer(
+            "⏳ Подбираем кандидатов для этой вакансии, попробуйте через минуту.", show_alert=True
+        )
         return
-    
-    # -------- Рассчитываем скоры для каждого кандидата --------
-    candidates_with_scores = []
-    for candidate in candidates:
-        score = await calculate_score(candidate, vacancy)
-        if score > 0:  # Добавляем только кандидатов с положительным скором
-            candidates_with_scores.append({
-                'candidate': candidate,
-                'score': score
-            })
-    
-    # -------- Сортируем по скору (выше — лучше) --------
-    candidates_with_scores.sort(key=lambda x: x['score'], reverse=True)
-    
-    if not candidates_with_scores:
+
+    # -------- Берем лучшего кандидата из предрасчитанных скоров --------
+    first = await Repository.get_next_candidate_score(vacancy_id, session=session)
+    if first is None:
         await callback.message.edit_text(
             "❌ Нет подходящих кандидатов для этой вакансии."
         )
+        await callback.answer()
         return
-    
-    # -------- Сохраняем сессию --------
-    match_sessions[user_id] = {
-        'vacancy_id': vacancy_id,
-        'index': 0,
-        'candidates': candidates_with_scores
-    }
-    
+
+    candidate_id, score = first
+    cursor = MatchCursor(
+        action='card',
+        vacancy_id=vacancy_id,
+        score=score,
+        candidate_id=candidate_id,
+        position=1,
+        total=await Repository.count_matching_candidates(vacancy_id, session=session)
+    )
+
     # -------- Показываем первого кандидата --------
-    await _show_candidate(callback.message, user_id)
+    await _show_candidate(callback.message, cursor, session)
     await callback.answer()
 
 
 # -------- Вспомогательная функция: показать кандидата --------
-async def _show_candidate(message, user_id):
+async def _show_candidate(message, cursor: MatchCursor, session: AsyncSession):
     """
-    Показывает текущего кандидата из сессии.
+    Показывает кандидата, на которого указывает курсор.
     """
-    if user_id not in match_sessions:
-        await message.edit_text("❌ Сессия истекла.")
-        return
-    
-    session = match_sessions[user_id]
-    candidates = session['candidates']
-    index = session['index']
-    
-    # -------- Проверяем, не вышли ли за границы списка --------
-    if index >= len(candidates):
-        await message.edit_text(
-            "✅ Кандидаты закончились.\n\n"
-            "Вы просмотрели всех подходящих кандидатов."
-        )
-        del match_sessions[user_id]
+    candidate = await Repository.get_candidate_by_id(cursor.candidate_id, session=session)
+
+    if candidate is None:
+        await message.edit_text("❌ Кандидат не найден.")
         return
-    
-    # -------- Получаем текущего кандидата и его скор --------
-    current_item = candidates[index]
-    candidate = current_item['candidate']
-    score = current_item['score']
-    
+
+    # Анкету смотрят работодатели — она востребована и не уходит в архив
+    Repository.touch_candidate(candidate)
+
     # -------- Формируем карточку кандидата --------
     candidate_card = (
         f"👤 <b>Имя:</b> {candidate.name}\n"
@@ -136,43 +128,55 @@ async def _show_candidate(message, user_id):
         f"📍 <b>Город:</b> {candidate.city}\n"
         f"💰 <b>Желаемая зарплата:</b> {candidate.expected_salary} руб.\n"
         f"💼 <b>Опыт:</b> {candidate.experience}\n"
-        f"🎯 <b>Совпадение:</b> {score}%\n\n"
-        f"<i>Кандидат {index + 1} из {len(candidates)}</i>"
+        f"🎯 <b>Совпадение:</b> {cursor.score}%\n\n"
+        f"<i>Кандидат {cursor.position} из {cursor.total}</i>"
     )
-    
-    # -------- Проверяем, есть ли еще кандидаты после текущего --------
-    has_next = (index + 1) < len(candidates)
-    
+
     await message.edit_text(
         candidate_card,
-        reply_markup=get_candidate_navigation_keyboard(has_next),
+        reply_markup=get_candidate_navigation_keyboard(cursor),
         parse_mode="HTML"
     )
 
 
 # -------- Callback: кнопка "Далее" — следующий кандидат --------
-@router.callback_query(F.data == "match_next")
-async def next_candidate(callback: CallbackQuery):
+@router.callback_query(MatchCursor.filter(F.action == "next"))
+async def next_candidate(callback: CallbackQuery, callback_data: MatchCursor, session: AsyncSession):
     """
-    Переходит к следующему кандидату в списке.
+    Переходит к следующему кандидату: первая пара после (score, candidate_id)
+    текущего в порядке убывания (один запрос по индексу на любой глубине).
     """
-    user_id = callback.from_user.id
-    
-    if user_id not in match_sessions:
-        await callback.answer("❌ Сессия истекла.", show_alert=True)
+    following = await Repository.get_next_candidate_score(
+        callback_data.vacancy_id, after=(callback_data.score, callback_data.candidate_id),
+        session=session
+    )
+
+    # -------- Проверяем, не закончился ли список --------
+    if following is None:
+        await callback.message.edit_text(
+            "✅ Кандидаты закончились.\n\n"
+            "Вы просмотрели всех подходящих кандидатов."
+        )
+        await callback.answer()
         return
-    
-    # -------- Увеличиваем индекс --------
-    match_sessions[user_id]['index'] += 1
-    
+
+    candidate_id, score = following
+    cursor = callback_data.model_copy(update={
+        'score': score,
+        'candidate_id': candidate_id,
+        # Скоры могли пересчитаться, пока работодатель листал
+        'position': callback_data.position + 1,
+        'total': max(callback_data.total, callback_data.position + 1),
+    })
+
     # -------- Показываем следующего кандидата --------
-    await _show_candidate(callback.message, user_id)
+    await _show_candidate(callback.message, cursor, session)
     await callback.answer()
 
 
 # -------- Callback: кнопка "Получить контакт" --------
-@router.callback_query(F.data == "match_contact")
-async def request_contact(callback: CallbackQuery):
+@router.callback_query(MatchCursor.filter(F.action == "contact"))
+async def request_contact(callback: CallbackQuery, callback_data: MatchCursor):
     """
     Показывает оферту и просит подтвердить согласие перед отправкой контакта.
     """
@@ -180,79 +184,53 @@ async def request_contact(callback: CallbackQuery):
         "📋 <b>Условия оферты:</b>\n\n"
         "Нажимая кнопку ниже, вы подтверждаете согласие с условиями оферты.\n\n"
         "Контакт кандидата будет отправлен в соответствии с политикой конфиденциальности.",
-        reply_markup=get_offer_confirmation_keyboard(),
+        reply_markup=get_offer_confirmation_keyboard(callback_data),
         parse_mode="HTML"
     )
     await callback.answer()
 
 
 # -------- Callback: кнопка "Показать контакт" --------
-@router.callback_query(F.data == "match_contact_show")
-async def show_contact(callback: CallbackQuery):
+@router.callback_query(MatchCursor.filter(F.action == "show"))
+async def show_contact(callback: CallbackQuery, callback_data: MatchCursor, session: AsyncSession):
     """
     Показывает номер телефона кандидата и сохраняет событие в БД.
     """
-    user_id = callback.from_user.id
-    
-    if user_id not in match_sessions:
-        await callback.answer("❌ Сессия истекла.", show_alert=True)
-        return
-    
-    session = match_sessions[user_id]
-    index = session['index']
-    candidates = session['candidates']
-    vacancy_id = session['vacancy_id']
-    
-    # -------- Проверяем границы --------
-    if index >= len(candidates):
+    # -------- Получаем кандидата --------
+    candidate = await Repository.get_candidate_by_id(callback_data.candidate_id, session=session)
+
+    if candidate is None:
         await callback.answer("❌ Кандидат не найден.", show_alert=True)
         return
-    
-    # -------- Получаем кандидата --------
-    current_item = candidates[index]
-    candidate = current_item['candidate']
-    score = current_item['score']
-    
-    try:
-        # -------- Сохраняем событие в БД --------
-        await Repository.add_match(
-            vacancy_id=vacancy_id,
-            candidate_id=candidate.id,
-            matching_score=score
-        )
-        
-        # -------- Показываем контакт --------
-        contact_message = (
-            f"✅ <b>Контакт кандидата:</b>\n\n"
-            f"📱 <b>Телефон:</b> <code>{candidate.phone}</code>\n"
-            f"👤 <b>Имя:</b> {candidate.name}\n\n"
-            f"<i>Контакт был сохранен в истории.</i>"
-        )
-        
-        await callback.message.edit_text(
-            contact_message,
-            parse_mode="HTML"
-        )
-        
-    except Exception as e:
-        await callback.message.edit_text(
-            f"❌ Ошибка при сохранении: {str(e)}"
-        )
-    
+
+    # -------- Сохраняем событие в БД (в фоне, пачкой с другими) --------
+    Repository.queue_match(
+        vacancy_id=callback_data.vacancy_id,
+        candidate_id=candidate.id,
+        matching_score=callback_data.score
+    )
+
+    # -------- Показываем контакт --------
+    contact_message = (
+        f"✅ <b>Контакт кандидата:</b>\n\n"
+        f"📱 <b>Телефон:</b> <code>{candidate.phone}</code>\n"
+        f"👤 <b>Имя:</b> {candidate.name}\n\n"
+        f"<i>Контакт будет сохранен в истории.</i>"
+    )
+
+    await callback.message.edit_text(
+        contact_message,
+        parse_mode="HTML"
+    )
+
     await callback.answer()
 
 
 # -------- Callback: кнопка "Отмена" --------
-@router.callback_query(F.data == "match_cancel")
-async def cancel_contact(callback: CallbackQuery):
+@router.callback_query(MatchCursor.filter(F.action == "cancel"))
+async def cancel_contact(callback: CallbackQuery, callback_data: MatchCursor, session: AsyncSession):
     """
     Отменяет запрос контакта и возвращается к карточке кандидата.
     """
-    user_id = callback.from_user.id
-    
-    if user_id in match_sessions:
-        await _show_candidate(callback.message, user_id)
-    else:
-        await callback.answer("❌ Сессия истекла.", show_alert=True)
-    
+    await _show_candidate(callback.message, callback_data, session)
     await callback.answer()
@@ -2,8 +2,10 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.repository import Repository
+from bot.utils.precompute import schedule_vacancy_scoring
 
 # Создаем маршрутизатор для хендлеров вакансий
 router = Router()
@@ -26,9 +28,37 @@ def get_vacancies_keyboard(vacancies):
     return kb.as_markup()
 
 
+# -------- Вспомогательная функция: клавиатура карточки вакансии --------
+def get_vacancy_actions_keyboard(vacancy):
+    """
+    Создает inline клавиатуру с действиями по вакансии:
+    для открытой — подбор и закрытие, для закрытой — повторное открытие.
+    """
+    kb = InlineKeyboardBuilder()
+    if vacancy.is_active is False:
+        kb.button(text="↩️ Открыть снова", callback_data=f"reopen_{vacancy.id}")
+    else:
+        kb.button(text="🔍 Подобрать кандидатов", callback_data=f"match_{vacancy.id}")
+        kb.button(text="🗂 Закрыть вакансию", callback_data=f"close_{vacancy.id}")
+    kb.adjust(1)
+    return kb.as_markup()
+
+
+# -------- Вспомогательная функция: работодатель, нажавший кнопку --------
+async def _get_employer_id(telegram_id: int, session: AsyncSession) -> int | None:
+    """
+    Возвращает id профиля работодателя пользователя или None.
+    """
+    user = await Repository.get_user_by_telegram_id(telegram_id, session=session)
+    if not user:
+        return None
+    employer = await Repository.get_employer_by_user_id(user.id, session=session)
+    return employer.id if employer else None
+
+
 # -------- Команда /vacancies: показать список вакансий работодателя --------
 @router.message(Command("vacancies"))
-async def cmd_vacancies(message: Message):
+async def cmd_vacancies(message: Message, session: AsyncSession):
     """
     Показывает список всех вакансий текущего работодателя.
     Если вакансий нет - предлагает создать новую.
@@ -36,7 +66,7 @@ async def cmd_vacancies(message: Message):
     telegram_id = message.from_user.id
     
     # -------- Проверяем, существует ли пользователь --------
-    user = await Repository.get_user_by_telegram_id(telegram_id)
+    user = await Repository.get_user_by_telegram_id(telegram_id, session=session)
     
     if not user:
         await message.answer(
@@ -54,7 +84,7 @@ async def cmd_vacancies(message: Message):
         return
     
     # -------- Получаем профиль работодателя --------
-    employer = await Repository.get_employer_by_user_id(user.id)
+    employer = await Repository.get_employer_by_user_id(user.id, session=session)
     
     if not employer:
         await message.answer(
@@ -64,7 +94,7 @@ async def cmd_vacancies(message: Message):
         return
     
     # -------- Получаем список вакансий работодателя --------
-    vacancies = await Repository.get_vacancies_by_employer(employer.id)
+    vacancies = await Repository.get_vacancy_list_by_employer(employer.id, session=session)
     
     if not vacancies:
         await message.answer(
@@ -83,7 +113,7 @@ async def cmd_vacancies(message: Message):
 
 # -------- Callback: показать карточку вакансии --------
 @router.callback_query(F.data.startswith("vacancy_"))
-async def show_vacancy_details(callback: CallbackQuery):
+async def show_vacancy_details(callback: CallbackQuery, session: AsyncSession):
     """
     Показывает подробную информацию о выбранной вакансии.
     Парсит vacancy_id из callback_data и получает данные из БД.
@@ -96,7 +126,7 @@ async def show_vacancy_details(callback: CallbackQuery):
         return
     
     # -------- Получаем данные вакансии из БД --------
-    vacancy = await Repository.get_vacancy_by_id(vacancy_id)
+    vacancy = await Repository.get_vacancy_by_id(vacancy_id, session=session)
     
     if not vacancy:
         await callback.answer(
@@ -117,6 +147,55 @@ async def show_vacancy_details(callback: CallbackQuery):
     # -------- Показываем карточку --------
     await callback.message.edit_text(
         vacancy_card,
+        reply_markup=get_vacancy_actions_keyboard(vacancy),
         parse_mode="HTML"
     )
     await callback.answer()
+
+
+# -------- Callback: закрыть вакансию --------
+@router.callback_query(F.data.regexp(r"^close_\d+$"))
+async def close_vacancy(callback: CallbackQuery, session: AsyncSession):
+    """
+    Закрывает вакансию: она больше не участвует в подборе и ленте /jobs,
+    а через VACANCY_ARCHIVE_DAYS уходит в архив.
+    """
+    vacancy_id = int(callback.data.split("_")[1])
+
+    employer_id = await _get_employer_id(callback.from_user.id, session)
+    if employer_id is None or not await Repository.close_vacancy(vacancy_id, employer_id, session=session):
+        await callback.answer("❌ Вакансия не найдена или уже закрыта.", show_alert=True)
+        return
+
+    kb = InlineKeyboardBuilder()
+    kb.button(text="↩️ Открыть снова", callback_data=f"reopen_{vacancy_id}")
+
+    await callback.message.edit_text(
+        "🗂 Вакансия закрыта.\n\n"
+        "Кандидаты ее больше не увидят.",
+        reply_markup=kb.as_markup()
+    )
+    await callback.answer()
+
+
+# -------- Callback: открыть вакансию снова --------
+@router.callback_query(F.data.regexp(r"^reopen_\d+$"))
+async def reopen_vacancy(callback: CallbackQuery, session: AsyncSession):
+    """
+    Снова открывает закрытую вакансию (в том числе уже ушедшую в архив)
+    и ставит в фон пересчет ее скоров.
+    """
+    vacancy_id = int(callback.data.split("_")[1])
+
+    employer_id = await _get_employer_id(callback.from_user.id, session)
+    if employer_id is None or not await Repository.reopen_vacancy(vacancy_id, employer_id, session=session):
+        await callback.answer("❌ Вакансия не найдена или уже открыта.", show_alert=True)
+        return
+
+    schedule_vacancy_scoring(vacancy_id, session=session)
+
+    await callback.message.edit_text(
+        "✅ Вакансия снова открыта.\n\n"
+        "Список вакансий — /vacancies"
+    )
+    await callback.answer()
@@ -0,0 +1,51 @@
+"""
+Одна сессия БД на апдейт (unit of work).
+
+Хендлер получает session и передает ее в Repository: все запросы
+апдейта идут в одной транзакции через одно соединение из пула, а в конце
+middleware один раз коммитит (или откатывает при исключении).
+AsyncSession берет соединение только при первом запросе, поэтому
+апдейты без обращения к БД пул не занимают.
+"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from db.database import AsyncSessionLocal
+from db.routing import primary_window
+from db.session import commit, rollback
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Открывает AsyncSession на время обработки апдейта и кладет ее в data['session'].
+
+    Args:
+        session_factory: фабрика AsyncSession
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        async with self.session_factory() as session:
+            # Пользователь недавно писал — читаем из primary, реплика могла отстать
+            if user is not None and primary_window.active(user.id):
+                session.info['primary'] = True
+            data['session'] = session
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await rollback(session)
+                raise
+            await commit(session)
+            if user is not None and session.info.get('wrote'):
+                primary_window.touch(user.id)
+            return result
@@ -0,0 +1,56 @@
+"""
+Метрики хендлеров: латентность, время в БД, число запросов и ошибки.
+
+Регистрируется как внутренний middleware на событиях диспетчера
+(dp.message, dp.callback_query) — там уже известен выбранный хендлер,
+а middleware диспетчера действуют и на хендлеры вложенных роутеров.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from metrics.registry import COUNT_BUCKETS, UpdateStats, current_update, registry
+
+HANDLER_SECONDS = registry.histogram(
+    "hrbot_handler_seconds", "Время обработки апдейта хендлером", ("handler",)
+)
+HANDLER_DB_SECONDS = registry.histogram(
+    "hrbot_handler_db_seconds", "Суммарное время SQL-запросов за апдейт", ("handler",)
+)
+HANDLER_DB_QUERIES = registry.histogram(
+    "hrbot_handler_db_queries", "Число SQL-запросов за апдейт", ("handler",), buckets=COUNT_BUCKETS
+)
+HANDLER_ERRORS = registry.counter(
+    "hrbot_handler_errors_total", "Апдейты, хендлер которых завершился исключением", ("handler",)
+)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет хендлер апдейта (метка handler — имя функции хендлера).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get('handler')
+        name = getattr(handler_object.callback, '__name__', 'unknown') if handler_object else 'unknown'
+
+        stats = UpdateStats()
+        token = current_update.set(stats)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, name)
+            HANDLER_DB_SECONDS.observe(stats.db_seconds, name)
+            HANDLER_DB_QUERIES.observe(stats.queries, name)
+            current_update.reset(token)
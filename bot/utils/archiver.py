@@ -0,0 +1,88 @@
+"""
+Периодический перенос устаревших строк из рабочих таблиц в архив (*_archive).
+
+Подбор, пересчет скоров и индексы в памяти работают только с рабочими
+таблицами, поэтому их объем должен зависеть от текущего спроса, а не от
+истории. Раз в ARCHIVE_INTERVAL секунд в архив уходят:
+- события подбора старше MATCH_ARCHIVE_DAYS;
+- вакансии, закрытые больше VACANCY_ARCHIVE_DAYS назад;
+- анкеты кандидатов без активности CANDIDATE_ARCHIVE_DAYS.
+
+Перенос идет пачками по ARCHIVE_BATCH_SIZE строк, каждая в своей транзакции.
+Анкета возвращается из архива, когда кандидат снова заходит в /jobs,
+вакансия — когда работодатель открывает ее снова.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from config import (
+    ARCHIVE_BATCH_SIZE, CANDIDATE_ARCHIVE_DAYS, MATCH_ARCHIVE_DAYS, VACANCY_ARCHIVE_DAYS,
+)
+from db.repository import Repository
+from metrics.registry import registry
+from bot.utils.executor import scoring_executor
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_ROWS = registry.counter(
+    "hrbot_archived_rows_total", "Строки, перенесенные в архив", ("table",)
+)
+
+
+async def archive_stale() -> dict[str, int]:
+    """
+    Переносит в архив все устаревшие строки (события — первыми: пока на
+    вакансию или кандидата ссылаются события, они остаются на месте).
+
+    Returns:
+        dict[str, int]: таблица -> сколько строк перенесено
+    """
+    now = datetime.utcnow()
+
+    moved = {
+        'matched_candidates': await _drain(
+            Repository.archive_match_events, now - timedelta(days=MATCH_ARCHIVE_DAYS)
+        ),
+        'vacancies': await _drain(
+            Repository.archive_vacancies, now - timedelta(days=VACANCY_ARCHIVE_DAYS)
+        ),
+        'candidates': await _drain(
+            Repository.archive_candidates, now - timedelta(days=CANDIDATE_ARCHIVE_DAYS)
+        ),
+    }
+
+    # Снимок признаков для пула процессов содержит ушедших кандидатов
+    if moved['candidates']:
+        scoring_executor.invalidate()
+
+    for table, count in moved.items():
+        ARCHIVED_ROWS.inc(table, amount=count)
+    return moved
+
+
+async def run_periodically(interval: float) -> None:
+    """
+    Запускает archive_stale раз в interval секунд (до отмены задачи).
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            moved = await archive_stale()
+        except Exception:
+            logger.exception("Ошибка архивирования")
+            continue
+        if any(moved.values()):
+            logger.info("Перенесено в архив: %s", moved)
+
+
+async def _drain(archive, cutoff: datetime) -> int:
+    """
+    Вызывает archive(cutoff, ARCHIVE_BATCH_SIZE), пока пачки полные.
+    """
+    total = 0
+    while True:
+        moved = len(await archive(cutoff, ARCHIVE_BATCH_SIZE))
+        total += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            return total
@@ -0,0 +1,223 @@
+"""
+Вынос тяжелого скоринга из event loop бота в пул процессов.
+
+Пока один работодатель ждет подбор по большому пулу кандидатов, остальные
+апдейты (включая простой /start) должны обрабатываться без задержек.
+Поэтому пакетный скоринг больших пулов выполняется в ProcessPoolExecutor
+через run_in_executor, а массивы признаков кандидатов один раз кладутся
+в разделяемую память (снимок) и переиспользуются воркерами между задачами.
+"""
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import SCORING_WORKERS, SCORING_OFFLOAD_THRESHOLD
+from db.repository import Repository
+from bot.utils.scoring import CandidatePool, calculate_scores_batch, score_pool
+
+logger = logging.getLogger(__name__)
+
+# Поля пула, которые нужны воркеру для score_pool
+_SNAPSHOT_FIELDS = ('ids', 'city_codes', 'salaries', 'ready')
+
+
+class FeatureSnapshot:
+    """
+    Снимок признаков кандидатов: CandidatePool в процессе бота
+    плюс копия его массивов в разделяемой памяти для воркеров.
+
+    Снимок освобождается, только когда он заменен новым и на нем
+    не осталось незавершенных задач.
+    """
+
+    def __init__(self, pool: CandidatePool, version: int):
+        self.pool = pool
+        self.version = version
+        self.descriptor = {}  # поле -> (имя блока, shape, dtype)
+        self._blocks = []
+        self._in_flight = 0
+        self._retired = False
+
+    def publish(self) -> None:
+        """
+        Копирует массивы пула в разделяемую память (один раз на снимок).
+        """
+        if self.descriptor:
+            return
+        for field in _SNAPSHOT_FIELDS:
+            array = getattr(self.pool, field)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self._blocks.append(block)
+            self.descriptor[field] = (block.name, array.shape, array.dtype.str)
+
+    def acquire(self) -> None:
+        self._in_flight += 1
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        if self._retired and self._in_flight == 0:
+            self._close()
+
+    def retire(self) -> None:
+        self._retired = True
+        if self._in_flight == 0:
+            self._close()
+
+    def _close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+        self.descriptor = {}
+
+
+class ScoringExecutor:
+    """
+    Пул процессов для пакетного скоринга плюс актуальный снимок кандидатов.
+
+    Пулы меньше offload_threshold считаются прямо в event loop (дешевле,
+    чем передача задачи); большие — в процессе-воркере.
+    """
+
+    def __init__(self, workers: int, offload_threshold: int):
+        self.workers = workers
+        self.offload_threshold = offload_threshold
+        self._executor = None
+        self._snapshot = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """
+        Помечает снимок устаревшим (кандидаты добавлены или изменены).
+        Новый снимок строится при следующем скоринге.
+        """
+        self._version += 1
+
+    async def score_vacancy(self, vacancy, experience_ids) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Считает скоры всех кандидатов снимка для вакансии.
+
+        Args:
+            vacancy: объект Vacancy из БД
+            experience_ids: отсортированные id кандидатов с совпадением опыта
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (id кандидатов, скоры) в порядке снимка
+        """
+        snapshot = await self._current_snapshot()
+        pool = snapshot.pool
+
+        if self.workers <= 0 or len(pool) < self.offload_threshold:
+            return pool.ids, calculate_scores_batch(vacancy, pool, experience_ids=experience_ids)
+
+        snapshot.publish()
+        snapshot.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            scores = await loop.run_in_executor(
+                self._get_executor(),
+                _score_in_worker,
+                snapshot.descriptor,
+                snapshot.version,
+                pool.vacancy_city_code(vacancy),
+                vacancy.salary,
+                np.asarray(experience_ids, dtype=np.int64),
+            )
+        finally:
+            snapshot.release()
+        return pool.ids, scores
+
+    def shutdown(self) -> None:
+        """
+        Останавливает воркеры и освобождает разделяемую память.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._snapshot is not None:
+            self._snapshot.retire()
+            self._snapshot = None
+
+    async def _current_snapshot(self) -> FeatureSnapshot:
+        async with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                version = self._version
+                candidates = await Repository.get_candidate_scan_features()
+                # Сборка пула и копирование в разделяемую память — проход по всем
+                # кандидатам; делаем это в потоке, чтобы не останавливать event loop
+                loop = asyncio.get_running_loop()
+                snapshot = await loop.run_in_executor(
+                    None, _build_snapshot, candidates, version,
+                    self.workers > 0 and len(candidates) >= self.offload_threshold,
+                )
+
+                if self._snapshot is not None:
+                    self._snapshot.retire()
+                self._snapshot = snapshot
+            return self._snapshot
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            logger.info("Запускаем пул скоринга: %s процесс(ов)", self.workers)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+
+def _build_snapshot(candidates, version: int, publish: bool) -> FeatureSnapshot:
+    """
+    Строит снимок из кандидатов (выполняется в потоке, вне event loop).
+    """
+    pool = CandidatePool.from_candidates(candidates, with_experience=False)
+    snapshot = FeatureSnapshot(pool, version)
+    if publish:
+        snapshot.publish()
+    return snapshot
+
+
+# -------- Код, выполняемый в процессе-воркере --------
+
+# Снимок, к которому подключен воркер: (версия, блоки памяти, пул)
+_attached = None
+
+
+def _attach(descriptor: dict, version: int) -> CandidatePool:
+    """
+    Подключается к массивам снимка в разделяемой памяти (один раз на версию).
+    """
+    global _attached
+    if _attached is not None and _attached[0] == version:
+        return _attached[2]
+
+    if _attached is not None:
+        for block in _attached[1]:
+            block.close()
+
+    blocks = []
+    arrays = {}
+    for field, (name, shape, dtype) in descriptor.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    empty = np.zeros(0, dtype=np.int32)
+    pool = CandidatePool(
+        token_rows=empty, token_ids=empty, cities={}, vocabulary=[], **arrays
+    )
+    _attached = (version, blocks, pool)
+    return pool
+
+
+def _score_in_worker(descriptor: dict, version: int, city_code: int, salary: float,
+                     experience_ids: np.ndarray) -> np.ndarray:
+    pool = _attach(descriptor, version)
+    experience = np.isin(pool.ids, experience_ids, assume_unique=True)
+    return score_pool(pool, city_code, salary, experience)
+
+
+# Общий исполнитель процесса бота
+scoring_executor = ScoringExecutor(SCORING_WORKERS, SCORING_OFFLOAD_THRESHOLD)
@@ -0,0 +1,190 @@
+"""
+Хранилище состояний aiogram (FSM) в Postgres.
+
+Анкеты кандидатов и работодателей переживают перезапуск бота и видны
+всем процессам. Чтобы не удваивать число запросов к БД на каждое сообщение:
+- шаг анкеты делает update_data + set_state; оба изменения копятся в памяти
+  и пишутся одним INSERT ... ON CONFLICT чуть позже (FSM_FLUSH_DELAY);
+- прочитанные состояния кэшируются в процессе на FSM_CACHE_TTL секунд.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from config import FSM_CACHE_TTL, FSM_FLUSH_DELAY
+from db.database import PrimarySessionLocal
+from db.models import FsmRecord
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """
+    Закэшированное состояние одного ключа.
+    """
+    __slots__ = ('state', 'data', 'loaded_at')
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any]):
+        self.state = state
+        self.data = data
+        self.loaded_at = time.monotonic()
+
+
+class PostgresStorage(BaseStorage):
+    """
+    BaseStorage поверх таблицы fsm_states и общего async engine.
+
+    Args:
+        session_factory: фабрика AsyncSession (primary: состояние читается
+            сразу после записи, отставание реплики недопустимо)
+        flush_delay: сколько секунд копить изменения перед записью
+        cache_ttl: сколько секунд доверять прочитанному из БД состоянию
+    """
+
+    def __init__(self, session_factory=PrimarySessionLocal,
+                 flush_delay: float = FSM_FLUSH_DELAY, cache_ttl: float = FSM_CACHE_TTL):
+        self.session_factory = session_factory
+        self.flush_delay = flush_delay
+        self.cache_ttl = cache_ttl
+        self._cache = {}  # StorageKey -> _Entry
+        self._dirty = set()  # ключи с незаписанными изменениями
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+
+    # -------- Интерфейс BaseStorage --------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = data.copy()
+        self._mark_dirty(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._entry(key)).data.copy()
+
+    async def close(self) -> None:
+        """
+        Записывает накопленные изменения (вызывать при остановке бота).
+        """
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
+
+    # -------- Запись --------
+    async def flush(self) -> None:
+        """
+        Записывает все накопленные изменения одной транзакцией:
+        непустые состояния — upsert, очищенные — удаление строки.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            keys, self._dirty = self._dirty, set()
+
+            now = datetime.utcnow()
+            rows = []
+            cleared = []
+            for key in keys:
+                entry = self._cache[key]
+                if entry.state is None and not entry.data:
+                    cleared.append(_primary_key(key))
+                else:
+                    rows.append({**_columns(key), 'state': entry.state, 'data': entry.data.copy(), 'updated_at': now})
+
+            try:
+                async with self.session_factory() as session:
+                    if rows:
+                        stmt = insert(FsmRecord)
+                        await session.execute(stmt.on_conflict_do_update(
+                            index_elements=list(FsmRecord.__table__.primary_key.columns),
+                            set_={
+                                'state': stmt.excluded.state,
+                                'data': stmt.excluded.data,
+                                'updated_at': stmt.excluded.updated_at,
+                            }
+                        ), rows)
+                    if cleared:
+                        await session.execute(delete(FsmRecord).where(
+                            tuple_(*FsmRecord.__table__.primary_key.columns).in_(cleared)
+                        ))
+                    await session.commit()
+            except Exception:
+                # Не теряем изменения: запишем вместе со следующими
+                self._dirty |= keys
+                logger.exception("Не удалось записать состояния FSM (%s ключей)", len(keys))
+                return
+
+            self._evict_stale()
+
+    def _mark_dirty(self, key: StorageKey) -> None:
+        # Свежая запись этого процесса — самое актуальное состояние ключа
+        self._cache[key].loaded_at = time.monotonic()
+        self._dirty.add(key)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        await self.flush()
+
+    # -------- Чтение --------
+    async def _entry(self, key: StorageKey) -> _Entry:
+        """
+        Состояние ключа из кэша, а если его нет или оно устарело — из БД.
+        Ключи с незаписанными изменениями всегда берутся из кэша.
+        """
+        entry = self._cache.get(key)
+        if entry is not None and (key in self._dirty or time.monotonic() - entry.loaded_at < self.cache_ttl):
+            return entry
+
+        async with self.session_factory() as session:
+            stmt = select(FsmRecord.state, FsmRecord.data).where(
+                *(getattr(FsmRecord, name) == value for name, value in _columns(key).items())
+            )
+            row = (await session.execute(stmt)).first()
+
+        # Пока шел запрос, ключ мог измениться в этом процессе
+        entry = self._cache.get(key)
+        if entry is not None and key in self._dirty:
+            return entry
+
+        entry = _Entry(row.state, dict(row.data)) if row else _Entry(None, {})
+        self._cache[key] = entry
+        return entry
+
+    def _evict_stale(self) -> None:
+        now = time.monotonic()
+        stale = [
+            key for key, entry in self._cache.items()
+            if key not in self._dirty and now - entry.loaded_at >= self.cache_ttl
+        ]
+        for key in stale:
+            del self._cache[key]
+
+
+def _columns(key: StorageKey) -> dict:
+    return {
+        'bot_id': key.bot_id,
+        'chat_id': key.chat_id,
+        'user_id': key.user_id,
+        'thread_id': key.thread_id or 0,
+        'destiny': key.destiny,
+    }
+
+
+def _primary_key(key: StorageKey) -> tuple:
+    return tuple(_columns(key).values())
@@ -0,0 +1,61 @@
+"""
+Перестройка индексов в памяти процесса из БД.
+
+vacancy_index и experience_index обновляются Repository после коммита
+только в том процессе, который сделал запись. При старте бота индексы
+строятся из БД. Если бот запущен в нескольких процессах, остальные
+процессы узнают о чужих изменениях только из периодической перестройки:
+ее включает INDEX_REFRESH_INTERVAL (по умолчанию выключена: в одном
+процессе индексы и так точные). Тогда чужие изменения видны с задержкой
+не больше INDEX_REFRESH_INTERVAL.
+
+Изменения этого процесса, сделанные, пока шло чтение из БД, перестройка
+не перетирает (см. begin_refresh / finish_refresh у индексов).
+
+Кэш сущностей (db/entity_cache.py) здесь не сбрасывается: чужие
+изменения в нем видны через ENTITY_CACHE_TTL.
+"""
+import asyncio
+import logging
+
+from bot.utils.executor import scoring_executor
+from db.repository import Repository
+from db.token_index import experience_index
+from db.vacancy_index import vacancy_index
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_indexes() -> None:
+    """
+    Строит индексы опыта и вакансий заново по текущим данным БД.
+
+    Сама перестройка синхронная, поэтому хендлеры видят либо старый
+    индекс, либо новый целиком.
+    """
+    experience_index.begin_refresh()
+    vacancy_index.begin_refresh()
+    try:
+        candidates = await Repository.get_candidate_features()
+        vacancies = await Repository.get_vacancy_features()
+    except BaseException:
+        experience_index.cancel_refresh()
+        vacancy_index.cancel_refresh()
+        raise
+
+    experience_index.finish_refresh(candidates)
+    vacancy_index.finish_refresh(vacancies)
+    # Признаки кандидатов могли поменять другие процессы
+    scoring_executor.invalidate()
+
+
+async def run_periodically(interval: float) -> None:
+    """
+    Запускает rebuild_indexes раз в interval секунд (до отмены задачи).
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebuild_indexes()
+        except Exception:
+            logger.exception("Ошибка перестройки индексов")
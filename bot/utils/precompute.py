@@ -0,0 +1,157 @@
+"""
+Фоновый предрасчет скоров кандидат ↔ вакансия (таблица candidate_scores).
+Изменение анкеты кандидата и создание вакансии только ставят задачу,
+сам пересчет идет в фоне и не увеличивает время ответа пользователю.
+"""
+import asyncio
+import logging
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import MATCH_SCAN_CHUNK_SIZE, MATCH_SCORING_BACKEND
+from db.repository import Repository, candidate_change_hooks
+from db.routing import primary_reads
+from db.session import after_commit
+from db.token_index import experience_index
+from bot.utils.executor import scoring_executor
+from bot.utils.scoring import CandidatePool, calculate_score, calculate_scores_batch, rank_scores
+
+logger = logging.getLogger(__name__)
+
+# Бэкенды, которые считают скоры в процессе бота
+_PYTHON_BACKENDS = ("python", "stream")
+
+# Ссылки на запущенные задачи, чтобы их не собрал сборщик мусора
+_background_tasks = set()
+
+
+# -------- Постановка задач в фон --------
+def schedule_vacancy_scoring(vacancy_id: int, session: AsyncSession = None) -> None:
+    """
+    Ставит в фон пересчет скоров новой вакансии по всем кандидатам.
+
+    Args:
+        vacancy_id: ID вакансии
+        session: сессия апдейта, в которой создана вакансия; пересчет
+            запустится после ее коммита, иначе фон не увидит вакансию
+    """
+    _schedule(session, lambda: _spawn(score_vacancy(vacancy_id), f"vacancy {vacancy_id}"))
+
+
+def schedule_candidate_scoring(candidate_id: int, session: AsyncSession = None) -> None:
+    """
+    Ставит в фон пересчет скоров кандидата по всем активным вакансиям.
+
+    Args:
+        candidate_id: ID кандидата
+        session: сессия апдейта, в которой создан кандидат
+    """
+    def start():
+        # Снимок признаков для пула процессов больше не актуален
+        scoring_executor.invalidate()
+        _spawn(score_candidate(candidate_id), f"candidate {candidate_id}")
+
+    _schedule(session, start)
+
+
+# Создание, правка и возврат анкеты из архива ставят пересчет сами (Repository)
+candidate_change_hooks.append(schedule_candidate_scoring)
+
+
+async def drain() -> None:
+    """
+    Дожидается завершения всех фоновых пересчетов (при остановке бота).
+    """
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+
+
+# -------- Пересчет --------
+async def score_vacancy(vacancy_id: int) -> None:
+    """
+    Пересчитывает скоры вакансии: в Postgres (MATCH_SCORING_BACKEND=sql)
+    или пакетным скорингом в процессе бота (MATCH_SCORING_BACKEND=python / stream).
+    """
+    if MATCH_SCORING_BACKEND not in _PYTHON_BACKENDS:
+        await Repository.refresh_vacancy_scores(vacancy_id)
+        return
+
+    vacancy = await Repository.get_vacancy_by_id(vacancy_id)
+    if not vacancy:
+        return
+
+    # Совпадение опыта берем из инвертированного индекса, а не из текста
+    experience_ids = experience_index.lookup(vacancy.requirements)
+
+    if MATCH_SCORING_BACKEND == "stream":
+        await Repository.replace_vacancy_scores_streaming(vacancy_id, score_chunks(vacancy, experience_ids))
+        return
+
+    # Большие пулы считаются в процессе-воркере, чтобы не блокировать бота
+    ids, scores = await scoring_executor.score_vacancy(vacancy, experience_ids)
+    ranked = [(int(ids[i]), int(scores[i])) for i in rank_scores(scores)]
+    await Repository.replace_vacancy_scores(vacancy_id, ranked)
+
+
+async def score_chunks(vacancy, experience_ids, chunk_size: int = MATCH_SCAN_CHUNK_SIZE):
+    """
+    Скорит кандидатов пачками прямо из курсора БД и отдает положительные
+    скоры каждой пачки: в памяти одна пачка, сколько бы ни было кандидатов,
+    а event loop освобождается между пачками.
+
+    Yields:
+        list[tuple[int, int]]: пары (candidate_id, score) пачки
+    """
+    experience_ids = np.asarray(experience_ids, dtype=np.int64)
+    async for chunk in Repository.stream_candidate_features(chunk_size):
+        pool = CandidatePool.from_candidates(chunk, with_experience=False)
+        scores = calculate_scores_batch(vacancy, pool, experience_ids=experience_ids)
+        yield [(int(pool.ids[i]), int(scores[i])) for i in np.flatnonzero(scores > 0)]
+
+
+async def score_candidate(candidate_id: int) -> None:
+    """
+    Пересчитывает скоры кандидата по всем активным вакансиям.
+    """
+    if MATCH_SCORING_BACKEND not in _PYTHON_BACKENDS:
+        await Repository.refresh_candidate_scores(candidate_id)
+        return
+
+    candidate = await Repository.get_candidate_by_id(candidate_id)
+    if not candidate:
+        return
+
+    scores = []
+    for vacancy in await Repository.get_vacancy_features():
+        score = await calculate_score(candidate, vacancy)
+        if score > 0:
+            scores.append((vacancy.id, score))
+
+    await Repository.replace_candidate_scores(candidate_id, scores)
+
+
+async def _on_primary(coro) -> None:
+    # Пересчет запускается сразу после коммита кандидата / вакансии:
+    # реплика могла еще не получить эти строки, поэтому читаем из primary
+    with primary_reads():
+        await coro
+
+
+def _schedule(session, start) -> None:
+    if session is None:
+        start()
+    else:
+        after_commit(session, start)
+
+
+def _spawn(coro, description: str) -> None:
+    task = asyncio.create_task(_on_primary(coro))
+    _background_tasks.add(task)
+
+    def _done(finished: asyncio.Task) -> None:
+        _background_tasks.discard(finished)
+        if not finished.cancelled() and finished.exception() is not None:
+            logger.error("Ошибка пересчета скоров (%s)", description, exc_info=finished.exception())
+
+    task.add_done_callback(_done)
@@ -2,13 +2,19 @@
 Модуль для расчета совпадения между кандидатом и вакансией.
 Используется для ранжирования кандидатов по релевантности.
 """
+import re
+
+import numpy as np
+
+from db.features import city_ref, is_ready_soon, requirement_tokens, tokenize
+from db.scoring_rules import scoring_rules
 
 
 async def calculate_score(candidate, vacancy) -> int:
     """
     Рассчитывает процент совпадения между кандидатом и вакансией.
     
-    Критерии оценки:
+    Критерии и веса задаются в config/scoring_rules.json (по умолчанию):
     +40 если города совпадают
     +25 если ожидаемая зарплата кандидата <= предложенной зарплате
     +25 если требования вакансии содержат ключевые слова из опыта кандидата
@@ -16,6 +22,11 @@ async def calculate_score(candidate, vacancy) -> int:
     
     Максимальный результат: 100 (100% совпадение)
     
+    Проверки выполняет функция, сгенерированная из правил при запуске
+    (db/scoring_rules.py). Она использует производные признаки (city_id,
+    city_key, experience_tokens, ready_soon, requirement_tokens), посчитанные
+    при записи строки, а для строк, где их еще нет, разбирает исходные поля.
+    
     Args:
         candidate: объект Candidate из БД
         vacancy: объект Vacancy из БД
@@ -23,25 +34,7 @@ async def calculate_score(candidate, vacancy) -> int:
     Returns:
         int: число от 0 до 100 (процент совпадения)
     """
-    score = 0
-    
-    # -------- Критерий 1: города совпадают --------
-    if candidate.city.lower() == vacancy.city.lower():
-        score += 40
-    
-    # -------- Критерий 2: зарплата подходит --------
-    if candidate.expected_salary <= vacancy.salary:
-        score += 25
-    
-    # -------- Критерий 3: требования соответствуют опыту --------
-    score += _check_experience_match(candidate.experience, vacancy.requirements)
-    
-    # -------- Критерий 4: кандидат готов скоро --------
-    if _is_ready_soon(candidate.ready_date):
-        score += 10
-    
-    # Возвращаем минимум 100%, чтобы не превысить максимум
-    return min(score, 100)
+    return _score_pair(candidate, vacancy)
 
 
 def _check_experience_match(experience: str, requirements: str) -> int:
@@ -71,41 +64,250 @@ def _check_experience_match(experience: str, requirements: str) -> int:
     return 0
 
 
-def _is_ready_soon(ready_date: str) -> bool:
+def _check_token_match(experience_tokens, requirement_tokens) -> int:
     """
-    Проверяет, готов ли кандидат выйти на работу в ближайшее время.
-    
-    Распознает:
-    - "завтра", "скоро", "неделю", "день", "дней", "дня"
-    - или пустую строку (если готов немедленно)
+    То же, что _check_experience_match, но по заранее разобранным словам.
+    Слово требований без пробелов входит в текст опыта тогда и только тогда,
+    когда входит в одно из его слов.
     
     Args:
-        ready_date: дата доступности в виде строки
+        experience_tokens: уникальные слова опыта кандидата
+        requirement_tokens: слова требований вакансии (от 3 символов)
     
     Returns:
-        bool: True если готов скоро, False иначе
+        int: 0 если нет совпадений, 25 если есть совпадение
     """
-    ready_lower = ready_date.lower()
-    
-    # Ключевые слова, которые означают скорую готовность
-    ready_keywords = [
-        "завтра",
-        "скоро",
-        "неделю",
-        "день",
-        "дней",
-        "дня",
-        "немедленно",
-        "сразу"
-    ]
-    
-    # Проверяем наличие ключевых слов
-    for keyword in ready_keywords:
-        if keyword in ready_lower:
-            return True
+    for word in requirement_tokens:
+        for token in experience_tokens:
+            if word in token:
+                return 25
     
-    # Если что-то указано, то кандидат готов
-    if ready_date and ready_date.strip():
-        return True
-    
-    return False
+    return 0
+
+
+def _is_ready_soon(ready_date: str) -> bool:
+    """
+    Проверяет, готов ли кандидат выйти на работу в ближайшее время.
+    Правила распознавания — в db.features.is_ready_soon.
+    """
+    return is_ready_soon(ready_date)
+
+
+# -------- Производные признаки с запасным разбором исходных полей --------
+def _city_ref(entity):
+    """
+    Город для сравнения: id из справочника, а для строк без city_id —
+    нормализованное название (см. db.features.city_ref).
+    """
+    return city_ref(entity)
+
+
+def _experience_tokens(candidate) -> list[str]:
+    if candidate.experience_tokens is not None:
+        return candidate.experience_tokens
+    return tokenize(candidate.experience)
+
+
+def _requirement_tokens(vacancy) -> list[str]:
+    if vacancy.requirement_tokens is not None:
+        return vacancy.requirement_tokens
+    return requirement_tokens(vacancy.requirements)
+
+
+def _is_candidate_ready(candidate) -> bool:
+    if candidate.ready_soon is not None:
+        return candidate.ready_soon
+    return _is_ready_soon(candidate.ready_date)
+
+
+def _experience_matches(candidate, vacancy) -> bool:
+    if candidate.experience_tokens is not None and vacancy.requirement_tokens is not None:
+        return _check_token_match(candidate.experience_tokens, vacancy.requirement_tokens) > 0
+    return _check_experience_match(candidate.experience, vacancy.requirements) > 0
+
+
+# Скоринг пары, скомпилированный из правил (см. calculate_score)
+_score_pair = scoring_rules.compile_python({
+    '_city_ref': _city_ref,
+    '_experience_matches': _experience_matches,
+    '_is_candidate_ready': _is_candidate_ready,
+})
+
+
+# -------- Пакетный (векторный) скоринг --------
+
+class CandidatePool:
+    """
+    Колоночное представление кандидатов для пакетного скоринга.
+
+    Вместо списка объектов Candidate хранит признаки в массивах NumPy:
+    - ids: id кандидатов
+    - city_codes: код города (индекс в словаре city_id / нормализованных названий)
+    - salaries: ожидаемая зарплата
+    - ready: флаг "готов скоро"
+    - token_rows / token_ids: разреженная матрица "кандидат × слово опыта"
+      (для каждого вхождения — строка кандидата и id слова в словаре)
+
+    Словарь слов опыта хранится одной строкой, чтобы поиск подстроки
+    по всему словарю выполнялся на C-скорости, а не циклом Python.
+    """
+
+    def __init__(self, ids, city_codes, salaries, ready, token_rows, token_ids,
+                 cities: dict, vocabulary: list):
+        self.ids = ids
+        self.city_codes = city_codes
+        self.salaries = salaries
+        self.ready = ready
+        self.token_rows = token_rows
+        self.token_ids = token_ids
+        self.cities = cities
+        self.vocabulary = vocabulary
+
+        # Все слова словаря через "\n" + смещения начала каждого слова
+        self._vocabulary_text = "\n".join(vocabulary)
+        lengths = np.fromiter((len(token) + 1 for token in vocabulary), dtype=np.int64, count=len(vocabulary))
+        self._vocabulary_offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(vocabulary) else lengths
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_candidates(cls, candidates, with_experience: bool = True) -> "CandidatePool":
+        """
+        Строит пул из объектов Candidate (один проход по списку).
+
+        Args:
+            candidates: последовательность объектов Candidate из БД
+            with_experience: разбирать ли опыт на слова; можно отключить,
+                если совпадение опыта берется из ExperienceIndex
+
+        Returns:
+            CandidatePool: колоночный пул кандидатов
+        """
+        cities = {}
+        vocabulary = {}
+        ids = []
+        city_codes = []
+        salaries = []
+        ready = []
+        token_rows = []
+        token_ids = []
+
+        for row, candidate in enumerate(candidates):
+            ids.append(candidate.id)
+            city_codes.append(cities.setdefault(_city_ref(candidate), len(cities)))
+            salaries.append(candidate.expected_salary)
+            ready.append(_is_candidate_ready(candidate))
+
+            if not with_experience:
+                continue
+            for token in _experience_tokens(candidate):
+                token_rows.append(row)
+                token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+
+        return cls(
+            ids=np.asarray(ids, dtype=np.int64),
+            city_codes=np.asarray(city_codes, dtype=np.int32),
+            salaries=np.asarray(salaries, dtype=np.float64),
+            ready=np.asarray(ready, dtype=bool),
+            token_rows=np.asarray(token_rows, dtype=np.int32),
+            token_ids=np.asarray(token_ids, dtype=np.int32),
+            cities=cities,
+            vocabulary=list(vocabulary),
+        )
+
+    def city_code(self, city_ref) -> int:
+        """
+        Возвращает код города (city_id или нормализованное название) в пуле
+        или -1, если такого города нет.
+        """
+        return self.cities.get(city_ref, -1)
+
+    def vacancy_city_code(self, vacancy) -> int:
+        """
+        Возвращает код города вакансии в пуле или -1.
+        """
+        return self.city_code(_city_ref(vacancy))
+
+    def experience_mask(self, requirement_words) -> np.ndarray:
+        """
+        Для каждого кандидата определяет, встречается ли в его опыте
+        хотя бы одно слово из требований (те же правила, что и в
+        _check_experience_match: поиск подстроки).
+
+        Слово требований не содержит пробелов, поэтому оно входит в текст
+        опыта тогда и только тогда, когда входит в одно из слов опыта.
+        Значит достаточно один раз найти подходящие слова словаря и
+        отметить кандидатов, у которых они есть.
+
+        Args:
+            requirement_words: слова требований вакансии (от 3 символов)
+
+        Returns:
+            np.ndarray: булев массив длины len(pool)
+        """
+        vocabulary_hits = np.zeros(len(self.vocabulary), dtype=bool)
+
+        for word in requirement_words:
+            for found in re.finditer(re.escape(word), self._vocabulary_text):
+                token_id = np.searchsorted(self._vocabulary_offsets, found.start(), side="right") - 1
+                vocabulary_hits[token_id] = True
+
+        mask = np.zeros(len(self), dtype=bool)
+        if vocabulary_hits.any():
+            mask[self.token_rows[vocabulary_hits[self.token_ids]]] = True
+        return mask
+
+
+def calculate_scores_batch(vacancy, pool: CandidatePool, experience_ids=None) -> np.ndarray:
+    """
+    Рассчитывает скоры всех кандидатов пула для вакансии за один векторный проход.
+    Критерии и веса совпадают с calculate_score.
+
+    Args:
+        vacancy: объект Vacancy из БД
+        pool: колоночный пул кандидатов
+        experience_ids: отсортированные id кандидатов, чей опыт совпадает
+            с требованиями (например, из ExperienceIndex.lookup); если не
+            передан, совпадение считается по словам опыта в пуле
+
+    Returns:
+        np.ndarray: массив int (0..100), по одному скору на кандидата пула
+    """
+    if not scoring_rules.uses("experience_match"):
+        experience = None
+    elif experience_ids is None:
+        experience = pool.experience_mask(_requirement_tokens(vacancy))
+    else:
+        experience = np.isin(pool.ids, np.asarray(experience_ids, dtype=np.int64), assume_unique=True)
+
+    return score_pool(pool, pool.vacancy_city_code(vacancy), vacancy.salary, experience)
+
+
+def score_pool(pool: CandidatePool, city_code: int, salary: float, experience: np.ndarray) -> np.ndarray:
+    """
+    Векторный проход по массивам пула, когда признаки вакансии уже
+    переведены в термины пула (код города, маска совпадения опыта).
+    Не обращается к словарям пула, поэтому работает и в процессе-воркере.
+    Сам проход сгенерирован из правил скоринга (db/scoring_rules.py).
+
+    Args:
+        pool: колоночный пул кандидатов
+        city_code: код города вакансии в пуле (-1, если города нет в пуле)
+        salary: предложенная зарплата
+        experience: булев массив совпадения опыта по кандидатам пула
+            (None, если критерий experience_match не используется)
+
+    Returns:
+        np.ndarray: массив int (0..100), по одному скору на кандидата пула
+    """
+    return scoring_rules.score_arrays(pool, city_code, salary, experience)
+
+
+def rank_scores(scores: np.ndarray) -> np.ndarray:
+    """
+    Возвращает позиции кандидатов с положительным скором,
+    отсортированные по убыванию скора (при равенстве — в исходном порядке).
+    """
+    positive = np.flatnonzero(scores > 0)
+    return positive[np.argsort(-scores[positive], kind="stable")]
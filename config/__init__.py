@@ -0,0 +1,84 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------- Подбор кандидатов --------
+# Где считать скоры для таблицы candidate_scores: "sql" — в Postgres
+# (INSERT ... SELECT), "python" — пакетным скорингом в процессе бота,
+# "stream" — пакетным скорингом по кандидатам, читаемым из БД пачками
+MATCH_SCORING_BACKEND = os.getenv("MATCH_SCORING_BACKEND", "sql")
+
+# Сколько кандидатов читать из БД за одну пачку (MATCH_SCORING_BACKEND=stream)
+MATCH_SCAN_CHUNK_SIZE = int(os.getenv("MATCH_SCAN_CHUNK_SIZE", "5000"))
+
+# -------- Лента вакансий кандидата (/jobs) --------
+# Сколько вакансий показывать на одной странице
+JOBS_PAGE_SIZE = int(os.getenv("JOBS_PAGE_SIZE", "5"))
+
+# Правила скоринга (критерии и веса), см. db/scoring_rules.py
+SCORING_RULES_PATH = os.getenv(
+    "SCORING_RULES_PATH", os.path.join(os.path.dirname(__file__), "scoring_rules.json")
+)
+
+# -------- Хранилище состояний анкет (aiogram FSM) --------
+# "postgres" — таблица fsm_states (переживает перезапуск), "memory" — в памяти процесса
+FSM_STORAGE = os.getenv("FSM_STORAGE", "postgres")
+
+# Сколько секунд копить изменения состояния перед записью в БД
+FSM_FLUSH_DELAY = float(os.getenv("FSM_FLUSH_DELAY", "0.05"))
+
+# Сколько секунд доверять прочитанному из БД состоянию
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "2"))
+
+# -------- Пул процессов для скоринга (MATCH_SCORING_BACKEND=python) --------
+# Количество процессов-воркеров; 0 — считать в процессе бота
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
+# С какого размера пула кандидатов скоринг уходит в процесс-воркер
+SCORING_OFFLOAD_THRESHOLD = int(os.getenv("SCORING_OFFLOAD_THRESHOLD", "20000"))
+
+# -------- Реплика для чтения (DATABASE_REPLICA_URL, см. db/routing.py) --------
+# Сколько секунд после записи пользователь читает из primary
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# -------- Кэш сущностей в памяти (db/entity_cache.py) --------
+# Сколько объектов каждого вида держать в кэше
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+
+# Сколько секунд объект в кэше считается свежим
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "60"))
+
+# -------- Отложенная запись событий (db/write_buffer.py) --------
+# Сколько секунд копить строки перед записью пачкой
+WRITE_BUFFER_FLUSH_DELAY = float(os.getenv("WRITE_BUFFER_FLUSH_DELAY", "0.2"))
+
+# При стольких строках в буфере запись начинается сразу
+WRITE_BUFFER_MAX_BATCH = int(os.getenv("WRITE_BUFFER_MAX_BATCH", "500"))
+
+# -------- Индексы в памяти (bot/utils/index_refresher.py) --------
+# Как часто перестраивать индексы из БД, секунд; 0 — не перестраивать.
+# Нужно, только если бот запущен в нескольких процессах: изменения,
+# сделанные другими процессами, видны с этой задержкой
+INDEX_REFRESH_INTERVAL = float(os.getenv("INDEX_REFRESH_INTERVAL", "0"))
+
+# -------- Архивирование (bot/utils/archiver.py) --------
+# Как часто переносить устаревшие строки в архив, секунд; 0 — не переносить
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+# Через сколько дней без активности анкета кандидата уходит в архив
+CANDIDATE_ARCHIVE_DAYS = int(os.getenv("CANDIDATE_ARCHIVE_DAYS", "180"))
+
+# Через сколько дней после закрытия вакансия уходит в архив
+VACANCY_ARCHIVE_DAYS = int(os.getenv("VACANCY_ARCHIVE_DAYS", "30"))
+
+# Через сколько дней событие подбора (matched_candidates) уходит в архив
+MATCH_ARCHIVE_DAYS = int(os.getenv("MATCH_ARCHIVE_DAYS", "90"))
+
+# Сколько строк переносить за одну транзакцию
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+# -------- Метрики (Prometheus, GET /metrics) --------
+# Адрес и порт сервера метрик; METRICS_PORT=0 — не запускать
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9101"))
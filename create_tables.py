@@ -6,12 +6,16 @@ if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from db.database import engine
-from db.models import Base
+from db.migrations import SCHEMA_VERSION, migrate
+from db.cities import seed_city_gazetteer
 
 async def create_tables():
-    print(">>> Создаем таблицы...")
+    print(">>> Применяем миграции схемы...")
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print(">>> Таблицы успешно созданы!")
+        applied = await migrate(conn)
+        await seed_city_gazetteer(conn)
+    if applied:
+        print(f">>> Применены миграции: {', '.join(map(str, applied))}")
+    print(f">>> Схема актуальна (версия {SCHEMA_VERSION})")
 
 asyncio.run(create_tables())
@@ -0,0 +1,155 @@
+"""
+Справочник городов: приводит свободный ввод ("СПб", "Питер", "г. Москва")
+к id канонического города. Скоринг потом сравнивает целые city_id.
+
+Порядок разрешения:
+1. локальный кэш процесса (ключ написания -> (city_id, название), см. Repository.resolve_city);
+2. точное совпадение в city_aliases (уникальный индекс);
+3. нечеткий поиск по триграммам (pg_trgm, GIN-индекс по city_aliases.alias);
+4. иначе город неизвестен: city_id = None, и скоринг сравнивает
+   нормализованное название (city_key), как для строк без city_id.
+
+Справочник пополняется только из CITY_GAZETTEER: ввод пользователей его
+не меняет. Нечеткое совпадение не становится псевдонимом (ошибочное
+совпадение стало бы точным и навсегда), а запоминается только в кэше
+процесса.
+"""
+import re
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+from db.features import normalize_city
+from db.models import City, CityAlias
+
+# Минимальная триграммная похожесть, чтобы считать ввод опечаткой известного города
+CITY_SIMILARITY_THRESHOLD = 0.5
+
+# Сколько разрешенных написаний держать в памяти процесса
+CITY_CACHE_SIZE = 10000
+
+# Каноническое название -> известные варианты написания
+CITY_GAZETTEER = {
+    "Москва": ["мск", "moscow", "msk", "масква"],
+    "Санкт-Петербург": ["спб", "питер", "петербург", "с-пб", "ленинград", "spb", "saint petersburg"],
+    "Новосибирск": ["нск", "новосиб"],
+    "Екатеринбург": ["екб", "ебург", "екат"],
+    "Казань": ["kazan"],
+    "Нижний Новгород": ["нн", "нижний", "н.новгород"],
+    "Челябинск": ["челяба"],
+    "Красноярск": ["крск"],
+    "Самара": [],
+    "Уфа": [],
+    "Ростов-на-Дону": ["ростов", "рнд"],
+    "Омск": [],
+    "Краснодар": ["крд"],
+    "Воронеж": [],
+    "Пермь": [],
+    "Волгоград": [],
+    "Саратов": [],
+    "Тюмень": [],
+    "Тольятти": [],
+    "Ижевск": [],
+    "Барнаул": [],
+    "Ульяновск": [],
+    "Иркутск": [],
+    "Хабаровск": [],
+    "Ярославль": [],
+    "Владивосток": ["владик"],
+    "Махачкала": [],
+    "Томск": [],
+    "Оренбург": [],
+    "Кемерово": [],
+    "Калининград": [],
+    "Сочи": [],
+    "Минск": [],
+    "Алматы": ["алма-ата", "алмата"],
+    "Астана": ["нур-султан"],
+    "Ташкент": [],
+    "Бишкек": [],
+}
+
+_CITY_PREFIX_RE = re.compile(r"^(?:г\.|г |город )\s*")
+
+# Кэш: ключ написания -> (city_id, каноническое название)
+_resolved = {}
+
+
+def city_alias_key(city: str) -> str:
+    """
+    Ключ написания города: нормализованный город без "г."/"город" и с пробелами вместо дефисов.
+    """
+    key = normalize_city(city)
+    key = _CITY_PREFIX_RE.sub("", key)
+    return " ".join(key.replace("-", " ").split())
+
+
+def cached_city(city: str) -> tuple[int | None, str] | None:
+    """
+    Возвращает уже разрешенный в этом процессе город без обращения к БД.
+    """
+    return _resolved.get(city_alias_key(city))
+
+
+def remember_city(city: str, resolved: tuple[int | None, str]) -> None:
+    """
+    Запоминает разрешенный город (вызывать после коммита транзакции).
+    """
+    if len(_resolved) >= CITY_CACHE_SIZE:
+        _resolved.clear()
+    _resolved[city_alias_key(city)] = resolved
+
+
+async def resolve_city(session, city: str) -> tuple[int | None, str]:
+    """
+    Разрешает введенный город в (city_id, каноническое название).
+    Справочник не меняется: неизвестный город возвращается как (None, ввод).
+
+    Args:
+        session: AsyncSession
+        city: город в свободной форме
+
+    Returns:
+        tuple[int | None, str]: id города и его каноническое название
+            или None и введенное название без краевых пробелов
+    """
+    key = city_alias_key(city)
+
+    # -------- Точное совпадение написания --------
+    stmt = select(City.id, City.name).join(CityAlias, CityAlias.city_id == City.id).where(CityAlias.alias == key)
+    row = (await session.execute(stmt)).first()
+
+    # -------- Нечеткий поиск по триграммам --------
+    if row is None:
+        similarity = func.similarity(CityAlias.alias, key)
+        stmt = select(City.id, City.name).join(CityAlias, CityAlias.city_id == City.id).where(
+            CityAlias.alias.op('%')(key),
+            similarity >= CITY_SIMILARITY_THRESHOLD
+        ).order_by(similarity.desc()).limit(1)
+        row = (await session.execute(stmt)).first()
+
+    # -------- Неизвестный город — без id, скоринг сравнит названия --------
+    if row is None:
+        return None, city.strip()
+
+    city_id, name = row
+    return city_id, name
+
+
+async def seed_city_gazetteer(conn) -> None:
+    """
+    Загружает справочник городов и их написаний (безопасно запускать повторно).
+
+    Args:
+        conn: AsyncConnection внутри транзакции (engine.begin())
+    """
+    for name, aliases in CITY_GAZETTEER.items():
+        await conn.execute(insert(City).values(name=name).on_conflict_do_nothing(index_elements=[City.name]))
+        city_id = (await conn.execute(select(City.id).where(City.name == name))).scalar_one()
+
+        keys = {city_alias_key(name), *(city_alias_key(alias) for alias in aliases)}
+        await conn.execute(
+            insert(CityAlias).on_conflict_do_nothing(index_elements=[CityAlias.alias]),
+            [{'alias': key, 'city_id': city_id} for key in sorted(keys)]
+        )
+
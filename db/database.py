@@ -4,27 +4,56 @@ from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
+from db.instrumentation import TimedQueuePool, instrument_engine
+from db.routing import RoutingSession
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Главное: обязательно asyncpg
-ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+# Реплика только для чтения (необязательно), см. db/routing.py
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+
+def _create_engine(url: str):
+    # Главное: обязательно asyncpg
+    async_url = url.replace("postgresql://", "postgresql+asyncpg://")
+    # Лог SQL включается DB_ECHO=1; время запросов — в метриках /metrics
+    created = create_async_engine(
+        async_url,
+        echo=os.getenv("DB_ECHO", "0") == "1",
+        future=True,
+        poolclass=TimedQueuePool
+    )
+    instrument_engine(created)
+    return created
 
-# Engine
-engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=True,
-    future=True
-)
 
-# Async session factory
-AsyncSessionLocal = sessionmaker(
+# Engine (primary)
+engine = _create_engine(DATABASE_URL)
+
+# Engine реплики (без реплики — тот же primary)
+replica_engine = _create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
+
+# Сессии только с primary: миграции, состояния FSM, чтение сразу после записи
+PrimarySessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+# Async session factory: с репликой чтения идут в нее, запись — в primary
+if replica_engine is engine:
+    AsyncSessionLocal = PrimarySessionLocal
+else:
+    AsyncSessionLocal = sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        primary=engine.sync_engine,
+        replica=replica_engine.sync_engine,
+        expire_on_commit=False,
+    )
+
 # Для зависимостей
 async def get_session():
     async with AsyncSessionLocal() as session:
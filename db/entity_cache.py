@@ -0,0 +1,104 @@
+"""
+Read-through кэш сущностей в памяти процесса (TTL + LRU).
+
+Repository сначала смотрит в кэш, при промахе читает из БД и кладет
+найденный объект в кэш после коммита своей транзакции. Методы, которые
+меняют сущность, сбрасывают ее ключ тоже после коммита.
+
+Чтение, начатое до сброса, не должно вернуть в кэш старое значение,
+поэтому put принимает токен, взятый до запроса в БД: если с тех пор был
+сброс, значение не кэшируется. Отсутствующие в БД ключи не кэшируются.
+
+Сброс действует только в своем процессе: если бот запущен в нескольких
+процессах, изменения, сделанные другим процессом, видны здесь через
+ENTITY_CACHE_TTL секунд.
+
+Объекты в кэше отсоединены от сессии (expire_on_commit=False): их можно
+читать, но не изменять и не добавлять в другую сессию.
+"""
+import time
+from collections import OrderedDict
+
+from config import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
+from metrics.registry import registry
+
+ENTITY_CACHE_REQUESTS = registry.counter(
+    "hrbot_entity_cache_requests_total", "Обращения к кэшу сущностей", ("cache", "result")
+)
+
+
+class EntityCache:
+    """
+    Кэш одного вида сущностей.
+
+    Args:
+        name: имя (метка cache в метриках)
+        max_size: сколько объектов держать; лишние вытесняются по LRU
+        ttl: сколько секунд объект считается свежим
+    """
+
+    def __init__(self, name: str, max_size: int = ENTITY_CACHE_SIZE, ttl: float = ENTITY_CACHE_TTL):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()  # ключ -> (объект, время записи)
+        self._generation = 0  # растет при каждом сбросе
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key):
+        """
+        Объект по ключу или None (нет в кэше или устарел).
+        """
+        item = self._items.get(key)
+        if item is not None and time.monotonic() - item[1] < self.ttl:
+            self._items.move_to_end(key)
+            self.hits += 1
+            ENTITY_CACHE_REQUESTS.inc(self.name, "hit")
+            return item[0]
+
+        if item is not None:
+            del self._items[key]
+        self.misses += 1
+        ENTITY_CACHE_REQUESTS.inc(self.name, "miss")
+        return None
+
+    def token(self) -> int:
+        """
+        Токен для put: брать до чтения из БД.
+        """
+        return self._generation
+
+    def put(self, key, value, token: int) -> None:
+        """
+        Кладет объект, если после взятия токена не было сбросов.
+        """
+        if token != self._generation:
+            return
+        self._items[key] = (value, time.monotonic())
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        """
+        Сбрасывает ключ (и отменяет незавершенные put).
+        """
+        self._generation += 1
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Сбрасывает весь кэш.
+        """
+        self._generation += 1
+        self._items.clear()
+
+
+# Кэши процесса
+user_cache = EntityCache("users")  # telegram_id -> User
+employer_cache = EntityCache("employers")  # id -> Employer
+vacancy_cache = EntityCache("vacancies")  # id -> Vacancy
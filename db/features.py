@@ -0,0 +1,200 @@
+"""
+Производные признаки кандидатов и вакансий для скоринга.
+Считаются один раз при записи строки (Repository) и хранятся в отдельных колонках,
+чтобы подбор сравнивал готовые значения, а не разбирал строки на каждый клик.
+"""
+import re
+from datetime import date, timedelta
+
+# Ключевые слова, которые означают скорую готовность
+READY_KEYWORDS = [
+    "завтра",
+    "скоро",
+    "неделю",
+    "день",
+    "дней",
+    "дня",
+    "немедленно",
+    "сразу"
+]
+
+# Слова, которые переводятся в конкретное число дней
+_READY_WORD_DAYS = {
+    "сразу": 0,
+    "немедленно": 0,
+    "сейчас": 0,
+    "сегодня": 0,
+    "завтра": 1,
+    "послезавтра": 2,
+}
+
+# Единицы периода ("через 2 недели", "через месяц")
+_READY_UNIT_DAYS = (
+    ("дн", 1),
+    ("ден", 1),
+    ("нед", 7),
+    ("мес", 30),
+)
+
+_PERIOD_RE = re.compile(r"(?:через\s+)?(\d+)?\s*\b(дн\w*|день|нед\w*|мес\w*)")
+_DATE_RE = re.compile(r"(\d{1,2})\.(\d{1,2})(?:\.(\d{2,4}))?")
+
+# Минимальная длина слова требований (как в _check_experience_match)
+MIN_REQUIREMENT_WORD = 3
+
+
+# -------- Город --------
+# Символы, которые str.split() считает пробельными (все лежат до U+3000).
+# SQL-вариант normalize_city схлопывает ровно их: \s в регулярках Postgres
+# зависит от локали базы и может не совпасть с Python.
+CITY_WHITESPACE = "".join(ch for ch in map(chr, range(0x3001)) if ch.isspace())
+
+
+def normalize_city(city: str) -> str:
+    """
+    Нормализованный ключ города: нижний регистр, "ё" -> "е", один пробел между словами.
+    """
+    return " ".join(city.lower().replace("ё", "е").split())
+
+
+def city_ref(entity):
+    """
+    Город для сравнения: id из справочника, а для строк без city_id —
+    нормализованное название.
+    """
+    if entity.city_id is not None:
+        return entity.city_id
+    return entity.city_key if entity.city_key is not None else normalize_city(entity.city)
+
+
+# -------- Слова опыта и требований --------
+def tokenize(text: str) -> list[str]:
+    """
+    Отсортированный список уникальных слов текста в нижнем регистре.
+    """
+    return sorted(set(text.lower().split()))
+
+
+def requirement_tokens(text: str) -> list[str]:
+    """
+    Уникальные слова требований, участвующие в скоринге (от 3 символов).
+    """
+    return [word for word in tokenize(text) if len(word) >= MIN_REQUIREMENT_WORD]
+
+
+# -------- Готовность кандидата --------
+def is_ready_soon(ready_date: str) -> bool:
+    """
+    Проверяет, готов ли кандидат выйти на работу в ближайшее время.
+
+    Распознает:
+    - "завтра", "скоро", "неделю", "день", "дней", "дня"
+    - или пустую строку (если готов немедленно)
+
+    Args:
+        ready_date: дата доступности в виде строки
+
+    Returns:
+        bool: True если готов скоро, False иначе
+    """
+    ready_lower = ready_date.lower()
+
+    # Проверяем наличие ключевых слов
+    for keyword in READY_KEYWORDS:
+        if keyword in ready_lower:
+            return True
+
+    # Если что-то указано, то кандидат готов
+    if ready_date and ready_date.strip():
+        return True
+
+    return False
+
+
+def parse_ready_from(ready_date: str, today: date | None = None) -> date | None:
+    """
+    Переводит свободный текст готовности в дату выхода.
+
+    Понимает "сразу"/"сегодня"/"завтра", периоды ("через 2 недели",
+    "через месяц", "3 дня") и даты "дд.мм" или "дд.мм.гггг".
+
+    Args:
+        ready_date: дата доступности в виде строки
+        today: дата отсчета (по умолчанию сегодня)
+
+    Returns:
+        date | None: дата выхода или None, если текст не распознан
+    """
+    today = today or date.today()
+    ready_lower = ready_date.lower().strip()
+
+    for word in ready_lower.replace(",", " ").split():
+        if word in _READY_WORD_DAYS:
+            return today + timedelta(days=_READY_WORD_DAYS[word])
+
+    match = _DATE_RE.search(ready_lower)
+    if match:
+        day, month, year = match.groups()
+        if year is None:
+            year = today.year
+        elif len(year) == 2:
+            year = 2000 + int(year)
+        try:
+            parsed = date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+        # "01.02" без года в прошлом — значит следующий год
+        if match.group(3) is None and parsed < today:
+            parsed = parsed.replace(year=parsed.year + 1)
+        return max(parsed, today)
+
+    match = _PERIOD_RE.search(ready_lower)
+    if match:
+        count = int(match.group(1) or 1)
+        unit = match.group(2)
+        for prefix, days in _READY_UNIT_DAYS:
+            if unit.startswith(prefix):
+                return today + timedelta(days=count * days)
+
+    return None
+
+
+# -------- Наборы признаков для записи в БД --------
+def candidate_features(**fields) -> dict:
+    """
+    Считает производные колонки кандидата по переданным исходным полям.
+    Поля, которые не переданы, не пересчитываются (удобно для update_candidate).
+
+    Args:
+        **fields: city, experience, ready_date (любое подмножество)
+
+    Returns:
+        dict: значения для колонок city_key, experience_tokens, ready_soon, ready_from
+    """
+    features = {}
+    if fields.get('city') is not None:
+        features['city_key'] = normalize_city(fields['city'])
+    if fields.get('experience') is not None:
+        features['experience_tokens'] = tokenize(fields['experience'])
+    if fields.get('ready_date') is not None:
+        features['ready_soon'] = is_ready_soon(fields['ready_date'])
+        features['ready_from'] = parse_ready_from(fields['ready_date'])
+    return features
+
+
+def vacancy_features(**fields) -> dict:
+    """
+    Считает производные колонки вакансии по переданным исходным полям.
+
+    Args:
+        **fields: city, requirements (любое подмножество)
+
+    Returns:
+        dict: значения для колонок city_key, requirement_tokens
+    """
+    features = {}
+    if fields.get('city') is not None:
+        features['city_key'] = normalize_city(fields['city'])
+    if fields.get('requirements') is not None:
+        features['requirement_tokens'] = requirement_tokens(fields['requirements'])
+    return features
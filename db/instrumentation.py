@@ -0,0 +1,112 @@
+"""
+Метрики слоя БД: время и ошибки SQL-запросов, ожидание соединения
+из пула и латентность методов Repository.
+
+Хуки SQLAlchemy заодно копят число запросов и время в БД для текущего
+апдейта (metrics.registry.current_update) — по ним видно, упирается
+хендлер в БД или в CPU.
+"""
+import functools
+import inspect
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from metrics.registry import current_update, registry
+
+DB_QUERY_SECONDS = registry.histogram(
+    "hrbot_db_query_seconds", "Время выполнения SQL-запроса", ("operation",)
+)
+DB_QUERY_ERRORS = registry.counter(
+    "hrbot_db_query_errors_total", "SQL-запросы, завершившиеся ошибкой", ("operation",)
+)
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "hrbot_db_pool_checkout_seconds", "Ожидание соединения из пула"
+)
+REPOSITORY_SECONDS = registry.histogram(
+    "hrbot_repository_seconds", "Время выполнения метода Repository", ("method",)
+)
+REPOSITORY_ERRORS = registry.counter(
+    "hrbot_repository_errors_total", "Методы Repository, завершившиеся исключением", ("method",)
+)
+
+
+# -------- Пул соединений --------
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который замеряет ожидание свободного соединения.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+# -------- SQL-запросы --------
+def instrument_engine(engine) -> None:
+    """
+    Вешает хуки замера SQL-запросов на engine (AsyncEngine или Engine).
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    DB_QUERY_SECONDS.observe(elapsed, _operation(statement))
+
+    stats = current_update.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(context):
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+    DB_QUERY_ERRORS.inc(_operation(context.statement or ""))
+
+
+def _operation(statement: str) -> str:
+    # SELECT / INSERT / UPDATE / DELETE / WITH ... — без текста запроса,
+    # чтобы число рядов метрики не зависело от запросов
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+# -------- Repository --------
+def instrument_repository(cls):
+    """
+    Оборачивает асинхронные staticmethod класса замером латентности и ошибок
+    (метка method — имя метода). Возвращает сам класс.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if isinstance(attribute, staticmethod) and inspect.iscoroutinefunction(attribute.__func__):
+            setattr(cls, name, staticmethod(_timed(name, attribute.__func__)))
+    return cls
+
+
+def _timed(name: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            REPOSITORY_ERRORS.inc(name)
+            raise
+        finally:
+            REPOSITORY_SECONDS.observe(time.perf_counter() - started, name)
+
+    return wrapper
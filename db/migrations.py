@@ -0,0 +1,175 @@
+"""
+Версионные миграции схемы БД.
+
+Примененные версии записываются в таблицу schema_migrations. Миграции
+выполняются по порядку в одной транзакции (DDL в Postgres транзакционный:
+при ошибке схема остается прежней) под advisory-блокировкой, чтобы два
+процесса не мигрировали одновременно.
+
+Правило для новых миграций: только добавлять (колонки, индексы, таблицы)
+и писать DDL идемпотентно (IF NOT EXISTS). Модели в db/models.py всегда
+описывают последнюю версию, поэтому на пустой базе базовая миграция через
+create_all сразу создает все, а последующие ничего не меняют.
+
+Запуск: python create_tables.py. Бот при старте проверяет версию схемы
+(check_schema_version) и не запускается на устаревшей базе.
+"""
+from sqlalchemy import text
+
+from db.database import engine
+from db.models import Base
+
+# Номер advisory-блокировки миграций (произвольная константа)
+MIGRATION_LOCK_ID = 7_310_017
+
+
+class SchemaVersionError(RuntimeError):
+    """
+    Версия схемы базы старше, чем нужна коду.
+    """
+
+
+class Migration:
+    """
+    Одна миграция.
+
+    Args:
+        version: номер (строго возрастает)
+        name: короткое описание
+        steps: SQL-строки или async-функции step(conn), выполняются по порядку
+    """
+
+    def __init__(self, version: int, name: str, steps: list):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+    async def apply(self, conn) -> None:
+        for step in self.steps:
+            if isinstance(step, str):
+                await conn.execute(text(step))
+            else:
+                await step(conn)
+
+
+async def _create_all(conn) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+
+MIGRATIONS = [
+    # -------- 1: схема до появления миграций (create_all + прежние доработки) --------
+    Migration(1, "baseline", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",  # триграммный поиск городов
+        _create_all,
+        # Производные признаки для скоринга (db/features.py)
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS city_key VARCHAR(255)",
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS experience_tokens VARCHAR[]",
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS ready_soon BOOLEAN",
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS ready_from DATE",
+        "CREATE INDEX IF NOT EXISTS ix_candidates_city_key ON candidates (city_key)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS city_key VARCHAR(255)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS requirement_tokens VARCHAR[]",
+        # Предрасчитанные скоры (candidate_scores)
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS scores_refreshed_at TIMESTAMP WITHOUT TIME ZONE",
+        # Полнотекстовый поиск (конфигурация russian + GIN)
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS experience_tsv TSVECTOR "
+        "GENERATED ALWAYS AS (to_tsvector('russian', experience)) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_candidates_experience_tsv ON candidates USING gin (experience_tsv)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS requirements_tsv TSVECTOR "
+        "GENERATED ALWAYS AS (to_tsvector('russian', requirements)) STORED",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS requirements_tsq TSQUERY "
+        "GENERATED ALWAYS AS (replace(plainto_tsquery('russian', requirements)::text, ' & ', ' | ')::tsquery) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_vacancies_requirements_tsv ON vacancies USING gin (requirements_tsv)",
+        # Справочник городов (db/cities.py)
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS city_id INTEGER REFERENCES cities (id)",
+        "CREATE INDEX IF NOT EXISTS ix_candidates_city_id ON candidates (city_id)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS city_id INTEGER REFERENCES cities (id)",
+    ]),
+    # -------- 2: индексы горячих запросов Repository --------
+    Migration(2, "hot_path_indexes", [
+        # get_vacancy_list_by_employer, get_vacancies_by_employer
+        "CREATE INDEX IF NOT EXISTS ix_vacancies_employer_id ON vacancies (employer_id)",
+        # get_vacancy_features / get_all_vacancies(active_only=True) и пересчет скоров кандидата
+        "CREATE INDEX IF NOT EXISTS ix_vacancies_active ON vacancies (id) WHERE is_active",
+        # get_matches_for_vacancy
+        "CREATE INDEX IF NOT EXISTS ix_matched_candidates_vacancy_score "
+        "ON matched_candidates (vacancy_id, matching_score)",
+        # add_rating (агрегат по работодателю) и get_all_ratings
+        "CREATE INDEX IF NOT EXISTS ix_employer_ratings_employer_created "
+        "ON employer_ratings (employer_id, created_at)",
+    ]),
+    # -------- 3: архив неактивных анкет, закрытых вакансий и старых событий --------
+    Migration(3, "archive", [
+        "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMP WITHOUT TIME ZONE",
+        # Отсчет неактивности — с момента миграции: о прежней активности данных нет,
+        # и created_at отправил бы в архив всех давно зарегистрированных сразу
+        "UPDATE candidates SET last_active_at = timezone('utc', now()) WHERE last_active_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_candidates_last_active_at ON candidates (last_active_at)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS closed_at TIMESTAMP WITHOUT TIME ZONE",
+        "CREATE INDEX IF NOT EXISTS ix_vacancies_closed_at ON vacancies (closed_at) WHERE NOT is_active",
+        "CREATE INDEX IF NOT EXISTS ix_matched_candidates_created_at ON matched_candidates (created_at)",
+        # Таблицы *_archive (create_all создает только недостающие)
+        _create_all,
+    ]),
+]
+
+# Версия схемы, которую ожидает код
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(conn) -> int:
+    """
+    Последняя примененная версия (0 — миграции еще не применялись).
+    """
+    exists = (await conn.execute(text("SELECT to_regclass('schema_migrations')"))).scalar()
+    if exists is None:
+        return 0
+    return (await conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_migrations"))).scalar_one()
+
+
+async def migrate(conn) -> list[int]:
+    """
+    Применяет все непримененные миграции.
+
+    Args:
+        conn: AsyncConnection внутри транзакции (engine.begin())
+
+    Returns:
+        list[int]: версии, примененные этим вызовом
+    """
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now())"
+    ))
+
+    version = await current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        await migration.apply(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": migration.version, "name": migration.name}
+        )
+        applied.append(migration.version)
+    return applied
+
+
+async def check_schema_version() -> None:
+    """
+    Проверка при старте бота: схема не старее SCHEMA_VERSION.
+
+    Raises:
+        SchemaVersionError: база не мигрирована до нужной версии
+    """
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    if version < SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"❌ Схема БД устарела: версия {version}, нужна {SCHEMA_VERSION}. "
+            f"Запустите python create_tables.py"
+        )
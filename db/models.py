@@ -1,7 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, Date, DateTime, ForeignKey, Text, ARRAY, Index, Computed, Table, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, TSQUERY
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 
 # Базовый класс для всех моделей
 Base = declarative_base()
@@ -22,21 +23,66 @@ class User(Base):
     employer = relationship('Employer', uselist=False, back_populates='user', cascade='all, delete-orphan')
 
 
+# Справочник городов (канонические названия)
+class City(Base):
+    __tablename__ = 'cities'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)  # Каноническое название
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Связи
+    aliases = relationship('CityAlias', back_populates='city', cascade='all, delete-orphan')
+
+
+# Варианты написания городов ("спб", "питер" -> Санкт-Петербург)
+class CityAlias(Base):
+    __tablename__ = 'city_aliases'
+    __table_args__ = (
+        # Нечеткий поиск по триграммам (alias % :ввод), нужно расширение pg_trgm
+        Index('ix_city_aliases_alias_trgm', 'alias', postgresql_using='gin', postgresql_ops={'alias': 'gin_trgm_ops'}),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    alias = Column(String(255), unique=True, nullable=False)  # Ключ написания (см. db/cities.city_alias_key)
+    city_id = Column(Integer, ForeignKey('cities.id'), nullable=False)
+    
+    # Связи
+    city = relationship('City', back_populates='aliases')
+
+
 # Таблица профилей кандидатов
 class Candidate(Base):
     __tablename__ = 'candidates'
+    __table_args__ = (
+        # Полнотекстовый поиск по опыту (experience_tsv @@ запрос)
+        Index('ix_candidates_experience_tsv', 'experience_tsv', postgresql_using='gin'),
+        # Поиск неактивных анкет для архива
+        Index('ix_candidates_last_active_at', 'last_active_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), unique=True, nullable=False)
     name = Column(String(255), nullable=False)
     age = Column(Integer, nullable=False)
     city = Column(String(255), nullable=False)
+    city_id = Column(Integer, ForeignKey('cities.id'), nullable=True, index=True)  # Город из справочника
     experience = Column(Text, nullable=False)  # Описание опыта работы
     phone = Column(String(20), nullable=False)
     desired_position = Column(String(255), nullable=False)
     expected_salary = Column(Float, nullable=False)
     ready_date = Column(String(100), nullable=False)  # Дата или описание готовности
     created_at = Column(DateTime, default=datetime.utcnow)
+    last_active_at = Column(DateTime, default=datetime.utcnow)  # Последняя активность (для архива)
+    
+    # Производные признаки для скоринга (считаются при записи, см. db/features.py)
+    city_key = Column(String(255), nullable=True, index=True)  # Нормализованный город
+    experience_tokens = Column(ARRAY(String), nullable=True)  # Уникальные слова опыта
+    ready_soon = Column(Boolean, nullable=True)  # Готов выйти в ближайшее время
+    ready_from = Column(Date, nullable=True)  # Распознанная дата выхода
+    
+    # Полнотекстовый индекс опыта (генерируется Postgres, в Python не загружается)
+    experience_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('russian', experience)", persisted=True)))
     
     # Связи
     user = relationship('User', back_populates='candidate')
@@ -66,16 +112,40 @@ class Employer(Base):
 # Таблица вакансий
 class Vacancy(Base):
     __tablename__ = 'vacancies'
+    __table_args__ = (
+        # Полнотекстовый поиск по требованиям
+        Index('ix_vacancies_requirements_tsv', 'requirements_tsv', postgresql_using='gin'),
+        # Вакансии работодателя (/vacancies)
+        Index('ix_vacancies_employer_id', 'employer_id'),
+        # Активные вакансии (индекс вакансий, пересчет скоров кандидата)
+        Index('ix_vacancies_active', 'id', postgresql_where=text('is_active')),
+        # Закрытые вакансии для архива
+        Index('ix_vacancies_closed_at', 'closed_at', postgresql_where=text('NOT is_active')),
+    )
     
     id = Column(Integer, primary_key=True)
     employer_id = Column(Integer, ForeignKey('employers.id'), nullable=False)
     position = Column(String(255), nullable=False)
     city = Column(String(255), nullable=False)
+    city_id = Column(Integer, ForeignKey('cities.id'), nullable=True)  # Город из справочника
     salary = Column(Float, nullable=False)
     requirements = Column(Text, nullable=False)  # Требования к кандидату
     count_needed = Column(Integer, default=1)  # Сколько людей нужно
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True)  # Когда вакансию закрыли
+    
+    # Производные признаки для скоринга (считаются при записи, см. db/features.py)
+    city_key = Column(String(255), nullable=True)  # Нормализованный город
+    requirement_tokens = Column(ARRAY(String), nullable=True)  # Слова требований от 3 символов
+    scores_refreshed_at = Column(DateTime, nullable=True)  # Когда последний раз пересчитаны candidate_scores
+    
+    # Полнотекстовое представление требований (генерируется Postgres, в Python не загружается):
+    # requirements_tsv — для поиска вакансий, requirements_tsq — запрос "любое из слов" для поиска кандидатов
+    requirements_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('russian', requirements)", persisted=True)))
+    requirements_tsq = deferred(Column(TSQUERY, Computed(
+        "replace(plainto_tsquery('russian', requirements)::text, ' & ', ' | ')::tsquery", persisted=True
+    )))
     
     # Связи
     employer = relationship('Employer', back_populates='vacancies')
@@ -85,6 +155,12 @@ class Vacancy(Base):
 # Таблица совпадений (кандидат - вакансия)
 class MatchedCandidate(Base):
     __tablename__ = 'matched_candidates'
+    __table_args__ = (
+        # Совпадения вакансии: WHERE vacancy_id = ? ORDER BY matching_score DESC
+        Index('ix_matched_candidates_vacancy_score', 'vacancy_id', 'matching_score'),
+        # Старые события для архива
+        Index('ix_matched_candidates_created_at', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     vacancy_id = Column(Integer, ForeignKey('vacancies.id'), nullable=False)
@@ -101,9 +177,31 @@ class MatchedCandidate(Base):
     candidate = relationship('Candidate', back_populates='matched_candidates')
 
 
+# Таблица предрасчитанных скоров (кандидат - вакансия)
+# Заполняется в фоне при регистрации кандидата и создании вакансии,
+# хранятся только пары с положительным скором
+class CandidateScore(Base):
+    __tablename__ = 'candidate_scores'
+    __table_args__ = (
+        # Список подбора: WHERE vacancy_id = ? ORDER BY score DESC, candidate_id DESC
+        Index('ix_candidate_scores_vacancy_score', 'vacancy_id', 'score', 'candidate_id'),
+        # Пересчет скоров одного кандидата
+        Index('ix_candidate_scores_candidate', 'candidate_id'),
+    )
+    
+    vacancy_id = Column(Integer, ForeignKey('vacancies.id', ondelete='CASCADE'), primary_key=True)
+    candidate_id = Column(Integer, ForeignKey('candidates.id', ondelete='CASCADE'), primary_key=True)
+    score = Column(Integer, nullable=False)  # Оценка совпадения (0-100)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 # Таблица рейтингов работодателей
 class EmployerRating(Base):
     __tablename__ = 'employer_ratings'
+    __table_args__ = (
+        # Оценки работодателя: WHERE employer_id = ? ORDER BY created_at DESC
+        Index('ix_employer_ratings_employer_created', 'employer_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     employer_id = Column(Integer, ForeignKey('employers.id'), nullable=False)
@@ -114,3 +212,48 @@ class EmployerRating(Base):
     
     # Связи
     employer = relationship('Employer', back_populates='ratings')
+
+
+# Состояния анкет aiogram (FSM), переживают перезапуск бота
+# Строка удаляется, когда состояние и данные очищены
+class FsmRecord(Base):
+    __tablename__ = 'fsm_states'
+    
+    bot_id = Column(BigInteger, primary_key=True)
+    chat_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    thread_id = Column(BigInteger, primary_key=True, default=0)  # 0 — без топика
+    destiny = Column(String(64), primary_key=True, default='default')
+    state = Column(String(255), nullable=True)  # Например "CandidateStates:city"
+    data = Column(JSONB, nullable=False, default=dict)  # Ответы анкеты
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# -------- Архив: строки, ушедшие из рабочих таблиц (см. bot/utils/archiver.py) --------
+def _archive_table(model, *indexes) -> Table:
+    """
+    Таблица <имя>_archive с колонками модели и временем архивирования.
+    Генерируемые колонки не копируются (Postgres пересчитает их при
+    возврате строки), id не генерируется: строка хранит свой прежний id.
+    Внешних ключей нет — строки только хранятся.
+    """
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False)
+        for column in model.__table__.columns if column.computed is None
+    ]
+    return Table(
+        f'{model.__tablename__}_archive', Base.metadata,
+        *columns,
+        Column('archived_at', DateTime, nullable=False),
+        *indexes
+    )
+
+
+# Анкеты кандидатов без активности (возвращаются по user_id)
+candidates_archive = _archive_table(Candidate, Index('ix_candidates_archive_user_id', 'user_id'))
+
+# Закрытые вакансии (возвращаются при повторном открытии)
+vacancies_archive = _archive_table(Vacancy, Index('ix_vacancies_archive_employer_id', 'employer_id'))
+
+# Старые события подбора
+matched_candidates_archive = _archive_table(MatchedCandidate)
@@ -0,0 +1,85 @@
+"""
+Легкие проекции строк для списков и ранжирования.
+
+Там, где нужна пара-тройка колонок (кнопки списка вакансий, признаки для
+индексов и скоринга), вместо ORM-объектов читаются только эти колонки
+в dataclass со __slots__: без identity map, отслеживания изменений
+и загрузки лишних полей.
+
+Имена полей совпадают с атрибутами моделей, поэтому проекции подходят
+везде, где код читает атрибуты (city_ref, VacancyIndex.add,
+CandidatePool.from_candidates, calculate_score).
+"""
+from dataclasses import dataclass, fields
+
+from sqlalchemy import select
+
+
+@dataclass(slots=True, frozen=True)
+class CandidateFeatures:
+    """
+    Признаки кандидата для индекса опыта и пакетного скоринга.
+    """
+    id: int
+    city: str
+    city_id: int | None
+    city_key: str | None
+    expected_salary: float
+    experience: str
+    experience_tokens: list[str] | None
+    ready_date: str
+    ready_soon: bool | None
+
+
+@dataclass(slots=True, frozen=True)
+class CandidateScanFeatures:
+    """
+    Признаки кандидата для скоринга, когда совпадение опыта берется
+    из ExperienceIndex: без текста опыта и его токенов.
+    """
+    id: int
+    city: str
+    city_id: int | None
+    city_key: str | None
+    expected_salary: float
+    ready_date: str
+    ready_soon: bool | None
+
+
+@dataclass(slots=True, frozen=True)
+class VacancyFeatures:
+    """
+    Признаки вакансии для индекса /jobs и скоринга кандидата.
+    """
+    id: int
+    city: str
+    city_id: int | None
+    city_key: str | None
+    salary: float
+    requirements: str
+    requirement_tokens: list[str] | None
+    is_active: bool
+
+
+@dataclass(slots=True, frozen=True)
+class VacancyListItem:
+    """
+    Строка списка вакансий работодателя (кнопка "должность | зарплата").
+    """
+    id: int
+    position: str
+    salary: float
+
+
+def projection_select(projection, model):
+    """
+    SELECT только тех колонок модели, которые есть в проекции (в порядке полей).
+    """
+    return select(*(getattr(model, field.name) for field in fields(projection)))
+
+
+def project(projection, result) -> list:
+    """
+    Строки результата projection_select -> список проекций.
+    """
+    return [projection(*row) for row in result]
@@ -1,84 +1,440 @@
 # db/repository.py
-from sqlalchemy import select, update, func
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from functools import partial
+from sqlalchemy import Float, select, update, delete, exists, func, literal, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.models import User, Candidate, Employer, Vacancy, MatchedCandidate, EmployerRating
-from db.database import AsyncSessionLocal  # <- убедитесь, что так называется
+from db.models import (
+    User, Candidate, Employer, Vacancy, MatchedCandidate, EmployerRating, CandidateScore,
+    candidates_archive, vacancies_archive, matched_candidates_archive,
+)
+from db.session import after_commit, session_scope
+from db.cities import cached_city, remember_city, resolve_city
+from db.features import candidate_features, vacancy_features
+from db.entity_cache import employer_cache, user_cache, vacancy_cache
+from db.instrumentation import instrument_repository
+from db.projections import (
+    CandidateFeatures, CandidateScanFeatures, VacancyFeatures, VacancyListItem, project, projection_select
+)
+from db.scoring_rules import experience_matches_requirements, scoring_rules
+from db.token_index import experience_index
+from db.vacancy_index import vacancy_index
+from db.write_buffer import write_buffer
 
+
+def _candidate_score_expression():
+    """
+    SQL-выражение скоринга пары (candidates, vacancies) по правилам
+    из config/scoring_rules.json (см. db/scoring_rules.py).
+    Критерии считаются так же, как в Python (calculate_score): город — по id
+    справочника или нормализованному названию, опыт — по вхождению слов
+    требований в слова опыта (см. sql_* в db/scoring_rules.py).
+    """
+    return scoring_rules.sql_expression()
+
+
+def _upsert_scores(select_stmt=None):
+    """
+    INSERT в candidate_scores с обновлением скора при конфликте.
+    Пересчеты вакансии и кандидата могут идти параллельно и писать одну пару.
+    """
+    stmt = insert(CandidateScore)
+    if select_stmt is not None:
+        stmt = stmt.from_select(['vacancy_id', 'candidate_id', 'score'], select_stmt)
+    return stmt.on_conflict_do_update(
+        index_elements=[CandidateScore.vacancy_id, CandidateScore.candidate_id],
+        set_={'score': stmt.excluded.score, 'updated_at': func.now()}
+    )
+
+
+def _upsert_user(telegram_id: int, role: str, username: str = None):
+    """
+    INSERT пользователя, который при конфликте по telegram_id обновляет
+    только username (если он передан), чтобы RETURNING вернул строку.
+    """
+    stmt = insert(User).values(
+        telegram_id=telegram_id, role=role, username=username, created_at=datetime.utcnow()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={'username': func.coalesce(stmt.excluded.username, User.username)}
+    )
+
+
+def _literal_select(model, leading, values: dict):
+    """
+    SELECT leading, :value1, :value2, ... с типами колонок модели
+    (для INSERT ... SELECT из CTE).
+    """
+    columns = model.__table__.c
+    return select(leading, *(literal(value, type_=columns[name].type) for name, value in values.items()))
+
+
+def _move_rows(source, target, where: list, limit: int = None, **values):
+    """
+    Перенос строк между рабочей таблицей и архивом одним запросом:
+    WITH moved AS (DELETE FROM source ... RETURNING ...) INSERT INTO target SELECT ... FROM moved.
+
+    Args:
+        source: таблица, из которой строки удаляются
+        target: таблица, в которую они вставляются (с тем же id)
+        where: условия отбора строк source
+        limit: перенести не больше limit строк (первые по id; строки,
+            заблокированные другими транзакциями, пропускаются)
+        values: колонки target, которые задаются значением, а не копируются
+
+    Returns:
+        INSERT ... RETURNING target.id
+    """
+    names = [
+        column.name for column in target.columns
+        if column.computed is None and column.name in source.c and column.name not in values
+    ]
+
+    moved = delete(source)
+    if limit is None:
+        moved = moved.where(*where)
+    else:
+        moved = moved.where(source.c.id.in_(
+            select(source.c.id).where(*where).order_by(source.c.id).limit(limit).with_for_update(skip_locked=True)
+        ))
+    moved = moved.returning(*(source.c[name] for name in names)).cte('moved')
+
+    rows = select(
+        *(moved.c[name] for name in names),
+        *(literal(value, type_=target.c[name].type) for name, value in values.items())
+    )
+    return insert(target).from_select([*names, *values], rows).add_cte(moved).returning(target.c.id)
+
+
+# Отметка активности кандидата пишется не чаще, чем раз в этот интервал
+ACTIVITY_RESOLUTION = timedelta(hours=1)
+
+# Что запускать, когда меняются признаки анкеты (создание, правка, возврат
+# из архива): hook(candidate_id, session=...). db не зависит от bot, поэтому
+# пересчет скоров регистрирует здесь bot/utils/precompute.py
+candidate_change_hooks = []
+
+# Поля анкеты, от которых зависит скор
+SCORED_CANDIDATE_FIELDS = frozenset({'city', 'city_id', 'experience', 'expected_salary', 'ready_date'})
+
+
+def _candidate_changed(candidate_id: int, session: AsyncSession) -> None:
+    for hook in candidate_change_hooks:
+        hook(candidate_id, session=session)
+
+
+@instrument_repository
 class Repository:
     """
     Асинхронная точка доступа к БД.
-    Все CRUD операции через AsyncSessionLocal.
+
+    Каждый метод принимает необязательную session: сессию апдейта из
+    DbSessionMiddleware. Тогда все вызовы хендлера идут в одной транзакции
+    на одном соединении, а коммит делает middleware. Без session метод,
+    как раньше, открывает свою AsyncSessionLocal и коммитит сам.
     """
 
     # -------- USERS: создание пользователя --------
     @staticmethod
-    async def create_user(telegram_id: int, role: str, username: str = None) -> User:
-        async with AsyncSessionLocal() as session:
+    async def create_user(telegram_id: int, role: str, username: str = None,
+                          session: AsyncSession = None) -> User:
+        async with session_scope(session) as session:
             user = User(telegram_id=telegram_id, role=role, username=username)
             session.add(user)
-            await session.commit()
-            await session.refresh(user)
+            await session.flush()
+            after_commit(session, partial(user_cache.invalidate, telegram_id))
+            return user
+
+    # -------- USERS: получение или создание пользователя одним запросом --------
+    @staticmethod
+    async def get_or_create_user(telegram_id: int, role: str, username: str = None,
+                                 session: AsyncSession = None) -> User:
+        """
+        Возвращает пользователя по telegram_id, создавая его при отсутствии.
+        Один INSERT ... ON CONFLICT DO UPDATE ... RETURNING: без гонки между
+        проверкой и вставкой. У существующего пользователя обновляется только
+        username (role не меняется).
+        """
+        user = user_cache.get(telegram_id)
+        if user is not None:
+            return user
+
+        token = user_cache.token()
+        async with session_scope(session) as session:
+            stmt = _upsert_user(telegram_id, role, username).returning(User)
+            user = await session.scalar(stmt, execution_options={'populate_existing': True})
+            after_commit(session, partial(user_cache.put, telegram_id, user, token))
             return user
 
     # -------- USERS: получение пользователя по telegram_id --------
     @staticmethod
-    async def get_user_by_telegram_id(telegram_id: int) -> User | None:
-        async with AsyncSessionLocal() as session:
+    async def get_user_by_telegram_id(telegram_id: int, session: AsyncSession = None) -> User | None:
+        user = user_cache.get(telegram_id)
+        if user is not None:
+            return user
+
+        token = user_cache.token()
+        async with session_scope(session) as session:
             stmt = select(User).where(User.telegram_id == telegram_id)
             result = await session.execute(stmt)
-            return result.scalars().first()
+            user = result.scalars().first()
+            if user is not None:
+                after_commit(session, partial(user_cache.put, telegram_id, user, token))
+            return user
+
+    # -------- CITIES: разрешение введенного города --------
+    @staticmethod
+    async def resolve_city(city: str, session: AsyncSession = None) -> tuple[int | None, str]:
+        """
+        Приводит введенный город к (city_id, каноническое название)
+        через справочник городов и триграммный поиск (см. db/cities.py).
+        Неизвестный город — (None, введенное название).
+        """
+        resolved = cached_city(city)
+        if resolved:
+            return resolved
+
+        async with session_scope(session) as session:
+            resolved = await resolve_city(session, city)
+            after_commit(session, partial(remember_city, city, resolved))
+
+        return resolved
 
     # -------- CANDIDATES: создание профиля кандидата --------
     @staticmethod
     async def create_candidate(user_id: int, name: str, age: int, city: str,
                               experience: str, phone: str, desired_position: str,
-                              expected_salary: float, ready_date: str) -> Candidate:
-        async with AsyncSessionLocal() as session:
+                              expected_salary: float, ready_date: str, city_id: int = None,
+                              session: AsyncSession = None) -> Candidate:
+        async with session_scope(session) as session:
+            # Без city_id кандидат не получит баллов за город в SQL-скоринге
+            if city_id is None:
+                city_id, city = await Repository.resolve_city(city, session=session)
             candidate = Candidate(
                 user_id=user_id,
                 name=name,
                 age=age,
                 city=city,
+                city_id=city_id,
                 experience=experience,
                 phone=phone,
                 desired_position=desired_position,
                 expected_salary=expected_salary,
-                ready_date=ready_date
+                ready_date=ready_date,
+                **candidate_features(city=city, experience=experience, ready_date=ready_date)
             )
             session.add(candidate)
-            await session.commit()
-            await session.refresh(candidate)
+            await session.flush()
+            # Новая анкета заменяет ушедшую в архив
+            await session.execute(delete(candidates_archive).where(candidates_archive.c.user_id == user_id))
+            after_commit(session, partial(experience_index.add, candidate.id, candidate.experience))
+            _candidate_changed(candidate.id, session)
             return candidate
 
     # -------- CANDIDATES: получение профиля по ID --------
     @staticmethod
-    async def get_candidate_by_id(candidate_id: int) -> Candidate | None:
-        async with AsyncSessionLocal() as session:
+    async def get_candidate_by_id(candidate_id: int, session: AsyncSession = None) -> Candidate | None:
+        async with session_scope(session) as session:
             stmt = select(Candidate).where(Candidate.id == candidate_id)
             result = await session.execute(stmt)
             return result.scalars().first()
 
+    # -------- CANDIDATES: получение профиля по user_id --------
+    @staticmethod
+    async def get_candidate_by_user_id(user_id: int, session: AsyncSession = None) -> Candidate | None:
+        async with session_scope(session) as session:
+            stmt = select(Candidate).where(Candidate.user_id == user_id)
+            result = await session.execute(stmt)
+            return result.scalars().first()
+
+    # -------- CANDIDATES: отметка активности --------
+    @staticmethod
+    def touch_candidate(candidate) -> asyncio.Future | None:
+        """
+        Отмечает активность кандидата (по ней неактивные анкеты уходят в архив).
+        Пишется через буфер отложенной записи и не чаще раза в ACTIVITY_RESOLUTION.
+
+        Returns:
+            asyncio.Future | None: подтверждение записи или None, если отметка свежая
+        """
+        now = datetime.utcnow()
+        if candidate.last_active_at is not None and now - candidate.last_active_at < ACTIVITY_RESOLUTION:
+            return None
+        return write_buffer.update(Candidate, candidate.id, {'last_active_at': now})
+
+    # -------- CANDIDATES: отметка активности по пользователю --------
+    @staticmethod
+    async def touch_candidate_by_user_id(user_id: int, session: AsyncSession = None) -> None:
+        """
+        Отмечает активность анкеты пользователя (если она есть), когда
+        сама анкета не загружалась; строка пишется, только если отметка
+        старше ACTIVITY_RESOLUTION.
+        """
+        async with session_scope(session) as session:
+            now = datetime.utcnow()
+            await session.execute(update(Candidate).where(
+                Candidate.user_id == user_id, Candidate.last_active_at < now - ACTIVITY_RESOLUTION
+            ).values(last_active_at=now))
+
+    # -------- CANDIDATES: есть ли анкета пользователя в архиве --------
+    @staticmethod
+    async def has_archived_candidate(user_id: int, session: AsyncSession = None) -> bool:
+        """
+        Дешевая проверка (чтение по индексу) перед restore_candidate.
+        """
+        async with session_scope(session) as session:
+            stmt = select(exists().where(candidates_archive.c.user_id == user_id))
+            return (await session.execute(stmt)).scalar()
+
+    # -------- CANDIDATES: возврат анкеты из архива --------
+    @staticmethod
+    async def restore_candidate(user_id: int, session: AsyncSession = None) -> Candidate | None:
+        """
+        Возвращает анкету пользователя из архива в рабочую таблицу
+        (с тем же id) и отмечает активность.
+
+        Returns:
+            Candidate | None: анкета или None, если в архиве ее нет
+        """
+        async with session_scope(session) as session:
+            result = await session.execute(_move_rows(
+                candidates_archive, Candidate.__table__, [candidates_archive.c.user_id == user_id],
+                last_active_at=datetime.utcnow()
+            ))
+            candidate_id = result.scalar()
+            if candidate_id is None:
+                return None
+
+            candidate = await Repository.get_candidate_by_id(candidate_id, session=session)
+            after_commit(session, partial(experience_index.add, candidate.id, candidate.experience))
+            _candidate_changed(candidate.id, session)
+            return candidate
+
+    # -------- CANDIDATES: перенос неактивных анкет в архив --------
+    @staticmethod
+    async def archive_candidates(inactive_since: datetime, limit: int,
+                                 session: AsyncSession = None) -> list[int]:
+        """
+        Переносит в candidates_archive анкеты без активности с inactive_since.
+        Анкеты, на которые ссылаются события подбора или оценки, остаются
+        (события уходят в архив раньше, см. archive_match_events).
+        Скоры кандидатов удаляются каскадом.
+
+        Returns:
+            list[int]: id перенесенных кандидатов (не больше limit)
+        """
+        async with session_scope(session) as session:
+            candidates = Candidate.__table__
+            result = await session.execute(_move_rows(candidates, candidates_archive, [
+                candidates.c.last_active_at < inactive_since,
+                ~exists().where(MatchedCandidate.candidate_id == candidates.c.id),
+                ~exists().where(EmployerRating.candidate_id == candidates.c.id),
+            ], limit=limit, archived_at=datetime.utcnow()))
+            candidate_ids = result.scalars().all()
+            for candidate_id in candidate_ids:
+                after_commit(session, partial(experience_index.remove, candidate_id))
+            return candidate_ids
+
     # -------- CANDIDATES: получение всех кандидатов --------
     @staticmethod
-    async def get_all_candidates() -> list[Candidate]:
-        async with AsyncSessionLocal() as session:
+    async def get_all_candidates(session: AsyncSession = None) -> list[Candidate]:
+        async with session_scope(session) as session:
             stmt = select(Candidate)
             result = await session.execute(stmt)
             return result.scalars().all()
 
+    # -------- CANDIDATES: признаки всех кандидатов (проекция) --------
+    @staticmethod
+    async def get_candidate_features(session: AsyncSession = None) -> list[CandidateFeatures]:
+        """
+        Признаки всех кандидатов для индекса опыта:
+        только нужные колонки, без ORM-объектов.
+        """
+        async with session_scope(session) as session:
+            result = await session.execute(projection_select(CandidateFeatures, Candidate))
+            return project(CandidateFeatures, result)
+
+    # -------- CANDIDATES: признаки всех кандидатов без опыта (проекция) --------
+    @staticmethod
+    async def get_candidate_scan_features(session: AsyncSession = None) -> list[CandidateScanFeatures]:
+        """
+        Признаки всех кандидатов для снимка скоринга: без текста опыта,
+        совпадение опыта берется из ExperienceIndex.
+        """
+        async with session_scope(session) as session:
+            result = await session.execute(projection_select(CandidateScanFeatures, Candidate))
+            return project(CandidateScanFeatures, result)
+
+    # -------- CANDIDATES: признаки кандидатов пачками (серверный курсор) --------
+    @staticmethod
+    async def stream_candidate_features(chunk_size: int,
+                                        session: AsyncSession = None) -> AsyncIterator[list[CandidateScanFeatures]]:
+        """
+        Отдает признаки кандидатов пачками по chunk_size (в порядке id),
+        читая их через серверный курсор: в памяти одновременно только
+        одна пачка, сколько бы кандидатов ни было в таблице. Текст опыта
+        не читается: совпадение опыта берется из ExperienceIndex.
+
+        Args:
+            chunk_size: размер пачки
+            session: сессия; курсор открыт, пока генератор не дочитан
+        """
+        async with session_scope(session) as session:
+            stmt = projection_select(CandidateScanFeatures, Candidate).order_by(Candidate.id)
+            result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+            async for partition in result.partitions():
+                yield project(CandidateScanFeatures, partition)
+
+    # -------- CANDIDATES: полнотекстовый поиск по требованиям вакансии --------
+    @staticmethod
+    async def search_candidates_by_requirements(vacancy_id: int, limit: int = 50,
+                                                session: AsyncSession = None) -> list[tuple[int, float]]:
+        """
+        Находит кандидатов, чей опыт совпадает с требованиями вакансии
+        (experience_tsv @@ requirements_tsq, GIN-индекс), и сортирует их по ts_rank.
+
+        Returns:
+            list[tuple[int, float]]: пары (candidate_id, rank) по убыванию rank
+        """
+        async with session_scope(session) as session:
+            rank = func.ts_rank(Candidate.experience_tsv, Vacancy.requirements_tsq).label('rank')
+            stmt = select(Candidate.id, rank).join(
+                Vacancy, Vacancy.id == vacancy_id
+            ).where(
+                experience_matches_requirements()
+            ).order_by(rank.desc(), Candidate.id).limit(limit)
+            result = await session.execute(stmt)
+            return [(candidate_id, float(rank_value)) for candidate_id, rank_value in result.all()]
+
     # -------- CANDIDATES: обновление профиля кандидата --------
     @staticmethod
-    async def update_candidate(candidate_id: int, **kwargs) -> None:
-        async with AsyncSessionLocal() as session:
-            stmt = update(Candidate).where(Candidate.id == candidate_id).values(**kwargs)
+    async def update_candidate(candidate_id: int, session: AsyncSession = None, **kwargs) -> None:
+        async with session_scope(session) as session:
+            # Новый город без city_id разрешаем через справочник, как при создании
+            if 'city' in kwargs and kwargs.get('city_id') is None:
+                kwargs['city_id'], kwargs['city'] = await Repository.resolve_city(kwargs['city'], session=session)
+            # Пересчитываем производные признаки для измененных полей;
+            # правка анкеты — тоже активность кандидата
+            values = {**kwargs, **candidate_features(**kwargs), 'last_active_at': datetime.utcnow()}
+            stmt = update(Candidate).where(Candidate.id == candidate_id).values(**values)
             await session.execute(stmt)
-            await session.commit()
+
+            # Опыт изменился — переиндексируем кандидата после коммита
+            if 'experience' in kwargs:
+                after_commit(session, partial(experience_index.add, candidate_id, kwargs['experience']))
+
+            # Изменились поля скоринга — пересчитываем скоры кандидата
+            if SCORED_CANDIDATE_FIELDS.intersection(kwargs):
+                _candidate_changed(candidate_id, session)
 
     # -------- EMPLOYERS: создание профиля работодателя --------
     @staticmethod
     async def create_employer(user_id: int, company_name: str, city: str,
-                             company_info: str, requirements: str) -> Employer:
-        async with AsyncSessionLocal() as session:
+                             company_info: str, requirements: str, session: AsyncSession = None) -> Employer:
+        async with session_scope(session) as session:
             employer = Employer(
                 user_id=user_id,
                 company_name=company_name,
@@ -87,22 +443,30 @@ class Repository:
                 requirements=requirements
             )
             session.add(employer)
-            await session.commit()
-            await session.refresh(employer)
+            await session.flush()
+            after_commit(session, partial(employer_cache.invalidate, employer.id))
             return employer
 
     # -------- EMPLOYERS: получение профиля по ID --------
     @staticmethod
-    async def get_employer_by_id(employer_id: int) -> Employer | None:
-        async with AsyncSessionLocal() as session:
+    async def get_employer_by_id(employer_id: int, session: AsyncSession = None) -> Employer | None:
+        employer = employer_cache.get(employer_id)
+        if employer is not None:
+            return employer
+
+        token = employer_cache.token()
+        async with session_scope(session) as session:
             stmt = select(Employer).where(Employer.id == employer_id)
             result = await session.execute(stmt)
-            return result.scalars().first()
+            employer = result.scalars().first()
+            if employer is not None:
+                after_commit(session, partial(employer_cache.put, employer_id, employer, token))
+            return employer
 
     # -------- EMPLOYERS: получение работодателя по user_id --------
     @staticmethod
-    async def get_employer_by_user_id(user_id: int) -> Employer | None:
-        async with AsyncSessionLocal() as session:
+    async def get_employer_by_user_id(user_id: int, session: AsyncSession = None) -> Employer | None:
+        async with session_scope(session) as session:
             stmt = select(Employer).where(Employer.user_id == user_id)
             result = await session.execute(stmt)
             return result.scalars().first()
@@ -110,42 +474,222 @@ class Repository:
     # -------- VACANCIES: создание новой вакансии --------
     @staticmethod
     async def create_vacancy(employer_id: int, position: str, city: str,
-                             salary: float, requirements: str, count_needed: int = 1) -> Vacancy:
-        async with AsyncSessionLocal() as session:
+                             salary: float, requirements: str, count_needed: int = 1,
+                             city_id: int = None, session: AsyncSession = None) -> Vacancy:
+        async with session_scope(session) as session:
+            # Без city_id вакансия не получит баллов за город в SQL-скоринге
+            if city_id is None:
+                city_id, city = await Repository.resolve_city(city, session=session)
             vacancy = Vacancy(
                 employer_id=employer_id,
                 position=position,
                 city=city,
+                city_id=city_id,
                 salary=salary,
                 requirements=requirements,
                 count_needed=count_needed,
-                is_active=True
+                is_active=True,
+                **vacancy_features(city=city, requirements=requirements)
             )
             session.add(vacancy)
-            await session.commit()
-            await session.refresh(vacancy)
+            await session.flush()
+            after_commit(session, partial(vacancy_index.add, vacancy))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy.id))
+            return vacancy
+
+    # -------- VACANCIES: пользователь + работодатель + вакансия одним запросом --------
+    @staticmethod
+    async def create_vacancy_with_employer(telegram_id: int, username: str | None,
+                                           company_name: str, city: str, company_info: str,
+                                           employer_requirements: str, position: str, salary: float,
+                                           requirements: str, count_needed: int = 1, city_id: int = None,
+                                           session: AsyncSession = None) -> Vacancy:
+        """
+        Создает вакансию, при необходимости создавая пользователя (role=employer)
+        и профиль работодателя. Один оператор с data-modifying CTE:
+
+            WITH upserted_user AS (INSERT INTO users ... ON CONFLICT ... RETURNING id),
+                 upserted_employer AS (INSERT INTO employers ... SELECT ... ON CONFLICT ... RETURNING id)
+            INSERT INTO vacancies ... SELECT ... FROM upserted_employer RETURNING ...
+
+        Существующий профиль работодателя не меняется. Город без city_id
+        перед этим разрешается через справочник (resolve_city).
+        """
+        now = datetime.utcnow()
+        async with session_scope(session) as session:
+            if city_id is None:
+                city_id, city = await Repository.resolve_city(city, session=session)
+            user_cte = _upsert_user(telegram_id, 'employer', username).returning(User.id).cte('upserted_user')
+
+            employer_values = dict(
+                company_name=company_name,
+                city=city,
+                company_info=company_info,
+                requirements=employer_requirements,
+                rating=0.0,
+                rating_count=0,
+                created_at=now
+            )
+            employer_stmt = insert(Employer).from_select(
+                ['user_id', *employer_values],
+                _literal_select(Employer, user_cte.c.id, employer_values),
+                include_defaults=False
+            )
+            employer_cte = employer_stmt.on_conflict_do_update(
+                index_elements=[Employer.user_id],
+                # Пустое обновление, чтобы RETURNING вернул и существующую строку
+                set_={'user_id': employer_stmt.excluded.user_id}
+            ).returning(Employer.id).cte('upserted_employer')
+
+            vacancy_values = dict(
+                position=position,
+                city=city,
+                city_id=city_id,
+                salary=salary,
+                requirements=requirements,
+                count_needed=count_needed,
+                is_active=True,
+                created_at=now,
+                **vacancy_features(city=city, requirements=requirements)
+            )
+            stmt = insert(Vacancy).from_select(
+                ['employer_id', *vacancy_values],
+                _literal_select(Vacancy, employer_cte.c.id, vacancy_values),
+                include_defaults=False
+            ).returning(Vacancy).add_cte(user_cte, employer_cte)
+
+            vacancy = await session.scalar(stmt)
+            after_commit(session, partial(user_cache.invalidate, telegram_id))
+            after_commit(session, partial(vacancy_index.add, vacancy))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy.id))
             return vacancy
 
     # -------- VACANCIES: получение вакансии по ID --------
     @staticmethod
-    async def get_vacancy_by_id(vacancy_id: int) -> Vacancy | None:
-        async with AsyncSessionLocal() as session:
+    async def get_vacancy_by_id(vacancy_id: int, session: AsyncSession = None) -> Vacancy | None:
+        vacancy = vacancy_cache.get(vacancy_id)
+        if vacancy is not None:
+            return vacancy
+
+        token = vacancy_cache.token()
+        async with session_scope(session) as session:
             stmt = select(Vacancy).where(Vacancy.id == vacancy_id)
             result = await session.execute(stmt)
-            return result.scalars().first()
+            vacancy = result.scalars().first()
+            if vacancy is not None:
+                after_commit(session, partial(vacancy_cache.put, vacancy_id, vacancy, token))
+            return vacancy
+
+    # -------- VACANCIES: получение вакансий по списку ID (в том же порядке) --------
+    @staticmethod
+    async def get_vacancies_by_ids(vacancy_ids: list[int], session: AsyncSession = None) -> list[Vacancy]:
+        if not vacancy_ids:
+            return []
+        async with session_scope(session) as session:
+            stmt = select(Vacancy).where(Vacancy.id.in_(vacancy_ids))
+            result = await session.execute(stmt)
+            vacancies = {vacancy.id: vacancy for vacancy in result.scalars().all()}
+            return [vacancies[vacancy_id] for vacancy_id in vacancy_ids if vacancy_id in vacancies]
 
     # -------- VACANCIES: получение всех вакансий работодателя --------
     @staticmethod
-    async def get_vacancies_by_employer(employer_id: int) -> list[Vacancy]:
-        async with AsyncSessionLocal() as session:
+    async def get_vacancies_by_employer(employer_id: int, session: AsyncSession = None) -> list[Vacancy]:
+        async with session_scope(session) as session:
             stmt = select(Vacancy).where(Vacancy.employer_id == employer_id)
             result = await session.execute(stmt)
             return result.scalars().all()
 
+    # -------- VACANCIES: список вакансий работодателя (проекция) --------
+    @staticmethod
+    async def get_vacancy_list_by_employer(employer_id: int,
+                                           session: AsyncSession = None) -> list[VacancyListItem]:
+        """
+        Активные вакансии работодателя для списка-клавиатуры: id, должность, зарплата.
+        """
+        async with session_scope(session) as session:
+            stmt = projection_select(VacancyListItem, Vacancy).where(
+                Vacancy.employer_id == employer_id, Vacancy.is_active == True
+            ).order_by(Vacancy.id)
+            result = await session.execute(stmt)
+            return project(VacancyListItem, result)
+
+    # -------- VACANCIES: закрытие вакансии --------
+    @staticmethod
+    async def close_vacancy(vacancy_id: int, employer_id: int, session: AsyncSession = None) -> bool:
+        """
+        Закрывает активную вакансию работодателя: она пропадает из подбора,
+        ленты /jobs и списка /vacancies, а ее скоры удаляются.
+
+        Returns:
+            bool: False, если активной вакансии с таким id у работодателя нет
+        """
+        async with session_scope(session) as session:
+            result = await session.execute(update(Vacancy).where(
+                Vacancy.id == vacancy_id, Vacancy.employer_id == employer_id, Vacancy.is_active == True
+            ).values(is_active=False, closed_at=datetime.utcnow()).returning(Vacancy.id))
+            if result.scalar() is None:
+                return False
+
+            await session.execute(delete(CandidateScore).where(CandidateScore.vacancy_id == vacancy_id))
+            after_commit(session, partial(vacancy_index.remove, vacancy_id))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy_id))
+            return True
+
+    # -------- VACANCIES: повторное открытие (в том числе из архива) --------
+    @staticmethod
+    async def reopen_vacancy(vacancy_id: int, employer_id: int, session: AsyncSession = None) -> bool:
+        """
+        Снова открывает закрытую вакансию работодателя; если она уже
+        в архиве — сначала возвращает ее в рабочую таблицу (с тем же id).
+        Скоры нужно пересчитать заново (scores_refreshed_at сбрасывается).
+
+        Returns:
+            bool: False, если закрытой вакансии с таким id у работодателя нет
+        """
+        async with session_scope(session) as session:
+            await session.execute(_move_rows(vacancies_archive, Vacancy.__table__, [
+                vacancies_archive.c.id == vacancy_id, vacancies_archive.c.employer_id == employer_id
+            ]))
+            result = await session.execute(update(Vacancy).where(
+                Vacancy.id == vacancy_id, Vacancy.employer_id == employer_id, Vacancy.is_active == False
+            ).values(is_active=True, closed_at=None, scores_refreshed_at=None).returning(Vacancy.id))
+            if result.scalar() is None:
+                return False
+
+            features = project(VacancyFeatures, await session.execute(
+                projection_select(VacancyFeatures, Vacancy).where(Vacancy.id == vacancy_id)
+            ))[0]
+            after_commit(session, partial(vacancy_index.add, features))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy_id))
+            return True
+
+    # -------- VACANCIES: перенос закрытых вакансий в архив --------
+    @staticmethod
+    async def archive_vacancies(closed_before: datetime, limit: int,
+                                session: AsyncSession = None) -> list[int]:
+        """
+        Переносит в vacancies_archive вакансии, закрытые до closed_before.
+        Вакансии, на которые еще ссылаются события подбора, остаются.
+
+        Returns:
+            list[int]: id перенесенных вакансий (не больше limit)
+        """
+        async with session_scope(session) as session:
+            vacancies = Vacancy.__table__
+            result = await session.execute(_move_rows(vacancies, vacancies_archive, [
+                vacancies.c.is_active == False,
+                vacancies.c.closed_at < closed_before,
+                ~exists().where(MatchedCandidate.vacancy_id == vacancies.c.id),
+            ], limit=limit, archived_at=datetime.utcnow()))
+            vacancy_ids = result.scalars().all()
+            for vacancy_id in vacancy_ids:
+                after_commit(session, partial(vacancy_cache.invalidate, vacancy_id))
+            return vacancy_ids
+
     # -------- VACANCIES: получение всех активных вакансий --------
     @staticmethod
-    async def get_all_vacancies(active_only: bool = True) -> list[Vacancy]:
-        async with AsyncSessionLocal() as session:
+    async def get_all_vacancies(active_only: bool = True, session: AsyncSession = None) -> list[Vacancy]:
+        async with session_scope(session) as session:
             if active_only:
                 stmt = select(Vacancy).where(Vacancy.is_active == True)
             else:
@@ -153,24 +697,40 @@ class Repository:
             result = await session.execute(stmt)
             return result.scalars().all()
 
+    # -------- VACANCIES: признаки вакансий (проекция) --------
+    @staticmethod
+    async def get_vacancy_features(active_only: bool = True,
+                                   session: AsyncSession = None) -> list[VacancyFeatures]:
+        """
+        Признаки вакансий для индекса /jobs и скоринга кандидата:
+        только нужные колонки, без ORM-объектов.
+        """
+        async with session_scope(session) as session:
+            stmt = projection_select(VacancyFeatures, Vacancy)
+            if active_only:
+                stmt = stmt.where(Vacancy.is_active == True)
+            result = await session.execute(stmt)
+            return project(VacancyFeatures, result)
+
     # -------- MATCHED_CANDIDATES: добавление совпадения --------
     @staticmethod
-    async def add_match(vacancy_id: int, candidate_id: int, matching_score: float) -> MatchedCandidate:
-        async with AsyncSessionLocal() as session:
+    async def add_match(vacancy_id: int, candidate_id: int, matching_score: float,
+                        session: AsyncSession = None) -> MatchedCandidate:
+        async with session_scope(session) as session:
             match = MatchedCandidate(
                 vacancy_id=vacancy_id,
                 candidate_id=candidate_id,
                 matching_score=matching_score
             )
             session.add(match)
-            await session.commit()
-            await session.refresh(match)
+            await session.flush()
             return match
 
     # -------- MATCHED_CANDIDATES: получение совпадений по вакансии --------
     @staticmethod
-    async def get_matches_for_vacancy(vacancy_id: int) -> list[MatchedCandidate]:
-        async with AsyncSessionLocal() as session:
+    async def get_matches_for_vacancy(vacancy_id: int,
+                                      session: AsyncSession = None) -> list[MatchedCandidate]:
+        async with session_scope(session) as session:
             stmt = select(MatchedCandidate).where(
                 MatchedCandidate.vacancy_id == vacancy_id
             ).order_by(MatchedCandidate.matching_score.desc())
@@ -179,30 +739,218 @@ class Repository:
 
     # -------- MATCHED_CANDIDATES: получение совпадения по ID --------
     @staticmethod
-    async def get_match_by_id(match_id: int) -> MatchedCandidate | None:
-        async with AsyncSessionLocal() as session:
+    async def get_match_by_id(match_id: int, session: AsyncSession = None) -> MatchedCandidate | None:
+        async with session_scope(session) as session:
             stmt = select(MatchedCandidate).where(MatchedCandidate.id == match_id)
             result = await session.execute(stmt)
             return result.scalars().first()
 
     # -------- MATCHED_CANDIDATES: обновление статуса совпадения --------
     @staticmethod
-    async def update_match_status(match_id: int, **kwargs) -> None:
-        async with AsyncSessionLocal() as session:
+    async def update_match_status(match_id: int, session: AsyncSession = None, **kwargs) -> None:
+        async with session_scope(session) as session:
             stmt = update(MatchedCandidate).where(
                 MatchedCandidate.id == match_id
             ).values(**kwargs)
             await session.execute(stmt)
-            await session.commit()
+
+    # -------- MATCHED_CANDIDATES: перенос старых событий в архив --------
+    @staticmethod
+    async def archive_match_events(created_before: datetime, limit: int,
+                                   session: AsyncSession = None) -> list[int]:
+        """
+        Переносит в matched_candidates_archive события подбора старше created_before.
+
+        Returns:
+            list[int]: id перенесенных событий (не больше limit)
+        """
+        async with session_scope(session) as session:
+            matches = MatchedCandidate.__table__
+            result = await session.execute(_move_rows(matches, matched_candidates_archive, [
+                matches.c.created_at < created_before,
+            ], limit=limit, archived_at=datetime.utcnow()))
+            return result.scalars().all()
+
+    # -------- MATCHED_CANDIDATES: отложенная запись (write-behind) --------
+    @staticmethod
+    def queue_match(vacancy_id: int, candidate_id: int, matching_score: float) -> asyncio.Future:
+        """
+        Ставит совпадение в буфер отложенной записи и сразу возвращается:
+        строка попадет в БД многострочным INSERT вместе с соседними.
+
+        Returns:
+            asyncio.Future: await — если нужно дождаться коммита
+        """
+        return write_buffer.insert(MatchedCandidate, {
+            'vacancy_id': vacancy_id,
+            'candidate_id': candidate_id,
+            'matching_score': matching_score,
+            'created_at': datetime.utcnow(),
+        })
+
+    @staticmethod
+    def queue_match_status(match_id: int, **kwargs) -> asyncio.Future:
+        """
+        Ставит обновление статуса совпадения в буфер отложенной записи
+        (contact_shared=True, candidate_confirmed_hire=True, ...).
+
+        Returns:
+            asyncio.Future: await — если нужно дождаться коммита
+        """
+        return write_buffer.update(MatchedCandidate, match_id, kwargs)
+
+    # -------- CANDIDATE_SCORES: пересчет скоров вакансии в БД --------
+    @staticmethod
+    async def refresh_vacancy_scores(vacancy_id: int, session: AsyncSession = None) -> None:
+        """
+        Пересчитывает скоры всех кандидатов для вакансии одним INSERT ... SELECT.
+        Кандидаты в Python не загружаются.
+        """
+        async with session_scope(session) as session:
+            scored = select(
+                literal(vacancy_id).label('vacancy_id'),
+                Candidate.id.label('candidate_id'),
+                _candidate_score_expression().label('score')
+            ).join(Vacancy, Vacancy.id == vacancy_id).subquery()
+
+            await session.execute(delete(CandidateScore).where(CandidateScore.vacancy_id == vacancy_id))
+            await session.execute(_upsert_scores(
+                select(scored.c.vacancy_id, scored.c.candidate_id, scored.c.score).where(scored.c.score > 0)
+            ))
+            await session.execute(update(Vacancy).where(Vacancy.id == vacancy_id).values(
+                scores_refreshed_at=datetime.utcnow()
+            ))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy_id))
+
+    # -------- CANDIDATE_SCORES: пересчет скоров кандидата в БД --------
+    @staticmethod
+    async def refresh_candidate_scores(candidate_id: int, session: AsyncSession = None) -> None:
+        """
+        Пересчитывает скоры кандидата по всем активным вакансиям одним INSERT ... SELECT.
+        """
+        async with session_scope(session) as session:
+            scored = select(
+                Vacancy.id.label('vacancy_id'),
+                literal(candidate_id).label('candidate_id'),
+                _candidate_score_expression().label('score')
+            ).join(Candidate, Candidate.id == candidate_id).where(Vacancy.is_active == True).subquery()
+
+            await session.execute(delete(CandidateScore).where(CandidateScore.candidate_id == candidate_id))
+            await session.execute(_upsert_scores(
+                select(scored.c.vacancy_id, scored.c.candidate_id, scored.c.score).where(scored.c.score > 0)
+            ))
+
+    # -------- CANDIDATE_SCORES: запись готовых скоров вакансии --------
+    @staticmethod
+    async def replace_vacancy_scores(vacancy_id: int, scores: list[tuple[int, int]],
+                                     session: AsyncSession = None) -> None:
+        """
+        Заменяет скоры вакансии парами (candidate_id, score), посчитанными в Python.
+        """
+        async with session_scope(session) as session:
+            await session.execute(delete(CandidateScore).where(CandidateScore.vacancy_id == vacancy_id))
+            if scores:
+                await session.execute(_upsert_scores(), [
+                    {'vacancy_id': vacancy_id, 'candidate_id': candidate_id, 'score': score}
+                    for candidate_id, score in scores
+                ])
+            await session.execute(update(Vacancy).where(Vacancy.id == vacancy_id).values(
+                scores_refreshed_at=datetime.utcnow()
+            ))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy_id))
+
+    # -------- CANDIDATE_SCORES: запись скоров вакансии пачками --------
+    @staticmethod
+    async def replace_vacancy_scores_streaming(vacancy_id: int, chunks: AsyncIterator[list[tuple[int, int]]],
+                                               session: AsyncSession = None) -> None:
+        """
+        То же, что replace_vacancy_scores, но пары (candidate_id, score) приходят
+        пачками и пишутся по мере подсчета: в памяти только текущая пачка.
+        Все пачки пишутся одной транзакцией.
+        """
+        async with session_scope(session) as session:
+            await session.execute(delete(CandidateScore).where(CandidateScore.vacancy_id == vacancy_id))
+            async for scores in chunks:
+                if scores:
+                    await session.execute(_upsert_scores(), [
+                        {'vacancy_id': vacancy_id, 'candidate_id': candidate_id, 'score': score}
+                        for candidate_id, score in scores
+                    ])
+            await session.execute(update(Vacancy).where(Vacancy.id == vacancy_id).values(
+                scores_refreshed_at=datetime.utcnow()
+            ))
+            after_commit(session, partial(vacancy_cache.invalidate, vacancy_id))
+
+    # -------- CANDIDATE_SCORES: запись готовых скоров кандидата --------
+    @staticmethod
+    async def replace_candidate_scores(candidate_id: int, scores: list[tuple[int, int]],
+                                       session: AsyncSession = None) -> None:
+        """
+        Заменяет скоры кандидата парами (vacancy_id, score), посчитанными в Python.
+        """
+        async with session_scope(session) as session:
+            await session.execute(delete(CandidateScore).where(CandidateScore.candidate_id == candidate_id))
+            if scores:
+                await session.execute(_upsert_scores(), [
+                    {'vacancy_id': vacancy_id, 'candidate_id': candidate_id, 'score': score}
+                    for vacancy_id, score in scores
+                ])
+
+    # -------- CANDIDATE_SCORES: следующий кандидат для вакансии (keyset) --------
+    @staticmethod
+    async def get_next_candidate_score(vacancy_id: int, after: tuple[int, int] = None,
+                                       session: AsyncSession = None) -> tuple[int, int] | None:
+        """
+        Возвращает пару (candidate_id, score), следующую за курсором в порядке
+        score DESC, candidate_id DESC. Без OFFSET: индекс ix_candidate_scores_vacancy_score
+        сразу находит место курсора, поэтому глубина листания не влияет на скорость.
+
+        Args:
+            vacancy_id: ID вакансии
+            after: (score, candidate_id) последнего показанного кандидата;
+                None — лучший кандидат
+
+        Returns:
+            tuple[int, int] | None: (candidate_id, score) или None, если список закончился
+        """
+        async with session_scope(session) as session:
+            stmt = select(CandidateScore.candidate_id, CandidateScore.score).where(
+                CandidateScore.vacancy_id == vacancy_id
+            )
+            if after is not None:
+                stmt = stmt.where(tuple_(CandidateScore.score, CandidateScore.candidate_id) < tuple_(*after))
+            stmt = stmt.order_by(
+                CandidateScore.score.desc(), CandidateScore.candidate_id.desc()
+            ).limit(1)
+            result = await session.execute(stmt)
+            row = result.first()
+            return (row.candidate_id, row.score) if row else None
+
+    # -------- CANDIDATE_SCORES: количество подходящих кандидатов --------
+    @staticmethod
+    async def count_matching_candidates(vacancy_id: int, session: AsyncSession = None) -> int:
+        async with session_scope(session) as session:
+            stmt = select(func.count()).select_from(CandidateScore).where(
+                CandidateScore.vacancy_id == vacancy_id
+            )
+            result = await session.execute(stmt)
+            return result.scalar_one()
 
     # -------- EMPLOYER_RATINGS: добавление рейтинга --------
     @staticmethod
-    async def add_rating(employer_id: int, candidate_id: int, rating: int, comment: str = None) -> EmployerRating:
+    async def add_rating(employer_id: int, candidate_id: int, rating: int, comment: str = None,
+                         session: AsyncSession = None) -> EmployerRating:
         """
-        Добавляет оценку работодателя от кандидата.
-        Затем пересчитывает average rating и count в таблице Employer.
+        Добавляет оценку работодателя от кандидата и в той же транзакции
+        инкрементально обновляет rating и rating_count в таблице Employer.
+
+        Новое среднее считается из старых значений одним UPDATE, без
+        прохода по всем оценкам, поэтому стоимость голоса не зависит от их
+        числа. Параллельные голоса сериализуются блокировкой строки
+        работодателя, и каждый UPDATE видит результат предыдущего.
+        Накопленную погрешность float исправляет reconcile_employer_ratings.
         """
-        async with AsyncSessionLocal() as session:
+        async with session_scope(session) as session:
             new_rating = EmployerRating(
                 employer_id=employer_id,
                 candidate_id=candidate_id,
@@ -210,32 +958,59 @@ class Repository:
                 comment=comment
             )
             session.add(new_rating)
-            await session.commit()
-            await session.refresh(new_rating)
+            await session.flush()
 
-            # Посчитать средний рейтинг и количество через SQL aggregate
-            stmt = select(func.avg(EmployerRating.rating), func.count(EmployerRating.id)).where(
-                EmployerRating.employer_id == employer_id
-            )
-            avg_count_res = await session.execute(stmt)
-            avg_val, cnt = avg_count_res.one()
-            avg_rating = float(avg_val) if avg_val is not None else float(rating)
-            cnt = int(cnt)
-
-            # Обновить работодателя
-            update_stmt = update(Employer).where(Employer.id == employer_id).values(
-                rating=avg_rating,
-                rating_count=cnt
+            old_count = func.coalesce(Employer.rating_count, 0)
+            old_rating = func.coalesce(Employer.rating, 0.0)
+            await session.execute(
+                update(Employer).where(Employer.id == employer_id).values(
+                    rating=(old_rating * old_count + rating) / (old_count + 1),
+                    rating_count=old_count + 1
+                )
             )
-            await session.execute(update_stmt)
-            await session.commit()
+            after_commit(session, partial(employer_cache.invalidate, employer_id))
 
             return new_rating
 
+    # -------- EMPLOYER_RATINGS: сверка агрегатов с оценками --------
+    @staticmethod
+    async def reconcile_employer_ratings(session: AsyncSession = None) -> int:
+        """
+        Пересчитывает rating и rating_count всех работодателей точно по
+        таблице employer_ratings (офлайн-задача, см. reconcile_ratings.py).
+        Обновляются только расходящиеся строки.
+
+        Returns:
+            int: сколько работодателей исправлено
+        """
+        async with session_scope(session) as session:
+            totals = select(
+                EmployerRating.employer_id,
+                func.avg(EmployerRating.rating).label('rating'),
+                func.count(EmployerRating.id).label('rating_count')
+            ).group_by(EmployerRating.employer_id).subquery()
+            exact = select(
+                Employer.id.label('employer_id'),
+                func.coalesce(totals.c.rating, 0).cast(Float).label('rating'),
+                func.coalesce(totals.c.rating_count, 0).label('rating_count')
+            ).outerjoin(totals, totals.c.employer_id == Employer.id).subquery()
+
+            stmt = update(Employer).where(
+                Employer.id == exact.c.employer_id,
+                or_(
+                    Employer.rating.is_distinct_from(exact.c.rating),
+                    Employer.rating_count.is_distinct_from(exact.c.rating_count)
+                )
+            ).values(rating=exact.c.rating, rating_count=exact.c.rating_count)
+            result = await session.execute(stmt)
+            if result.rowcount:
+                after_commit(session, employer_cache.clear)
+            return result.rowcount
+
     # -------- EMPLOYER_RATINGS: получение рейтинга работодателя --------
     @staticmethod
-    async def get_employer_rating(employer_id: int):
-        async with AsyncSessionLocal() as session:
+    async def get_employer_rating(employer_id: int, session: AsyncSession = None):
+        async with session_scope(session) as session:
             stmt = select(Employer).where(Employer.id == employer_id)
             result = await session.execute(stmt)
             employer = result.scalars().first()
@@ -245,8 +1020,8 @@ class Repository:
 
     # -------- EMPLOYER_RATINGS: получение всех оценок работодателя --------
     @staticmethod
-    async def get_all_ratings(employer_id: int) -> list[EmployerRating]:
-        async with AsyncSessionLocal() as session:
+    async def get_all_ratings(employer_id: int, session: AsyncSession = None) -> list[EmployerRating]:
+        async with session_scope(session) as session:
             stmt = select(EmployerRating).where(
                 EmployerRating.employer_id == employer_id
             ).order_by(EmployerRating.created_at.desc())
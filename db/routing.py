@@ -0,0 +1,102 @@
+"""
+Маршрутизация запросов между primary и репликой.
+
+Если задан DATABASE_REPLICA_URL, сессии AsyncSessionLocal читают с реплики,
+а пишут в primary:
+- INSERT / UPDATE / DELETE, flush и SELECT ... FOR UPDATE идут в primary;
+- после первой записи сессия до конца читает из primary (свои же изменения);
+- пользователь, апдейт которого что-то записал, еще REPLICA_STICKY_SECONDS
+  читает из primary (реплика могла не успеть догнать), см. DbSessionMiddleware;
+- код внутри primary_reads() всегда читает из primary (фоновые задачи,
+  которые сразу читают только что записанное).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import Select
+
+from config import REPLICA_STICKY_SECONDS
+
+# Принудительное чтение из primary в текущем контексте
+_force_primary: ContextVar[bool] = ContextVar('force_primary', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Все сессии внутри блока читают из primary.
+    """
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def is_write(clause) -> bool:
+    """
+    Нужен ли запросу primary: DML или блокирующий SELECT.
+    """
+    if isinstance(clause, UpdateBase):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is not None
+
+
+class RoutingSession(Session):
+    """
+    Session, которая выбирает engine для каждого запроса (get_bind).
+
+    Args:
+        primary: sync engine основной базы
+        replica: sync engine реплики
+    """
+
+    def __init__(self, primary, replica, **kwargs):
+        super().__init__(**kwargs)
+        self.primary = primary
+        self.replica = replica
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or is_write(clause):
+            self.info['wrote'] = True
+            self.info['primary'] = True
+            return self.primary
+        if self.info.get('primary') or _force_primary.get():
+            return self.primary
+        return self.replica
+
+
+class StickyWindow:
+    """
+    Ключи (telegram id), которые недавно писали и пока читают из primary.
+
+    Args:
+        seconds: длительность окна после записи
+    """
+
+    def __init__(self, seconds: float = REPLICA_STICKY_SECONDS):
+        self.seconds = seconds
+        self._until = {}  # ключ -> момент окончания окна
+
+    def touch(self, key) -> None:
+        now = time.monotonic()
+        self._until[key] = now + self.seconds
+        # Заодно чистим истекшие окна, чтобы словарь не рос
+        if len(self._until) > 1024:
+            self._until = {k: until for k, until in self._until.items() if until > now}
+
+    def active(self, key) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[key]
+            return False
+        return True
+
+
+# Окно "читать из primary после записи" для пользователей
+primary_window = StickyWindow()
@@ -0,0 +1,281 @@
+"""
+Декларативные правила скоринга кандидат ↔ вакансия.
+
+Веса критериев задаются в JSON (config/scoring_rules.json, путь — SCORING_RULES_PATH):
+
+    {
+      "max_score": 100,
+      "rules": [
+        {"criterion": "same_city", "weight": 40},
+        {"criterion": "salary_fits", "weight": 25},
+        {"criterion": "experience_match", "weight": 25},
+        {"criterion": "ready_soon", "weight": 10}
+      ]
+    }
+
+При загрузке правила один раз компилируются в сгенерированные функции
+(по объектам, по массивам NumPy, по готовым флагам) и в SQL-выражение
+для ранжирования в Postgres. Критерий с нулевым весом или не указанный
+в файле в сгенерированный код не попадает и не вычисляется.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import and_, case, exists, func, literal, or_, select
+
+from config import SCORING_RULES_PATH
+from db.features import CITY_WHITESPACE, MIN_REQUIREMENT_WORD
+from db.models import Candidate, Vacancy
+
+
+class Criterion:
+    """
+    Критерий скоринга и его представления для каждого пути подсчета.
+
+    Args:
+        python: выражение по объектам candidate / vacancy
+            (с помощниками _city_ref, _experience_matches, _is_candidate_ready)
+        array: выражение по колоночному пулу (pool, city_code, salary, experience)
+        sql: функция, возвращающая SQL-условие по таблицам candidates / vacancies
+        cost: относительная стоимость; дешевые критерии проверяются первыми
+    """
+
+    def __init__(self, python: str, array: str, sql, cost: int = 0):
+        self.python = python
+        self.array = array
+        self.sql = sql
+        self.cost = cost
+
+
+def experience_matches_requirements():
+    """
+    Условие полнотекстового поиска "опыт кандидата содержит хотя бы одно слово
+    требований вакансии" (search_candidates_by_requirements). Сравниваются
+    лексемы конфигурации russian, поэтому "продажи" находит "продажам",
+    и условие поддерживается GIN-индексом по experience_tsv. В скоринге
+    не используется: там правило sql_experience_match, как в Python.
+    """
+    return Candidate.experience_tsv.op('@@')(Vacancy.requirements_tsq)
+
+
+# -------- SQL-варианты критериев (те же правила, что у Python-функций) --------
+def _sql_words(text):
+    """
+    Слова текста в нижнем регистре (как db.features.tokenize, без сортировки).
+    """
+    return func.regexp_split_to_array(func.lower(text), r'\s+')
+
+
+def _sql_city_key(model):
+    """
+    city_key, а для строк без него — нормализованное название (db.features.normalize_city).
+    """
+    collapsed = func.regexp_replace(
+        func.replace(func.lower(model.city), 'ё', 'е'), f'[{CITY_WHITESPACE}]+', ' ', 'g'
+    )
+    normalized = func.btrim(collapsed, ' ')
+    return func.coalesce(model.city_key, normalized)
+
+
+def sql_same_city():
+    """
+    city_ref(candidate) == city_ref(vacancy): id справочника, если он есть
+    у обеих строк, нормализованное название — если ни у одной (id и название
+    между собой не равны).
+    """
+    return or_(
+        Candidate.city_id == Vacancy.city_id,
+        and_(
+            Candidate.city_id.is_(None),
+            Vacancy.city_id.is_(None),
+            _sql_city_key(Candidate) == _sql_city_key(Vacancy),
+        ),
+    )
+
+
+def sql_experience_match():
+    """
+    _check_token_match: слово требований (от MIN_REQUIREMENT_WORD символов)
+    входит подстрокой в одно из слов опыта. Для строк без разобранных слов
+    они получаются из исходного текста.
+    """
+    requirement = func.unnest(
+        func.coalesce(Vacancy.requirement_tokens, _sql_words(Vacancy.requirements))
+    ).table_valued('word').render_derived(name='requirement_word')
+    experience = func.unnest(
+        func.coalesce(Candidate.experience_tokens, _sql_words(Candidate.experience))
+    ).table_valued('word').render_derived(name='experience_word')
+    return exists(select(literal(1)).select_from(requirement, experience).where(
+        func.length(requirement.c.word) >= MIN_REQUIREMENT_WORD,
+        func.strpos(experience.c.word, requirement.c.word) > 0,
+    ))
+
+
+def sql_ready_soon():
+    """
+    ready_soon, а для строк без него — db.features.is_ready_soon
+    (готов, если в тексте есть хоть один непробельный символ).
+    """
+    return func.coalesce(Candidate.ready_soon, Candidate.ready_date.op('~')(r'\S')).is_(True)
+
+
+# Известные критерии (имя в JSON -> представления)
+CRITERIA = {
+    "same_city": Criterion(
+        python="_city_ref(candidate) == _city_ref(vacancy)",
+        array="pool.city_codes == city_code",
+        sql=sql_same_city,
+    ),
+    "salary_fits": Criterion(
+        python="candidate.expected_salary <= vacancy.salary",
+        array="pool.salaries <= salary",
+        sql=lambda: Candidate.expected_salary <= Vacancy.salary,
+    ),
+    "experience_match": Criterion(
+        python="_experience_matches(candidate, vacancy)",
+        array="experience",
+        sql=sql_experience_match,
+        cost=1,
+    ),
+    "ready_soon": Criterion(
+        python="_is_candidate_ready(candidate)",
+        array="pool.ready",
+        sql=sql_ready_soon,
+    ),
+}
+
+
+class ScoringRules:
+    """
+    Скомпилированный набор правил.
+
+    Args:
+        rules: пары (критерий, вес) в порядке из файла
+        max_score: верхняя граница скора
+    """
+
+    def __init__(self, rules: list[tuple[str, int]], max_score: int):
+        self.rules = [(name, weight) for name, weight in rules if weight]
+        self.max_score = max_score
+
+        # Порядок проверки в сгенерированном коде: сначала дешевые критерии
+        self._ordered = sorted(self.rules, key=lambda rule: CRITERIA[rule[0]].cost)
+        self.score_flags = self._compile_flags()
+        self.score_arrays = self._compile_arrays()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoringRules":
+        """
+        Проверяет и компилирует правила из разобранного JSON.
+
+        Raises:
+            ValueError: неизвестный или повторяющийся критерий, нецелый
+                или отрицательный вес
+        """
+        max_score = data.get("max_score", 100)
+        if not isinstance(max_score, int) or max_score <= 0:
+            raise ValueError(f"❌ max_score должен быть положительным целым, а не {max_score!r}")
+
+        rules = []
+        seen = set()
+        for rule in data.get("rules", []):
+            name = rule.get("criterion")
+            weight = rule.get("weight")
+            if name not in CRITERIA:
+                raise ValueError(f"❌ Неизвестный критерий скоринга: {name!r} (есть: {', '.join(CRITERIA)})")
+            if name in seen:
+                raise ValueError(f"❌ Критерий {name!r} указан дважды")
+            if not isinstance(weight, int) or isinstance(weight, bool):
+                raise ValueError(f"❌ Вес критерия {name!r} должен быть целым числом, а не {weight!r}")
+            if weight < 0:
+                raise ValueError(f"❌ Вес критерия {name!r} должен быть неотрицательным, а не {weight!r}")
+            seen.add(name)
+            rules.append((name, weight))
+
+        return cls(rules, max_score)
+
+    @classmethod
+    def load(cls, path) -> "ScoringRules":
+        """
+        Загружает правила из JSON-файла.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+    def uses(self, name: str) -> bool:
+        """
+        Участвует ли критерий в скоринге (указан с ненулевым весом).
+        """
+        return any(rule_name == name for rule_name, _ in self.rules)
+
+    # -------- Сгенерированный код --------
+    def python_source(self, function_name: str = "score_pair") -> str:
+        """
+        Исходный код функции function_name(candidate, vacancy) -> int.
+        """
+        lines = [f"def {function_name}(candidate, vacancy):", "    score = 0"]
+        for name, weight in self._ordered:
+            lines.append(f"    if {CRITERIA[name].python}:")
+            lines.append(f"        score += {weight}")
+        lines.append(f"    return score if score < {self.max_score} else {self.max_score}")
+        return "\n".join(lines) + "\n"
+
+    def compile_python(self, namespace: dict, function_name: str = "score_pair"):
+        """
+        Компилирует функцию скоринга пары объектов.
+
+        Args:
+            namespace: помощники, на которые ссылаются выражения критериев
+            function_name: имя функции (для трассировок)
+
+        Returns:
+            callable: функция (candidate, vacancy) -> int
+        """
+        return self._exec(self.python_source(function_name), function_name, dict(namespace))
+
+    def sql_expression(self):
+        """
+        SQL-выражение скоринга пары (candidates, vacancies) по тем же правилам.
+        """
+        if not self.rules:
+            return literal(0)
+        terms = [case((CRITERIA[name].sql(), weight), else_=0) for name, weight in self._ordered]
+        total = terms[0]
+        for term in terms[1:]:
+            total = total + term
+        return func.least(total, self.max_score)
+
+    def _compile_flags(self):
+        """
+        score_flags(same_city=..., salary_fits=..., ...) -> int по уже посчитанным флагам.
+        """
+        arguments = ", ".join(f"{name}=False" for name in CRITERIA)
+        lines = [f"def score_flags({arguments}):", "    score = 0"]
+        for name, weight in self._ordered:
+            lines.append(f"    if {name}:")
+            lines.append(f"        score += {weight}")
+        lines.append(f"    return score if score < {self.max_score} else {self.max_score}")
+        return self._exec("\n".join(lines) + "\n", "score_flags", {})
+
+    def _compile_arrays(self):
+        """
+        score_arrays(pool, city_code, salary, experience) -> np.ndarray — векторный проход.
+        """
+        lines = [
+            "def score_arrays(pool, city_code, salary, experience):",
+            "    scores = np.zeros(len(pool), dtype=np.int32)",
+        ]
+        for name, weight in self._ordered:
+            lines.append(f"    scores += {weight} * ({CRITERIA[name].array})")
+        lines.append(f"    return np.minimum(scores, {self.max_score})")
+        return self._exec("\n".join(lines) + "\n", "score_arrays", {"np": np})
+
+    @staticmethod
+    def _exec(source: str, function_name: str, namespace: dict):
+        exec(compile(source, f"<scoring_rules:{function_name}>", "exec"), namespace)
+        return namespace[function_name]
+
+
+# Правила процесса, загружаются один раз при импорте
+scoring_rules = ScoringRules.load(Path(SCORING_RULES_PATH))
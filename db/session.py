@@ -1,5 +1,54 @@
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from db.database import AsyncSessionLocal
 
+
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# -------- Единица работы: одна сессия и одна транзакция --------
+@asynccontextmanager
+async def session_scope(session: AsyncSession = None):
+    """
+    Сессия для метода Repository.
+
+    Если передана внешняя сессия (сессия апдейта), используется она,
+    а коммит остается за владельцем. Иначе открывается своя сессия
+    и коммитится при выходе из блока.
+    """
+    if session is not None:
+        yield session
+        return
+
+    async with AsyncSessionLocal() as own_session:
+        yield own_session
+        await commit(own_session)
+
+
+def after_commit(session: AsyncSession, callback) -> None:
+    """
+    Откладывает действие (обновление индексов в памяти, кэшей) до коммита
+    транзакции: при откате оно не выполнится.
+    """
+    session.info.setdefault('after_commit', []).append(callback)
+
+
+async def commit(session: AsyncSession) -> None:
+    """
+    Коммитит сессию и выполняет отложенные after_commit действия.
+    """
+    await session.commit()
+    for callback in session.info.pop('after_commit', []):
+        callback()
+
+
+async def rollback(session: AsyncSession) -> None:
+    """
+    Откатывает сессию и отбрасывает отложенные действия.
+    """
+    session.info.pop('after_commit', None)
+    await session.rollback()
@@ -0,0 +1,165 @@
+"""
+Инвертированный индекс по словам опыта кандидатов.
+Используется при подборе, чтобы не сканировать текст опыта каждого кандидата.
+"""
+import re
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+
+from db.features import requirement_tokens, tokenize
+
+
+class ExperienceIndex:
+    """
+    Индекс "слово опыта -> отсортированный список id кандидатов".
+
+    Правила совпадения те же, что в _check_experience_match:
+    слово требований (от 3 символов) должно входить подстрокой в опыт.
+    Слово без пробелов входит в текст тогда и только тогда, когда входит
+    в одно из слов текста, поэтому поиск идет по словарю индекса,
+    а не по кандидатам.
+    """
+
+    def __init__(self):
+        self._postings = {}  # слово -> отсортированный список candidate_id
+        self._candidate_tokens = {}  # candidate_id -> множество слов опыта
+        self._vocabulary_text = ""  # все слова словаря через "\n"
+        self._vocabulary_offsets = []  # смещение начала каждого слова
+        self._vocabulary_tokens = []
+        self._dirty = False
+        self._touched = None  # id, измененные во время перестройки из БД
+
+    def __len__(self) -> int:
+        return len(self._candidate_tokens)
+
+    # -------- Обновление индекса --------
+    def add(self, candidate_id: int, experience: str) -> None:
+        """
+        Добавляет (или переиндексирует) кандидата.
+        """
+        self.remove(candidate_id)
+        self._insert(candidate_id, set(tokenize(experience)))
+
+    def _insert(self, candidate_id: int, tokens: set) -> None:
+        self._candidate_tokens[candidate_id] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = [candidate_id]
+                self._dirty = True
+            else:
+                insort(postings, candidate_id)
+
+    def remove(self, candidate_id: int) -> None:
+        """
+        Удаляет кандидата из индекса (если он там есть).
+        """
+        if self._touched is not None:
+            self._touched.add(candidate_id)
+        tokens = self._candidate_tokens.pop(candidate_id, None)
+        if not tokens:
+            return
+
+        for token in tokens:
+            postings = self._postings[token]
+            position = bisect_left(postings, candidate_id)
+            if position < len(postings) and postings[position] == candidate_id:
+                del postings[position]
+            if not postings:
+                del self._postings[token]
+                self._dirty = True
+
+    def rebuild(self, candidates) -> None:
+        """
+        Полностью перестраивает индекс по списку объектов Candidate.
+        """
+        self._postings = {}
+        self._candidate_tokens = {}
+        for candidate in sorted(candidates, key=lambda c: c.id):
+            tokens = set(candidate.experience_tokens or tokenize(candidate.experience))
+            self._candidate_tokens[candidate.id] = tokens
+            for token in tokens:
+                self._postings.setdefault(token, []).append(candidate.id)
+        self._dirty = True
+
+    # -------- Перестройка из БД без потери локальных изменений --------
+    def begin_refresh(self) -> None:
+        """
+        Начинает перестройку: пока читаются данные из БД, id, измененные
+        через add/remove, запоминаются и в finish_refresh не перетираются.
+        """
+        self._touched = set()
+
+    def finish_refresh(self, candidates) -> None:
+        """
+        Перестраивает индекс по прочитанным кандидатам, сохраняя записи
+        кандидатов, измененных после begin_refresh.
+        """
+        touched, self._touched = self._touched or set(), None
+        kept = {candidate_id: self._candidate_tokens[candidate_id]
+                for candidate_id in touched if candidate_id in self._candidate_tokens}
+        self.rebuild(candidate for candidate in candidates if candidate.id not in touched)
+        for candidate_id, tokens in kept.items():
+            self._insert(candidate_id, tokens)
+
+    def cancel_refresh(self) -> None:
+        """
+        Прекращает запоминать изменения (чтение из БД не удалось).
+        """
+        self._touched = None
+
+    # -------- Поиск --------
+    def matching_tokens(self, word: str) -> list[str]:
+        """
+        Возвращает слова словаря, в которые слово требований входит подстрокой.
+        """
+        if self._dirty:
+            self._refresh_vocabulary()
+
+        tokens = []
+        for found in re.finditer(re.escape(word), self._vocabulary_text):
+            position = bisect_right(self._vocabulary_offsets, found.start()) - 1
+            token = self._vocabulary_tokens[position]
+            if not tokens or tokens[-1] != token:
+                tokens.append(token)
+        return tokens
+
+    def lookup(self, requirements: str) -> list[int]:
+        """
+        Возвращает отсортированные id кандидатов, которые получат баллы
+        за совпадение опыта с требованиями (объединение списков вхождений).
+
+        Args:
+            requirements: требования вакансии
+
+        Returns:
+            list[int]: отсортированные id кандидатов без повторов
+        """
+        postings = []
+        seen_tokens = set()
+        for word in requirement_tokens(requirements):
+            for token in self.matching_tokens(word):
+                if token not in seen_tokens:
+                    seen_tokens.add(token)
+                    postings.append(self._postings[token])
+
+        result = []
+        for candidate_id in merge(*postings):
+            if not result or result[-1] != candidate_id:
+                result.append(candidate_id)
+        return result
+
+    def _refresh_vocabulary(self) -> None:
+        self._vocabulary_tokens = list(self._postings)
+        self._vocabulary_text = "\n".join(self._vocabulary_tokens)
+        self._vocabulary_offsets = []
+        offset = 0
+        for token in self._vocabulary_tokens:
+            self._vocabulary_offsets.append(offset)
+            offset += len(token) + 1
+        self._dirty = False
+
+
+# Общий индекс процесса, обновляется Repository при записи кандидатов
+# и перестраивается из БД в bot/utils/index_refresher.py
+experience_index = ExperienceIndex()
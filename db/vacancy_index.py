@@ -0,0 +1,185 @@
+"""
+Обратный индекс активных вакансий для ленты кандидата (/jobs).
+Подбор вакансий для кандидата смотрит только вакансии его города
+и вакансии, требования которых совпадают с его опытом, а не все подряд.
+"""
+from heapq import nlargest
+
+from db.features import MIN_REQUIREMENT_WORD, city_ref, is_ready_soon, requirement_tokens, tokenize
+from db.scoring_rules import scoring_rules
+
+
+class VacancyIndex:
+    """
+    Индекс "город -> id вакансий" и "слово требований -> id вакансий".
+
+    Правила совпадения опыта те же, что в _check_experience_match:
+    слово требований должно входить подстрокой в одно из слов опыта.
+    Поэтому для кандидата перебираются подстроки его слов опыта
+    (не короче MIN_REQUIREMENT_WORD и не длиннее самого длинного слова
+    требований) и ищутся в словаре индекса.
+    """
+
+    def __init__(self):
+        self._vacancies = {}  # vacancy_id -> (город, зарплата, слова требований)
+        self._by_city = {}  # город -> множество vacancy_id
+        self._by_token = {}  # слово требований -> множество vacancy_id
+        self._max_token_length = 0
+        self._touched = None  # id, измененные во время перестройки из БД
+
+    def __len__(self) -> int:
+        return len(self._vacancies)
+
+    # -------- Обновление индекса --------
+    def add(self, vacancy) -> None:
+        """
+        Добавляет (или переиндексирует) вакансию. Неактивные вакансии удаляются.
+        """
+        self.remove(vacancy.id)
+        if vacancy.is_active is False:
+            return
+
+        tokens = vacancy.requirement_tokens
+        if tokens is None:
+            tokens = requirement_tokens(vacancy.requirements)
+        self._insert(vacancy.id, (city_ref(vacancy), vacancy.salary, tokens))
+
+    def _insert(self, vacancy_id: int, entry: tuple) -> None:
+        city, _, tokens = entry
+        self._vacancies[vacancy_id] = entry
+        self._by_city.setdefault(city, set()).add(vacancy_id)
+        for token in tokens:
+            self._by_token.setdefault(token, set()).add(vacancy_id)
+            self._max_token_length = max(self._max_token_length, len(token))
+
+    def remove(self, vacancy_id: int) -> None:
+        """
+        Удаляет вакансию из индекса (если она там есть).
+        """
+        if self._touched is not None:
+            self._touched.add(vacancy_id)
+        entry = self._vacancies.pop(vacancy_id, None)
+        if entry is None:
+            return
+
+        city, _, tokens = entry
+        self._discard(self._by_city, city, vacancy_id)
+        for token in tokens:
+            self._discard(self._by_token, token, vacancy_id)
+
+    def rebuild(self, vacancies) -> None:
+        """
+        Полностью перестраивает индекс по списку объектов Vacancy.
+        """
+        self._vacancies = {}
+        self._by_city = {}
+        self._by_token = {}
+        self._max_token_length = 0
+        for vacancy in vacancies:
+            self.add(vacancy)
+
+    # -------- Перестройка из БД без потери локальных изменений --------
+    def begin_refresh(self) -> None:
+        """
+        Начинает перестройку: пока читаются данные из БД, id, измененные
+        через add/remove, запоминаются и в finish_refresh не перетираются.
+        """
+        self._touched = set()
+
+    def finish_refresh(self, vacancies) -> None:
+        """
+        Перестраивает индекс по прочитанным вакансиям, сохраняя записи
+        вакансий, измененных после begin_refresh.
+        """
+        touched, self._touched = self._touched or set(), None
+        kept = {vacancy_id: self._vacancies[vacancy_id] for vacancy_id in touched if vacancy_id in self._vacancies}
+        self.rebuild(vacancy for vacancy in vacancies if vacancy.id not in touched)
+        for vacancy_id, entry in kept.items():
+            self._insert(vacancy_id, entry)
+
+    def cancel_refresh(self) -> None:
+        """
+        Прекращает запоминать изменения (чтение из БД не удалось).
+        """
+        self._touched = None
+
+    # -------- Поиск --------
+    def experience_matches(self, experience_tokens) -> set[int]:
+        """
+        Возвращает id вакансий, хотя бы одно слово требований которых
+        входит подстрокой в одно из слов опыта.
+        """
+        matched = set()
+        longest = self._max_token_length
+        for token in experience_tokens:
+            for start in range(len(token) - MIN_REQUIREMENT_WORD + 1):
+                stop = min(len(token), start + longest)
+                for end in range(start + MIN_REQUIREMENT_WORD, stop + 1):
+                    vacancy_ids = self._by_token.get(token[start:end])
+                    if vacancy_ids:
+                        matched |= vacancy_ids
+        return matched
+
+    def rank(self, candidate, limit: int, offset: int = 0) -> tuple[list[tuple[int, int]], int]:
+        """
+        Ранжирует подходящие кандидату вакансии.
+
+        Подходящие — вакансии его города или с совпадением опыта;
+        скор считается по тем же правилам, что calculate_score.
+        При равном скоре выше новые вакансии (больший id).
+
+        Набор уже, чем у calculate_score: вакансия другого города без
+        совпадения опыта не попадает в ленту (и в total), даже если
+        зарплата или готовность выйти дают ей скор больше 0. Иначе
+        готовому кандидату подходила бы любая вакансия и индекс не
+        сужал бы перебор.
+
+        Args:
+            candidate: объект Candidate из БД
+            limit: размер страницы
+            offset: сколько вакансий пропустить
+
+        Returns:
+            tuple[list[tuple[int, int]], int]: страница пар (vacancy_id, score)
+                и общее число подходящих вакансий
+        """
+        city = city_ref(candidate)
+        experience_tokens = candidate.experience_tokens
+        if experience_tokens is None:
+            experience_tokens = tokenize(candidate.experience)
+        ready = candidate.ready_soon
+        if ready is None:
+            ready = is_ready_soon(candidate.ready_date)
+
+        experience = self.experience_matches(experience_tokens)
+        relevant = experience | self._by_city.get(city, set())
+
+        ranked = nlargest(
+            offset + limit,
+            ((self._score(vacancy_id, city, candidate.expected_salary, vacancy_id in experience, ready), vacancy_id)
+             for vacancy_id in relevant)
+        )
+        return [(vacancy_id, score) for score, vacancy_id in ranked[offset:]], len(relevant)
+
+    def _score(self, vacancy_id: int, city, expected_salary: float, experience: bool, ready: bool) -> int:
+        vacancy_city, salary, _ = self._vacancies[vacancy_id]
+        return scoring_rules.score_flags(
+            same_city=vacancy_city == city,
+            salary_fits=expected_salary <= salary,
+            experience_match=experience,
+            ready_soon=ready,
+        )
+
+    @staticmethod
+    def _discard(postings: dict, key, vacancy_id: int) -> None:
+        vacancy_ids = postings.get(key)
+        if vacancy_ids is None:
+            return
+        vacancy_ids.discard(vacancy_id)
+        if not vacancy_ids:
+            del postings[key]
+
+
+# Общий индекс процесса, обновляется Repository при записи вакансий
+# и перестраивается из БД в bot/utils/index_refresher.py
+vacancy_index = VacancyIndex()
@@ -0,0 +1,280 @@
+"""
+Отложенная запись (write-behind) для событий, которые не нужны в ответе.
+
+Хендлер ставит строку в буфер и сразу отвечает пользователю, а буфер пишет
+накопленное пачкой: вставки — одним многострочным INSERT на таблицу,
+обновления по id — одним executemany. Запись идет по порогу размера
+(WRITE_BUFFER_MAX_BATCH) или по таймеру (WRITE_BUFFER_FLUSH_DELAY) в своей
+сессии, вне транзакции апдейта.
+
+Каждая таблица пишется своей транзакцией. Если пачка не записалась,
+строки пишутся по одной (каждая под SAVEPOINT): отбрасывается и логируется
+только строка, которую записать нельзя (например, нарушен внешний ключ),
+остальные пишутся. Если недоступна сама база, строки возвращаются в буфер
+и пробуют записаться еще MAX_ATTEMPTS - 1 раз.
+
+Каждая операция возвращает Future, который завершается после коммита
+ее строки (или с исключением, если строку записать не удалось). Ждать его
+не обязательно — это подтверждение для тех, кому нужна гарантия записи.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from config import WRITE_BUFFER_FLUSH_DELAY, WRITE_BUFFER_MAX_BATCH
+from db.database import PrimarySessionLocal
+from metrics.registry import registry
+
+logger = logging.getLogger(__name__)
+
+WRITE_BUFFER_ROWS = registry.counter(
+    "hrbot_write_buffer_rows_total", "Строки, записанные отложенной записью", ("table",)
+)
+WRITE_BUFFER_FAILURES = registry.counter(
+    "hrbot_write_buffer_failures_total", "Строки отложенной записи, которые не удалось записать", ("table",)
+)
+
+# Сколько раз пытаться записать строку, пока база недоступна
+MAX_ATTEMPTS = 3
+
+
+class _Pending:
+    """
+    Строка в буфере: значения, ожидающие ее Future и число попыток записи.
+    """
+    __slots__ = ('values', 'waiters', 'attempts')
+
+    def __init__(self, values: dict, waiter: asyncio.Future):
+        self.values = values
+        self.waiters = [waiter]
+        self.attempts = 0
+
+    def resolve(self, error: Exception = None) -> None:
+        for waiter in self.waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+
+class WriteBuffer:
+    """
+    Буфер отложенных вставок и обновлений.
+
+    Args:
+        session_factory: фабрика AsyncSession
+        flush_delay: сколько секунд копить строки перед записью
+        max_batch: при стольких строках в буфере запись начинается сразу
+    """
+
+    def __init__(self, session_factory=PrimarySessionLocal,
+                 flush_delay: float = WRITE_BUFFER_FLUSH_DELAY, max_batch: int = WRITE_BUFFER_MAX_BATCH):
+        self.session_factory = session_factory
+        self.flush_delay = flush_delay
+        self.max_batch = max_batch
+        self._inserts = defaultdict(list)  # модель -> [_Pending]
+        self._updates = defaultdict(dict)  # модель -> {id: _Pending}
+        self._size = 0
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+        self._running = set()  # запущенные по порогу размера записи
+
+    def __len__(self) -> int:
+        return self._size
+
+    # -------- Постановка в буфер --------
+    def insert(self, model, values: dict) -> asyncio.Future:
+        """
+        Ставит в буфер вставку строки.
+
+        Returns:
+            asyncio.Future: завершается после коммита строки
+        """
+        waiter = self._new_waiter()
+        self._inserts[model].append(_Pending(values, waiter))
+        self._enqueued()
+        return waiter
+
+    def update(self, model, row_id: int, values: dict) -> asyncio.Future:
+        """
+        Ставит в буфер обновление строки по id. Несколько обновлений
+        одной строки до записи сливаются (побеждают последние значения).
+        Обновления пишутся после вставок той же пачки.
+
+        Returns:
+            asyncio.Future: завершается после коммита обновления
+        """
+        waiter = self._new_waiter()
+        pending = self._updates[model].get(row_id)
+        if pending is None:
+            self._updates[model][row_id] = _Pending({'id': row_id, **values}, waiter)
+        else:
+            pending.values.update(values)
+            pending.waiters.append(waiter)
+            # Строка уже в буфере: ее размер не меняется
+            self._size -= 1
+        self._enqueued()
+        return waiter
+
+    async def close(self) -> None:
+        """
+        Записывает все, что осталось в буфере (вызывать при остановке бота).
+        """
+        if self._flush_task is not None:
+            await self._flush_task
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        # Строки, возвращенные в буфер, пробуем записать, пока не кончатся попытки
+        while self._size:
+            await self.flush()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+    # -------- Запись --------
+    async def flush(self) -> None:
+        """
+        Записывает накопленные строки: каждую таблицу своей транзакцией.
+        """
+        async with self._flush_lock:
+            if not self._size:
+                return
+            inserts, self._inserts = self._inserts, defaultdict(list)
+            updates, self._updates = self._updates, defaultdict(dict)
+            self._size = 0
+
+            for model, rows in inserts.items():
+                await self._write(model, rows, _insert_rows)
+            for model, rows in updates.items():
+                await self._write(model, list(rows.values()), _update_rows)
+
+    async def _write(self, model, rows: list, execute) -> None:
+        """
+        Пишет строки одной таблицы: сначала пачкой, при ошибке — по одной.
+        """
+        table = model.__tablename__
+        try:
+            async with self.session_factory() as session:
+                await execute(session, model, rows)
+                await session.commit()
+        except Exception as error:
+            if _is_disconnect(error):
+                self._requeue(model, execute, rows, error)
+                return
+            logger.warning("Пачка отложенной записи (%s, %s строк) не записалась, пишем по одной",
+                           table, len(rows), exc_info=True)
+        else:
+            WRITE_BUFFER_ROWS.inc(table, amount=len(rows))
+            for pending in rows:
+                pending.resolve()
+            return
+
+        written = []
+        dropped = []
+        try:
+            async with self.session_factory() as session:
+                # Сессия подключается к базе при первом запросе: берем соединение
+                # до цикла, чтобы недоступная база не выглядела как плохая строка
+                await session.connection()
+                for pending in rows:
+                    try:
+                        async with session.begin_nested():
+                            await execute(session, model, [pending])
+                    except Exception as error:
+                        if _is_disconnect(error):
+                            raise
+                        WRITE_BUFFER_FAILURES.inc(table)
+                        logger.error("Строка отложенной записи отброшена (%s): %s", table, pending.values,
+                                     exc_info=error)
+                        pending.resolve(error)
+                        dropped.append(pending)
+                    else:
+                        written.append(pending)
+                await session.commit()
+        except Exception as error:
+            # Недоступна сама база: строки, которые еще можно записать, — обратно в буфер
+            self._requeue(model, execute, [pending for pending in rows if pending not in dropped], error)
+            return
+
+        WRITE_BUFFER_ROWS.inc(table, amount=len(written))
+        for pending in written:
+            pending.resolve()
+
+    def _requeue(self, model, execute, rows: list, error: Exception) -> None:
+        table = model.__tablename__
+        for pending in rows:
+            pending.attempts += 1
+            if pending.attempts >= MAX_ATTEMPTS:
+                WRITE_BUFFER_FAILURES.inc(table)
+                logger.error("Строка отложенной записи отброшена после %s попыток (%s): %s",
+                             pending.attempts, table, pending.values, exc_info=error)
+                pending.resolve(error)
+                continue
+
+            self._size += 1
+            if execute is _insert_rows:
+                self._inserts[model].append(pending)
+                continue
+            # Пока шла запись, строку могли обновить снова: новые значения важнее
+            newer = self._updates[model].get(pending.values['id'])
+            if newer is not None:
+                pending.values.update(newer.values)
+                pending.waiters.extend(newer.waiters)
+                self._size -= 1
+            self._updates[model][pending.values['id']] = pending
+
+        if self._size and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def _new_waiter(self) -> asyncio.Future:
+        waiter = asyncio.get_running_loop().create_future()
+        # Ошибка уже залогирована в flush; без этого неожиданный Future
+        # с исключением дал бы "exception was never retrieved"
+        waiter.add_done_callback(_consume_exception)
+        return waiter
+
+    def _enqueued(self) -> None:
+        self._size += 1
+        if self._size >= self.max_batch:
+            task = asyncio.create_task(self.flush())
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        await self.flush()
+
+
+async def _insert_rows(session, model, rows: list) -> None:
+    await session.execute(insert(model).values([pending.values for pending in rows]))
+
+
+async def _update_rows(session, model, rows: list) -> None:
+    await session.execute(update(model), [pending.values for pending in rows])
+
+
+def _is_disconnect(error: Exception) -> bool:
+    """
+    Ошибка соединения с базой (а не конкретной строки): такие строки
+    возвращаются в буфер, а не отбрасываются.
+    """
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+    return isinstance(error, OSError)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+# Буфер процесса
+write_buffer = WriteBuffer()
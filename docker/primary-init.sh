@@ -0,0 +1,4 @@
+#!/bin/bash
+# Разрешает реплике (сервис db_replica) подключаться для потоковой репликации
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
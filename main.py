@@ -6,11 +6,22 @@ if sys.platform.startswith("win"):
      asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
 
 from bot.handlers.candidate_handlers import router as candidate_router
 from bot.handlers.employer_handlers import router as employer_router
 from bot.handlers.vacancy_handlers import router as vacancy_router
 from bot.handlers.match_handlers import router as match_router
+from bot.handlers.jobs_handlers import router as jobs_router
+from bot.middlewares.db_session import DbSessionMiddleware
+from bot.middlewares.metrics import MetricsMiddleware
+from bot.utils import archiver, index_refresher, precompute
+from bot.utils.fsm_storage import PostgresStorage
+from bot.utils.executor import scoring_executor
+from config import ARCHIVE_INTERVAL, FSM_STORAGE, INDEX_REFRESH_INTERVAL, METRICS_HOST, METRICS_PORT
+from db.migrations import check_schema_version
+from db.write_buffer import write_buffer
+from metrics.server import start_metrics_server
 
 # -------- Загружаем переменные окружения --------
 load_dotenv()
@@ -31,18 +42,71 @@ async def main():
     # -------- Создаем бота с поддержкой HTML-разметки --------
     bot = Bot(token=TOKEN, parse_mode=ParseMode.HTML)
     
-    # -------- Создаем диспетчер --------
-    dp = Dispatcher()
+    # -------- Создаем диспетчер (состояния анкет храним в Postgres) --------
+    # Апдейты одного пользователя обрабатываются по очереди: повторное
+    # нажатие "Да" ждет первое и видит уже очищенное состояние анкеты
+    storage = PostgresStorage() if FSM_STORAGE == "postgres" else MemoryStorage()
+    dp = Dispatcher(storage=storage, events_isolation=SimpleEventIsolation())
+    
+    # -------- Одна сессия БД (и одна транзакция) на каждый апдейт --------
+    dp.update.middleware(DbSessionMiddleware())
+    
+    # -------- Метрики хендлеров (латентность, запросы к БД, ошибки) --------
+    metrics_middleware = MetricsMiddleware()
+    dp.message.middleware(metrics_middleware)
+    dp.callback_query.middleware(metrics_middleware)
     
     # -------- Подключаем все роутеры --------
     dp.include_router(candidate_router)
     dp.include_router(employer_router)
     dp.include_router(vacancy_router)
     dp.include_router(match_router)
+    dp.include_router(jobs_router)
+    
+    # -------- Проверяем, что схема БД мигрирована (python create_tables.py) --------
+    await check_schema_version()
+    
+    # -------- Строим индексы опыта кандидатов и активных вакансий --------
+    await index_refresher.rebuild_indexes()
+    
+    # -------- Поднимаем локальный эндпоинт метрик для Prometheus --------
+    metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+    
+    # -------- Периодически переносим устаревшие строки в архив --------
+    archive_task = asyncio.create_task(archiver.run_periodically(ARCHIVE_INTERVAL)) if ARCHIVE_INTERVAL else None
+    
+    # -------- Периодически перестраиваем индексы (изменения других процессов) --------
+    refresh_task = (
+        asyncio.create_task(index_refresher.run_periodically(INDEX_REFRESH_INTERVAL))
+        if INDEX_REFRESH_INTERVAL else None
+    )
     
     # -------- Запускаем polling (прослушиваем сообщения) --------
     print("🤖 Бот запущен и слушает сообщения...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        # -------- Останавливаем архивирование --------
+        if archive_task is not None:
+            archive_task.cancel()
+        
+        # -------- Останавливаем перестройку индексов --------
+        if refresh_task is not None:
+            refresh_task.cancel()
+        
+        # -------- Дожидаемся фоновых пересчетов скоров и останавливаем воркеры --------
+        await precompute.drain()
+        scoring_executor.shutdown()
+        
+        # -------- Дописываем отложенные события (совпадения, статусы) --------
+        await write_buffer.close()
+        
+        # -------- Записываем накопленные состояния анкет --------
+        await storage.close()
+        
+        # -------- Останавливаем сервер метрик --------
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 # -------- Точка входа в программу --------
@@ -0,0 +1,140 @@
+"""
+Метрики процесса бота в формате Prometheus (text exposition 0.0.4).
+
+Свой минимальный реестр вместо prometheus_client: нужны только счетчики
+и гистограммы с метками, а все обновления идут из одного event loop,
+поэтому блокировки не нужны.
+"""
+import bisect
+from contextvars import ContextVar
+from typing import Optional
+
+# Границы гистограмм латентности, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Границы гистограмм количества запросов к БД
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Counter:
+    """
+    Монотонный счетчик.
+
+    Args:
+        name: имя метрики
+        documentation: описание (строка # HELP)
+        labelnames: имена меток
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # значения меток -> число
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, self._label_pairs(labels), value
+
+    def _label_pairs(self, labels: tuple, extra: tuple = ()) -> tuple:
+        return tuple(zip(self.labelnames, labels)) + extra
+
+
+class Histogram(Counter):
+    """
+    Гистограмма с накопительными корзинами, суммой и количеством.
+
+    Args:
+        buckets: верхние границы корзин (без +Inf)
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            # [счетчики корзин (последняя — +Inf), сумма]
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                yield f"{self.name}_bucket", self._label_pairs(labels, (("le", le),)), cumulative
+            yield f"{self.name}_sum", self._label_pairs(labels), total
+            yield f"{self.name}_count", self._label_pairs(labels), cumulative
+
+
+class Registry:
+    """
+    Набор метрик процесса.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Все метрики в текстовом формате Prometheus.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                    lines.append(f"{name}{{{rendered}}} {value}")
+                else:
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"❌ Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# -------- Статистика текущего апдейта --------
+class UpdateStats:
+    """
+    Что успел сделать с БД обработчик текущего апдейта.
+    """
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Статистика апдейта, который сейчас обрабатывается (None вне хендлера).
+# Контекст доходит и до синхронных хуков SQLAlchemy: greenlet_spawn
+# запускает их в контексте вызывающей задачи.
+current_update: ContextVar[Optional[UpdateStats]] = ContextVar('current_update', default=None)
+
+# Реестр процесса
+registry = Registry()
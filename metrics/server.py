@@ -0,0 +1,34 @@
+"""
+HTTP-эндпоинт /metrics для Prometheus.
+
+aiohttp уже стоит как зависимость aiogram, поэтому отдельный сервер
+метрик поднимается в том же event loop, что и бот.
+"""
+from aiohttp import web
+
+from metrics.registry import registry
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=registry.render().encode("utf-8"),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """
+    Запускает сервер метрик.
+
+    Args:
+        host: адрес (по умолчанию только локальный)
+        port: порт
+
+    Returns:
+        web.AppRunner: остановить через await runner.cleanup()
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
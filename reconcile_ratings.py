@@ -0,0 +1,19 @@
+import asyncio
+import sys
+
+# ФИКС ДЛЯ WINDOWS
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+from db.repository import Repository
+
+
+async def reconcile():
+    print(">>> Сверяем рейтинги работодателей с оценками...")
+    fixed = await Repository.reconcile_employer_ratings()
+    print(f">>> Работодателей с исправленным рейтингом: {fixed}")
+
+
+# Запуск: python reconcile_ratings.py (например, раз в сутки по cron)
+# add_rating обновляет рейтинг инкрементально; задача пересчитывает точные значения
+asyncio.run(reconcile())
@@ -0,0 +1,35 @@
+import asyncio
+import sys
+
+from sqlalchemy import text
+
+from db.database import AsyncSessionLocal, DATABASE_REPLICA_URL
+from db.models import User
+from db.routing import primary_reads
+from sqlalchemy import update
+
+# Windows fix
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Реплика в режиме восстановления: pg_is_in_recovery() = true
+WHERE_AM_I = text("SELECT pg_is_in_recovery()")
+
+
+async def main():
+    print("Replica URL:", DATABASE_REPLICA_URL)
+
+    async with AsyncSessionLocal() as session:
+        print("Чтение:", "реплика" if await session.scalar(WHERE_AM_I) else "primary")
+
+    async with AsyncSessionLocal() as session:
+        with primary_reads():
+            print("primary_reads():", "реплика" if await session.scalar(WHERE_AM_I) else "primary")
+
+    async with AsyncSessionLocal() as session:
+        # Пустое обновление: запись без изменений данных
+        await session.execute(update(User).where(User.id == -1).values(username=User.username))
+        print("После записи:", "реплика" if await session.scalar(WHERE_AM_I) else "primary")
+        await session.rollback()
+
+asyncio.run(main())
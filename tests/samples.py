@@ -0,0 +1,93 @@
+"""
+Набор кандидатов и вакансий для тестов скоринга.
+
+Покрывает оба вида строк: с производными признаками (city_id, city_key,
+*_tokens, ready_soon) и без них — тогда Python и SQL разбирают исходные поля.
+"""
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+
+from db.features import requirement_tokens, tokenize
+from db.models import City, Candidate, Employer, User, Vacancy
+
+CITIES = [
+    {'id': 1, 'name': 'Москва'},
+    {'id': 2, 'name': 'Казань'},
+]
+
+CANDIDATES = [
+    # Все признаки посчитаны
+    dict(id=1, city='Москва', city_id=1, city_key='москва', expected_salary=50000,
+         experience='Продажи и переговоры', experience_tokens=tokenize('Продажи и переговоры'),
+         ready_date='сразу', ready_soon=True),
+    # Без признаков: город по названию, опыт из текста, готовность из текста
+    dict(id=2, city='Санкт-Петербург', city_id=None, city_key=None, expected_salary=90000,
+         experience='Менеджер по ПРОДАЖАМ', experience_tokens=None,
+         ready_date='  ', ready_soon=None),
+    dict(id=3, city='  Казань ', city_id=None, city_key='казань', expected_salary=30000,
+         experience='водитель кат. B', experience_tokens=tokenize('водитель кат. B'),
+         ready_date='через месяц', ready_soon=None),
+    # Город из справочника, короткие слова опыта
+    dict(id=4, city='Казань', city_id=2, city_key='казань', expected_salary=30000,
+         experience='ба', experience_tokens=['ба'],
+         ready_date='', ready_soon=False),
+    dict(id=5, city='Ёлкино', city_id=None, city_key=None, expected_salary=10000,
+         experience='оператор  ПК\nпродажи', experience_tokens=None,
+         ready_date='завтра', ready_soon=None),
+    # Неразрывные и прочие пробелы Unicode в названии без признаков
+    dict(id=6, city='\xa0Нижний\u2009Новгород\t', city_id=None, city_key=None, expected_salary=40000,
+         experience='сборщик заказов', experience_tokens=None,
+         ready_date='сразу', ready_soon=None),
+]
+
+VACANCIES = [
+    dict(id=1, city='Москва', city_id=1, city_key='москва', salary=60000,
+         requirements='Продажи B2B', requirement_tokens=requirement_tokens('Продажи B2B')),
+    dict(id=2, city='санкт-петербург', city_id=None, city_key='санкт-петербург', salary=80000,
+         requirements='продаж', requirement_tokens=None),
+    dict(id=3, city='Казань', city_id=None, city_key=None, salary=30000,
+         requirements='Водитель', requirement_tokens=['водитель']),
+    dict(id=4, city='Казань', city_id=2, city_key='казань', salary=30000,
+         requirements='ба ab', requirement_tokens=[]),
+    dict(id=5, city='елкино', city_id=None, city_key=None, salary=10000,
+         requirements='пк оператор', requirement_tokens=None),
+    dict(id=6, city='Нижний Новгород', city_id=None, city_key=None, salary=40000,
+         requirements='сборщик', requirement_tokens=None),
+]
+
+
+def candidates() -> list:
+    """
+    Кандидаты как объекты с атрибутами модели (для Python-скоринга).
+    """
+    return [SimpleNamespace(**row) for row in CANDIDATES]
+
+
+def vacancies() -> list:
+    """
+    Вакансии как объекты с атрибутами модели (для Python-скоринга).
+    """
+    return [SimpleNamespace(is_active=True, **row) for row in VACANCIES]
+
+
+async def insert_samples(session) -> None:
+    """
+    Записывает набор в БД как есть (в том числе пустые признаки).
+    """
+    await session.execute(insert(City), CITIES)
+    await session.execute(insert(User), [
+        {'id': row['id'], 'telegram_id': 1000 + row['id'], 'role': 'candidate'} for row in CANDIDATES
+    ] + [{'id': 100, 'telegram_id': 2000, 'role': 'employer'}])
+    await session.execute(insert(Employer).values(
+        id=1, user_id=100, company_name='ООО Тест', city='Москва', company_info='-', requirements='-'
+    ))
+    await session.execute(insert(Candidate), [
+        {**row, 'user_id': row['id'], 'name': f'Кандидат {row["id"]}', 'age': 30,
+         'phone': '+70000000000', 'desired_position': 'менеджер'}
+        for row in CANDIDATES
+    ])
+    await session.execute(insert(Vacancy), [
+        {**row, 'employer_id': 1, 'position': f'Вакансия {row["id"]}', 'is_active': True}
+        for row in VACANCIES
+    ])
@@ -0,0 +1,133 @@
+"""
+Пакетный скоринг (calculate_scores_batch, потоковый скан), индекс опыта
+и индекс /jobs дают тот же скор, что calculate_score.
+"""
+import asyncio
+from dataclasses import fields
+from types import SimpleNamespace
+
+import numpy as np
+
+from bot.utils import precompute
+from bot.utils.scoring import (
+    CandidatePool, _city_ref, _experience_matches, calculate_score, calculate_scores_batch, rank_scores,
+)
+from db.projections import CandidateScanFeatures
+from db.repository import Repository
+from db.token_index import ExperienceIndex
+from db.vacancy_index import VacancyIndex
+from tests import samples
+
+
+def _expected(vacancy) -> list[int]:
+    return [asyncio.run(calculate_score(candidate, vacancy)) for candidate in samples.candidates()]
+
+
+def test_batch_matches_calculate_score():
+    pool = CandidatePool.from_candidates(samples.candidates())
+    for vacancy in samples.vacancies():
+        assert calculate_scores_batch(vacancy, pool).tolist() == _expected(vacancy), vacancy.id
+
+
+def test_batch_with_experience_index_matches_calculate_score():
+    candidates = samples.candidates()
+    index = ExperienceIndex()
+    index.rebuild(candidates)
+    pool = CandidatePool.from_candidates(candidates, with_experience=False)
+    for vacancy in samples.vacancies():
+        scores = calculate_scores_batch(vacancy, pool, experience_ids=index.lookup(vacancy.requirements))
+        assert scores.tolist() == _expected(vacancy), vacancy.id
+
+
+def test_experience_index_follows_updates():
+    index = ExperienceIndex()
+    index.rebuild(samples.candidates())
+    index.add(1, "кладовщик")
+    index.remove(2)
+
+    assert 1 in index.lookup("кладовщик")
+    assert 2 not in index.lookup(samples.CANDIDATES[1]['experience'])
+
+
+def test_refresh_keeps_changes_made_during_load():
+    # Прочитанные из БД данные старее правок, сделанных во время чтения
+    experience = ExperienceIndex()
+    experience.rebuild(samples.candidates())
+    experience.begin_refresh()
+    experience.add(1, "кладовщик")
+    experience.finish_refresh(samples.candidates())
+    assert experience.lookup("кладовщик") == [1]
+
+    vacancies = VacancyIndex()
+    vacancies.rebuild(samples.vacancies())
+    vacancies.begin_refresh()
+    vacancies.remove(1)
+    vacancies.finish_refresh(samples.vacancies())
+    assert len(vacancies) == len(samples.VACANCIES) - 1
+    assert all(vacancy_id != 1 for vacancy_id, _ in vacancies.rank(samples.candidates()[0], limit=10)[0])
+
+
+def test_vacancy_index_matches_calculate_score():
+    vacancies = samples.vacancies()
+    index = VacancyIndex()
+    index.rebuild(vacancies)
+
+    for candidate in samples.candidates():
+        ranked, total = index.rank(candidate, limit=len(vacancies))
+        relevant = {
+            vacancy.id for vacancy in vacancies
+            if _city_ref(vacancy) == _city_ref(candidate) or _experience_matches(candidate, vacancy)
+        }
+        assert {vacancy_id for vacancy_id, _ in ranked} == relevant, candidate.id
+        assert total == len(relevant)
+
+        scores = {vacancy.id: asyncio.run(calculate_score(candidate, vacancy)) for vacancy in vacancies}
+        assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+        for vacancy_id, score in ranked:
+            assert score == scores[vacancy_id], (candidate.id, vacancy_id)
+
+
+def test_vacancy_index_skips_other_cities_without_experience_match():
+    # Зарплата подходит, но город другой и опыт не совпадает:
+    # calculate_score дает больше 0, а лента такую вакансию не показывает
+    candidate = samples.candidates()[0]
+    vacancy = SimpleNamespace(
+        id=100, city='Владивосток', city_id=None, city_key=None, salary=candidate.expected_salary,
+        requirements='водолаз', requirement_tokens=None, is_active=True,
+    )
+    assert asyncio.run(calculate_score(candidate, vacancy)) > 0
+
+    index = VacancyIndex()
+    index.rebuild([vacancy])
+    assert index.rank(candidate, limit=10) == ([], 0)
+
+
+def test_rank_scores_orders_positive_scores():
+    scores = np.array([10, 0, 30, 10, 30])
+    assert rank_scores(scores).tolist() == [2, 4, 0, 3]
+
+
+def test_streamed_chunks_match_batch(monkeypatch):
+    names = [field.name for field in fields(CandidateScanFeatures)]
+    rows = [CandidateScanFeatures(**{name: row[name] for name in names}) for row in samples.CANDIDATES]
+
+    async def stream_candidate_features(chunk_size, session=None):
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    monkeypatch.setattr(Repository, "stream_candidate_features", stream_candidate_features)
+
+    index = ExperienceIndex()
+    index.rebuild(samples.candidates())
+
+    async def collect(vacancy) -> list:
+        experience_ids = index.lookup(vacancy.requirements)
+        return [pair async for chunk in precompute.score_chunks(vacancy, experience_ids, chunk_size=2)
+                for pair in chunk]
+
+    for vacancy in samples.vacancies():
+        expected = [
+            (candidate.id, score)
+            for candidate, score in zip(samples.candidates(), _expected(vacancy)) if score > 0
+        ]
+        assert asyncio.run(collect(vacancy)) == expected, vacancy.id
@@ -0,0 +1,31 @@
+"""
+Разрешение городов: ввод пользователей не меняет справочник.
+"""
+from sqlalchemy import func, select
+
+from db.cities import resolve_city, seed_city_gazetteer
+from db.models import City, CityAlias
+
+
+async def _count(session, model) -> int:
+    return await session.scalar(select(func.count()).select_from(model))
+
+
+def test_resolve_city_keeps_gazetteer_intact(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            await seed_city_gazetteer(await session.connection())
+            cities, aliases = await _count(session, City), await _count(session, CityAlias)
+
+            moscow = await session.scalar(select(City.id).where(City.name == "Москва"))
+            assert await resolve_city(session, " г. Москва ") == (moscow, "Москва")
+            assert await resolve_city(session, "мск") == (moscow, "Москва")
+            # Опечатка находится триграммами, но псевдонимом не становится
+            assert await resolve_city(session, "Моссква") == (moscow, "Москва")
+            # Неизвестный город не заводится в справочник
+            assert await resolve_city(session, "  не важно ") == (None, "не важно")
+
+            assert await _count(session, City) == cities
+            assert await _count(session, CityAlias) == aliases
+
+    postgres.run(check)
@@ -0,0 +1,62 @@
+"""
+EntityCache: срок жизни записей, вытеснение по LRU и защита от
+возврата в кэш значения, прочитанного до сброса.
+"""
+import pytest
+
+from db import entity_cache
+from db.entity_cache import EntityCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(entity_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = EntityCache("test", max_size=10, ttl=60)
+    cache.put(1, "a", cache.token())
+
+    clock[0] += 59
+    assert cache.get(1) == "a"
+    clock[0] += 1
+    assert cache.get(1) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = EntityCache("test", max_size=2, ttl=60)
+    cache.put(1, "a", cache.token())
+    cache.put(2, "b", cache.token())
+    cache.get(1)
+    cache.put(3, "c", cache.token())
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+
+
+def test_put_after_invalidate_is_dropped(clock):
+    cache = EntityCache("test", max_size=10, ttl=60)
+    token = cache.token()
+    cache.invalidate(1)
+    cache.put(1, "stale", token)
+    assert cache.get(1) is None
+
+    cache.put(1, "fresh", cache.token())
+    assert cache.get(1) == "fresh"
+
+
+def test_clear_drops_everything(clock):
+    cache = EntityCache("test", max_size=10, ttl=60)
+    token = cache.token()
+    cache.put(1, "a", token)
+    cache.put(2, "b", token)
+    cache.clear()
+
+    assert len(cache) == 0
+    cache.put(3, "c", token)
+    assert cache.get(3) is None
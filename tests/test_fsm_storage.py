@@ -0,0 +1,48 @@
+"""
+PostgresStorage: состояние анкеты переживает перезапуск (новое хранилище
+читает его из fsm_states), очищенное состояние удаляет строку.
+"""
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import func, select
+
+from bot.utils.fsm_storage import PostgresStorage
+from db.models import FsmRecord
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+def test_state_round_trip(postgres):
+    async def check(session_factory):
+        storage = PostgresStorage(session_factory, flush_delay=60, cache_ttl=60)
+        await storage.set_state(KEY, "CandidateStates:name")
+        await storage.set_data(KEY, {"name": "Иван", "age": 30})
+        await storage.flush()
+
+        restarted = PostgresStorage(session_factory, flush_delay=60, cache_ttl=60)
+        assert await restarted.get_state(KEY) == "CandidateStates:name"
+        assert await restarted.get_data(KEY) == {"name": "Иван", "age": 30}
+
+        # Ключ другого чата не задет
+        other = StorageKey(bot_id=1, chat_id=11, user_id=11)
+        assert await restarted.get_state(other) is None
+        assert await restarted.get_data(other) == {}
+
+    postgres.run(check)
+
+
+def test_cleared_state_deletes_row(postgres):
+    async def check(session_factory):
+        storage = PostgresStorage(session_factory, flush_delay=60, cache_ttl=60)
+        await storage.set_state(KEY, "CandidateStates:name")
+        await storage.set_data(KEY, {"name": "Иван"})
+        await storage.flush()
+
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        await storage.flush()
+
+        async with session_factory() as session:
+            assert await session.scalar(select(func.count()).select_from(FsmRecord)) == 0
+        assert await PostgresStorage(session_factory).get_state(KEY) is None
+
+    postgres.run(check)
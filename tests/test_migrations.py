@@ -0,0 +1,38 @@
+"""
+Миграции схемы: повторный запуск ничего не меняет, миграция архива
+заполняет last_active_at у существующих анкет.
+"""
+from sqlalchemy import func, select, text, update
+
+from db.migrations import SCHEMA_VERSION, current_version, migrate
+from db.models import Candidate
+from tests import samples
+
+
+def test_migrations_applied_once(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            conn = await session.connection()
+            assert await current_version(conn) == SCHEMA_VERSION
+            assert await migrate(conn) == []
+
+    postgres.run(check)
+
+
+def test_archive_migration_backfills_activity(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            await session.execute(update(Candidate).values(last_active_at=None))
+            await session.execute(text("DELETE FROM schema_migrations WHERE version = 3"))
+
+            conn = await session.connection()
+            assert await migrate(conn) == [3]
+            assert await current_version(conn) == SCHEMA_VERSION
+
+            missing = await session.scalar(
+                select(func.count()).select_from(Candidate).where(Candidate.last_active_at.is_(None))
+            )
+            assert missing == 0
+
+    postgres.run(check)
@@ -0,0 +1,115 @@
+"""
+Запросы Repository на тестовой базе: листание подбора по курсору,
+потоковая запись скоров и перенос строк в архив и обратно.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from db.models import CandidateScore, MatchedCandidate, Vacancy
+from db.repository import Repository
+from tests import samples
+
+# Скоры вакансии 1 с равными значениями: порядок — score DESC, candidate_id DESC
+SCORES = {1: 50, 2: 50, 3: 30, 4: 80, 5: 30}
+
+
+async def _vacancy_scores(session, vacancy_id: int) -> dict:
+    result = await session.execute(
+        select(CandidateScore.candidate_id, CandidateScore.score).where(CandidateScore.vacancy_id == vacancy_id)
+    )
+    return dict(result.all())
+
+
+def test_keyset_walks_every_score_once(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            await session.execute(insert(CandidateScore), [
+                {'vacancy_id': 1, 'candidate_id': candidate_id, 'score': score}
+                for candidate_id, score in SCORES.items()
+            ])
+
+            walked = []
+            after = None
+            while (row := await Repository.get_next_candidate_score(1, after, session=session)) is not None:
+                walked.append(row)
+                candidate_id, score = row
+                after = (score, candidate_id)
+
+            assert walked == [(4, 80), (2, 50), (1, 50), (5, 30), (3, 30)]
+            assert await Repository.count_matching_candidates(1, session=session) == len(SCORES)
+            assert await Repository.get_next_candidate_score(2, session=session) is None
+
+    postgres.run(check)
+
+
+def test_streamed_scores_replace_previous(postgres):
+    async def check(session_factory):
+        async def chunks():
+            yield [(1, 40), (2, 70)]
+            yield []
+            yield [(3, 10)]
+
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            await session.execute(insert(CandidateScore).values(vacancy_id=1, candidate_id=4, score=90))
+
+            await Repository.replace_vacancy_scores_streaming(1, chunks(), session=session)
+
+            assert await _vacancy_scores(session, 1) == {1: 40, 2: 70, 3: 10}
+            refreshed = await session.scalar(select(Vacancy.scores_refreshed_at).where(Vacancy.id == 1))
+            assert refreshed is not None
+
+    postgres.run(check)
+
+
+def test_candidate_archive_and_restore(postgres):
+    async def check(session_factory):
+        later = datetime.utcnow() + timedelta(days=1)
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            await session.execute(insert(MatchedCandidate).values(
+                vacancy_id=1, candidate_id=3, matching_score=50, created_at=datetime.utcnow() - timedelta(days=1)
+            ))
+
+            # Пачками по limit, в порядке id; кандидат с событием подбора остается
+            assert sorted(await Repository.archive_candidates(later, 2, session=session)) == [1, 2]
+            assert sorted(await Repository.archive_candidates(later, 10, session=session)) == [4, 5]
+            assert await Repository.get_candidate_by_id(3, session=session) is not None
+
+            # События уходят в архив раньше, после них — и сам кандидат
+            assert len(await Repository.archive_match_events(datetime.utcnow(), 10, session=session)) == 1
+            assert await Repository.archive_candidates(later, 10, session=session) == [3]
+
+            assert await Repository.has_archived_candidate(1, session=session)
+            assert await Repository.get_candidate_by_id(1, session=session) is None
+
+            candidate = await Repository.restore_candidate(1, session=session)
+            assert candidate.id == 1
+            assert candidate.experience == samples.CANDIDATES[0]['experience']
+            assert candidate.last_active_at > datetime.utcnow() - timedelta(minutes=1)
+            assert not await Repository.has_archived_candidate(1, session=session)
+            assert await Repository.restore_candidate(1, session=session) is None
+
+    postgres.run(check)
+
+
+def test_vacancy_archive_and_reopen(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+
+            assert await Repository.close_vacancy(1, employer_id=1, session=session)
+            assert await Repository.archive_vacancies(datetime.utcnow() + timedelta(days=1), 10,
+                                                      session=session) == [1]
+            assert await session.scalar(select(Vacancy.id).where(Vacancy.id == 1)) is None
+
+            assert await Repository.reopen_vacancy(1, employer_id=1, session=session)
+            vacancy = (await session.execute(
+                select(Vacancy.is_active, Vacancy.closed_at, Vacancy.scores_refreshed_at).where(Vacancy.id == 1)
+            )).one()
+            assert tuple(vacancy) == (True, None, None)
+            assert not await Repository.reopen_vacancy(1, employer_id=1, session=session)
+
+    postgres.run(check)
@@ -0,0 +1,32 @@
+"""
+SQL-скоринг (MATCH_SCORING_BACKEND=sql) и Python-скоринг (calculate_score,
+индекс /jobs) дают одинаковый скор для каждой пары кандидат ↔ вакансия.
+"""
+from sqlalchemy import select, true
+
+from bot.utils.scoring import calculate_score
+from db.models import Candidate, Vacancy
+from db.scoring_rules import scoring_rules
+from tests import samples
+
+
+async def _python_scores() -> dict:
+    return {
+        (candidate.id, vacancy.id): await calculate_score(candidate, vacancy)
+        for candidate in samples.candidates()
+        for vacancy in samples.vacancies()
+    }
+
+
+def test_sql_scores_match_python(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            result = await session.execute(
+                select(Candidate.id, Vacancy.id, scoring_rules.sql_expression()).join(Vacancy, true())
+            )
+            sql_scores = {(candidate_id, vacancy_id): score for candidate_id, vacancy_id, score in result}
+
+        assert sql_scores == await _python_scores()
+
+    postgres.run(check)
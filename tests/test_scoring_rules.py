@@ -0,0 +1,86 @@
+"""
+Каждый критерий из db/scoring_rules.CRITERIA задан трижды: выражением
+по объектам, по массивам NumPy и SQL-фрагментом. Тесты проверяют, что
+все три представления одинаково судят каждую пару из tests/samples.py.
+"""
+import pytest
+from sqlalchemy import select, true
+
+from bot.utils.scoring import (
+    CandidatePool, _city_ref, _experience_matches, _is_candidate_ready, _requirement_tokens,
+)
+from db.models import Candidate, Vacancy
+from db.scoring_rules import CRITERIA, ScoringRules
+from tests import samples
+
+
+def _single(name: str) -> ScoringRules:
+    """
+    Правила из одного критерия с весом 1: скор пары — значение критерия.
+    """
+    return ScoringRules.from_dict({"max_score": 100, "rules": [{"criterion": name, "weight": 1}]})
+
+
+def _python_flags(rules: ScoringRules) -> dict:
+    score_pair = rules.compile_python({
+        '_city_ref': _city_ref,
+        '_experience_matches': _experience_matches,
+        '_is_candidate_ready': _is_candidate_ready,
+    })
+    return {
+        (candidate.id, vacancy.id): score_pair(candidate, vacancy)
+        for candidate in samples.candidates()
+        for vacancy in samples.vacancies()
+    }
+
+
+def _array_flags(rules: ScoringRules) -> dict:
+    pool = CandidatePool.from_candidates(samples.candidates())
+    flags = {}
+    for vacancy in samples.vacancies():
+        scores = rules.score_arrays(
+            pool, pool.vacancy_city_code(vacancy), vacancy.salary,
+            pool.experience_mask(_requirement_tokens(vacancy))
+        )
+        for candidate_id, score in zip(pool.ids, scores):
+            flags[(int(candidate_id), vacancy.id)] = int(score)
+    return flags
+
+
+@pytest.mark.parametrize("name", sorted(CRITERIA))
+def test_array_criterion_matches_python(name):
+    rules = _single(name)
+    assert _array_flags(rules) == _python_flags(rules)
+
+
+@pytest.mark.parametrize("name", sorted(CRITERIA))
+def test_sql_criterion_matches_python(name, postgres):
+    rules = _single(name)
+
+    async def check(session_factory):
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            result = await session.execute(
+                select(Candidate.id, Vacancy.id, rules.sql_expression()).join(Vacancy, true())
+            )
+            sql_flags = {(candidate_id, vacancy_id): score for candidate_id, vacancy_id, score in result}
+
+        assert sql_flags == _python_flags(rules)
+
+    postgres.run(check)
+
+
+def test_samples_exercise_both_outcomes():
+    # Набор бесполезен для сверки, если критерий везде дает одно и то же
+    for name in CRITERIA:
+        assert set(_python_flags(_single(name)).values()) == {0, 1}, name
+
+
+def test_unknown_criterion_rejected():
+    with pytest.raises(ValueError):
+        ScoringRules.from_dict({"rules": [{"criterion": "no_such_rule", "weight": 1}]})
+
+
+def test_negative_weight_rejected():
+    with pytest.raises(ValueError):
+        ScoringRules.from_dict({"rules": [{"criterion": "same_city", "weight": -10}]})
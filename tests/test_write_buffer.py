@@ -0,0 +1,213 @@
+"""
+WriteBuffer: запись пачкой, изоляция строки, которую записать нельзя,
+возврат строк в буфер, пока база недоступна, и слияние обновлений.
+
+Логика буфера проверяется на фейковой базе (без Postgres), сами
+INSERT/UPDATE — на тестовой базе.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import select
+
+from db import write_buffer as write_buffer_module
+from db.models import Candidate, MatchedCandidate
+from db.write_buffer import MAX_ATTEMPTS, WriteBuffer
+from tests import samples
+
+
+class FakeDatabase:
+    """
+    Фабрика фейковых сессий. Строка с candidate_id из rejected вызывает
+    указанное исключение. При down=True падает первый запрос сессии
+    (как у AsyncSession, которая подключается только при нем).
+    """
+
+    def __init__(self, rejected=None):
+        self.rejected = rejected or {}
+        self.down = False
+        self.rows = []
+        self.commits = 0
+
+    def __call__(self):
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.staged = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def connection(self):
+        self._check_connection()
+
+    def write(self, rows: list) -> None:
+        self._check_connection()
+        for pending in rows:
+            error = self.database.rejected.get(pending.values.get('candidate_id'))
+            if error is not None:
+                raise error("строку записать нельзя")
+        self.staged.extend(dict(pending.values) for pending in rows)
+
+    def _check_connection(self) -> None:
+        if self.database.down:
+            raise ConnectionRefusedError("база недоступна")
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        savepoint = len(self.staged)
+        try:
+            yield
+        except Exception:
+            del self.staged[savepoint:]
+            raise
+
+    async def commit(self):
+        self.database.rows.extend(self.staged)
+        self.database.commits += 1
+        self.staged = []
+
+
+@pytest.fixture
+def fake_writes(monkeypatch):
+    async def write_rows(session, model, rows):
+        session.write(rows)
+
+    monkeypatch.setattr(write_buffer_module, "_insert_rows", write_rows)
+    monkeypatch.setattr(write_buffer_module, "_update_rows", write_rows)
+
+
+def _match(candidate_id: int) -> dict:
+    return {'vacancy_id': 1, 'candidate_id': candidate_id, 'matching_score': 50}
+
+
+def test_batch_is_written_in_one_transaction(fake_writes):
+    async def check():
+        database = FakeDatabase()
+        buffer = WriteBuffer(database, flush_delay=60, max_batch=100)
+        waiters = [buffer.insert(MatchedCandidate, _match(candidate_id)) for candidate_id in (1, 2, 3)]
+        await buffer.flush()
+
+        assert database.commits == 1
+        assert [row['candidate_id'] for row in database.rows] == [1, 2, 3]
+        assert all(waiter.done() and waiter.exception() is None for waiter in waiters)
+        assert len(buffer) == 0
+
+    asyncio.run(check())
+
+
+def test_bad_row_is_dropped_and_the_rest_written(fake_writes):
+    async def check():
+        database = FakeDatabase(rejected={2: ValueError})
+        buffer = WriteBuffer(database, flush_delay=60, max_batch=100)
+        good = buffer.insert(MatchedCandidate, _match(1))
+        bad = buffer.insert(MatchedCandidate, _match(2))
+        also_good = buffer.insert(MatchedCandidate, _match(3))
+        await buffer.flush()
+
+        assert [row['candidate_id'] for row in database.rows] == [1, 3]
+        assert good.result() is None and also_good.result() is None
+        assert isinstance(bad.exception(), ValueError)
+        assert len(buffer) == 0
+
+    asyncio.run(check())
+
+
+def test_lost_connection_during_row_pass_requeues(fake_writes):
+    async def check():
+        # Пачка падает на плохой строке 1, при записи по одной обрывается соединение
+        database = FakeDatabase(rejected={1: ValueError, 3: ConnectionResetError})
+        buffer = WriteBuffer(database, flush_delay=60, max_batch=100)
+        bad = buffer.insert(MatchedCandidate, _match(1))
+        waiting = [buffer.insert(MatchedCandidate, _match(candidate_id)) for candidate_id in (2, 3)]
+        await buffer.flush()
+
+        assert isinstance(bad.exception(), ValueError)
+        assert not any(waiter.done() for waiter in waiting)
+        assert len(buffer) == 2
+        assert database.rows == []
+
+    asyncio.run(check())
+
+
+def test_rows_wait_in_buffer_while_database_is_down(fake_writes):
+    async def check():
+        database = FakeDatabase()
+        database.down = True
+        buffer = WriteBuffer(database, flush_delay=60, max_batch=100)
+        waiter = buffer.insert(MatchedCandidate, _match(1))
+        await buffer.flush()
+
+        assert len(buffer) == 1
+        assert not waiter.done()
+
+        database.down = False
+        await buffer.flush()
+        assert waiter.result() is None
+        assert [row['candidate_id'] for row in database.rows] == [1]
+
+    asyncio.run(check())
+
+
+def test_rows_dropped_after_max_attempts(fake_writes):
+    async def check():
+        database = FakeDatabase()
+        database.down = True
+        buffer = WriteBuffer(database, flush_delay=0, max_batch=100)
+        waiter = buffer.insert(MatchedCandidate, _match(1))
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            await buffer.flush()
+            assert not waiter.done()
+        await buffer.close()
+
+        assert isinstance(waiter.exception(), ConnectionError)
+        assert len(buffer) == 0
+        assert database.rows == []
+
+    asyncio.run(check())
+
+
+def test_updates_of_one_row_are_merged(fake_writes):
+    async def check():
+        database = FakeDatabase()
+        buffer = WriteBuffer(database, flush_delay=60, max_batch=100)
+        first = buffer.update(Candidate, 5, {'age': 30})
+        second = buffer.update(Candidate, 5, {'name': 'Иван'})
+        assert len(buffer) == 1
+        await buffer.flush()
+
+        assert database.rows == [{'id': 5, 'age': 30, 'name': 'Иван'}]
+        assert first.result() is None and second.result() is None
+
+    asyncio.run(check())
+
+
+def test_writes_to_postgres(postgres):
+    async def check(session_factory):
+        async with session_factory() as session:
+            await samples.insert_samples(session)
+            await session.commit()
+
+        buffer = WriteBuffer(session_factory, flush_delay=60, max_batch=100)
+        good = buffer.insert(MatchedCandidate, _match(1))
+        bad = buffer.insert(MatchedCandidate, _match(999))
+        renamed = buffer.update(Candidate, 2, {'name': 'Новое имя'})
+        await buffer.flush()
+
+        assert good.result() is None and renamed.result() is None
+        assert bad.exception() is not None
+        async with session_factory() as session:
+            matched = (await session.execute(select(MatchedCandidate.candidate_id))).scalars().all()
+            name = await session.scalar(select(Candidate.name).where(Candidate.id == 2))
+        assert matched == [1]
+        assert name == 'Новое имя'
+
+    postgres.run(check)